@@ -1,11 +1,10 @@
 # coding=utf-8
 import os
 import json
-import uuid
 import time
 import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from werkzeug.exceptions import BadRequest
 from dotenv import load_dotenv
@@ -15,20 +14,32 @@ from loguru import logger
 from main import Data_Spider
 from builder.auth import DouyinAuth
 from utils.database import get_database
+from utils.dy_util import warm_up_js
+from dy_apis.request_scheduler import get_request_scheduler
+from dy_apis.request_metrics import get_request_metrics
+from dy_apis.sign_pipeline import SignAheadPipeline
 from utils.scan_scheduler import get_scanner, start_scanner, stop_scanner
 from utils.notification import send_new_videos_notification
 from utils.scan_logger import get_scan_logger
 from utils.scan_config import get_scan_config, update_scan_config, get_scan_config_manager
+from utils.async_util import run_blocking
+from utils.export_util import EXPORT_FORMATS, export_user_works, save_work_records
+from utils.data_util import handle_work_info
+from utils.job_manager import JobCancelled, JobQueueFull, get_job_manager
+from utils.download_queue import get_download_queue
 import asyncio
+import concurrent.futures
 
 app = Flask(__name__)
 CORS(app)
 
 # 全局变量
-tasks = {}
 CONFIG_FILE = 'config.json'
-_scan_auth = None
-_scan_data_spider = None
+_download_queue_job = None
+# 下载队列任务是否还会再检查一次队列：任务执行期间又有作品入队时置为 True
+_download_queue_more = False
+_download_queue_accepting = False
+_download_queue_lock = threading.Lock()
 
 # 默认配置
 DEFAULT_CONFIG = {
@@ -145,15 +156,31 @@ base_path = None
 loop = None  # 事件循环
 
 # 创建异步任务的辅助函数
-def run_async(coro):
-    """在Flask中运行异步任务"""
+def run_async(coro, timeout=30, cancel_token=None):
+    """
+    在Flask中运行异步任务
+    :param timeout: 等待结果的超时时间（秒），None 表示一直等待
+    :param cancel_token: 取消标记，等待期间被取消时一并取消事件循环中的协程并抛出 JobCancelled
+    """
     global loop
     if loop is None:
         loop = asyncio.new_event_loop()
         threading.Thread(target=loop.run_forever, daemon=True).start()
     
     future = asyncio.run_coroutine_threadsafe(coro, loop)
-    return future.result(timeout=30)  # 30秒超时
+    if cancel_token is None:
+        return future.result(timeout=timeout)
+    
+    # 分段等待，每段之间检查取消
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not future.done():
+        if cancel_token.cancelled:
+            future.cancel()
+            cancel_token.raise_if_cancelled()
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        concurrent.futures.wait([future], timeout=0.5)
+    return future.result(timeout=0)
 
 def initialize():
     global data_spider, auth, base_path
@@ -161,6 +188,9 @@ def initialize():
         # 确保下载目录存在
         ensure_download_directories()
         
+        # 后台预热签名运行时
+        warm_up_js()
+
         # 初始化爬虫
         data_spider = Data_Spider()
         
@@ -181,6 +211,9 @@ def initialize():
         else:
             logger.warning("未找到Cookie配置")
         
+        # 下载队列中只有链接或作品ID的作品，下载前通过爬虫获取作品信息
+        get_download_queue().resolver = resolve_download_source
+        
         # 设置基础路径
         save_path = config.get('save_path', './downloads')
         base_path = {
@@ -195,6 +228,60 @@ def initialize():
         logger.error(f"系统初始化失败: {e}")
         raise
 
+def resolve_download_source(source):
+    """获取下载队列占位行（链接或作品ID）的作品信息"""
+    if not (data_spider and auth):
+        raise RuntimeError('爬虫未初始化')
+    return data_spider.spider_work(auth, source)
+
+def resume_download_queue(retry_failed=False):
+    """
+    在任务队列中继续下载持久下载队列里的作品
+    :param retry_failed: 是否把尝试次数已达上限的作品也放回队列
+    :return: 下载任务，已有下载任务在执行时返回该任务，没有待下载的作品时返回 None
+    """
+    global _download_queue_job, _download_queue_more, _download_queue_accepting
+    download_queue = get_download_queue()
+    if retry_failed:
+        download_queue.retry_failed()
+    
+    def run_drain(job):
+        global _download_queue_more, _download_queue_accepting
+        
+        def on_item(item, stats, error):
+            work_id = stats['work_id'] if stats else item['work_id']
+            job.add_result({'work_id': work_id, 'status': 'failed' if error else 'success', 'error': error})
+        
+        counts = {'downloaded': 0, 'failed': 0}
+        try:
+            while True:
+                job.update(total=job.progress + download_queue.stats()['queued'])
+                for key, value in download_queue.drain(cancel_token=job.token, on_item=on_item).items():
+                    counts[key] += value
+                job.update(**counts)
+                with _download_queue_lock:
+                    if not _download_queue_more:
+                        _download_queue_accepting = False
+                        return
+                    _download_queue_more = False
+        finally:
+            with _download_queue_lock:
+                _download_queue_accepting = False
+    
+    with _download_queue_lock:
+        if _download_queue_accepting and not _download_queue_job.finished:
+            # 执行中的下载任务结束前会再检查一次队列
+            _download_queue_more = True
+            return _download_queue_job
+        pending = download_queue.stats()['queued']
+        if not pending:
+            return None
+        _download_queue_job = get_job_manager().submit('download_queue', run_drain, priority='download', total=pending)
+        _download_queue_more = False
+        _download_queue_accepting = True
+    logger.info(f"继续下载队列中的 {pending} 个作品")
+    return _download_queue_job
+
 def ensure_download_directories():
     """确保下载目录存在"""
     try:
@@ -250,12 +337,21 @@ def get_system_status():
             'disk_usage': {
                 'used': 0,
                 'total': 0
-            }
+            },
+            # 各类请求的排队深度和等待时间
+            'request_queue': get_request_scheduler().stats(),
+            # 后台任务的工作线程数、排队上限和各状态任务数
+            'job_queue': get_job_manager().stats()
         }
         return jsonify({'code': 0, 'message': 'success', 'data': status})
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """DouyinAPI 请求指标(Prometheus 文本格式): 各接口各阶段耗时直方图和 p50/p95/p99、请求数、响应字节数、重试次数"""
+    return Response(get_request_metrics().export_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/system/validate-cookie', methods=['POST'])
 def validate_cookie():
     """验证Cookie是否有效"""
@@ -330,9 +426,10 @@ def search_users():
         if not auth:
             raise BadRequest('认证模块未初始化，请重新启动服务')
         
-        # 调用API搜索用户
+        # 调用API搜索用户，翻页时预先签好下一页的请求
         from dy_apis.douyin_api import DouyinAPI
-        user_list = DouyinAPI.search_some_user(auth, query, num)
+        with SignAheadPipeline() as pipeline:
+            user_list = DouyinAPI.search_some_user(auth, query, num, pipeline=pipeline)
         
         # 格式化用户信息
         formatted_users = []
@@ -442,90 +539,66 @@ def spider_user():
         if not config.get('cookie'):
             raise BadRequest('请先配置Cookie')
         
-        # 创建任务
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'user',
-            'status': 'pending',
-            'url': user_url,
-            'progress': 0,
-            'total': 0,
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
-        }
-        tasks[task_id] = task
-        
-        # 在后台线程中执行爬取
-        def run_spider():
+        # 在任务队列中执行爬取
+        def run_spider(job):
+            print(f"开始爬取用户: {user_url}")
+            
+            # 确保下载目录存在
+            save_path = ensure_download_directories()
+            spider_base_path = {
+                'media': os.path.join(save_path, 'media'),
+                'excel': os.path.join(save_path, 'excel')
+            }
+            
+            if not (data_spider and auth):
+                raise RuntimeError('爬虫未初始化')
+            
+            # 实际调用爬虫
             try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
+                # 创建简单的.env文件供爬虫使用
+                cookie_str = config.get("cookie", "")
+                if isinstance(cookie_str, dict):
+                    cookie_str = "; ".join([f"{k}={v}" for k, v in cookie_str.items()])
                 
-                print(f"开始爬取用户: {user_url}")
-                
-                # 确保下载目录存在
-                save_path = ensure_download_directories()
-                spider_base_path = {
-                    'media': os.path.join(save_path, 'media'),
-                    'excel': os.path.join(save_path, 'excel')
-                }
+                with open('.env', 'w', encoding='utf-8') as f:
+                    f.write(f'DY_COOKIES={cookie_str}\n')
+                    f.write(f'DY_LIVE_COOKIES={cookie_str}\n')
                 
-                # 实际调用爬虫
-                if data_spider and auth:
-                    try:
-                        # 创建简单的.env文件供爬虫使用
-                        cookie_str = config.get("cookie", "")
-                        if isinstance(cookie_str, dict):
-                            cookie_str = "; ".join([f"{k}={v}" for k, v in cookie_str.items()])
-                        
-                        with open('.env', 'w', encoding='utf-8') as f:
-                            f.write(f'DY_COOKIES={cookie_str}\n')
-                            f.write(f'DY_LIVE_COOKIES={cookie_str}\n')
-                        
-                        # 调用爬虫，注意需要传入excel_name参数
-                        excel_name = user_url.split('/')[-1].split('?')[0]
-                        download_stats = data_spider.spider_user_all_work(
-                            auth, 
-                            user_url, 
-                            spider_base_path, 
-                            save_choice,
-                            excel_name,
-                            proxies=None,
-                            force_download=force_download,
-                            selected_videos=selected_videos
-                        )
-                        
-                        task['status'] = 'completed'
-                        task['progress'] = 100
-                        task['total'] = download_stats['total_works']
-                        task['download_stats'] = download_stats
-                        logger.info(f"用户爬取完成: {user_url}")
-                        logger.info(f"下载统计: 新下载{download_stats['works_downloaded']}个作品, 跳过{download_stats['works_skipped']}个作品")
-                        logger.info(f"文件保存在: {spider_base_path}")
-                    except Exception as e:
-                        import traceback
-                        error_details = traceback.format_exc()
-                        print(f"爬虫执行失败: {e}")
-                        print(f"详细错误信息:\n{error_details}")
-                        task['status'] = 'failed'
-                        task['error'] = f'爬虫执行失败: {str(e)}'
-                else:
-                    task['status'] = 'failed'
-                    task['error'] = '爬虫未初始化'
-                    
+                # 调用爬虫，注意需要传入excel_name参数
+                excel_name = user_url.split('/')[-1].split('?')[0]
+                download_stats = data_spider.spider_user_all_work(
+                    auth, 
+                    user_url, 
+                    spider_base_path, 
+                    save_choice,
+                    excel_name,
+                    proxies=None,
+                    force_download=force_download,
+                    selected_videos=selected_videos,
+                    cancel_token=job.token
+                )
+            except JobCancelled:
+                raise
             except Exception as e:
-                print(f"任务执行失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+                import traceback
+                error_details = traceback.format_exc()
+                print(f"爬虫执行失败: {e}")
+                print(f"详细错误信息:\n{error_details}")
+                raise RuntimeError(f'爬虫执行失败: {str(e)}')
+            
+            job.update(progress=download_stats['total_works'], total=download_stats['total_works'],
+                       download_stats=download_stats)
+            logger.info(f"用户爬取完成: {user_url}")
+            logger.info(f"下载统计: 新下载{download_stats['works_downloaded']}个作品, 跳过{download_stats['works_skipped']}个作品")
+            logger.info(f"文件保存在: {spider_base_path}")
         
-        threading.Thread(target=run_spider).start()
+        job = get_job_manager().submit('user', run_spider, priority='download', url=user_url)
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
     except BadRequest as e:
         return jsonify({'code': 400, 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
 
@@ -554,7 +627,12 @@ def spider_work():
         if data_spider and auth:
             try:
                 if download:
-                    # 下载视频
+                    # 下载视频，作品信息在下载时一并返回，不再重复请求
+                    results = {}
+                    
+                    def on_result(url, work_info, stats, error):
+                        results.update(work_info=work_info, error=error)
+                    
                     download_stats = data_spider.spider_some_work(
                         auth, 
                         [work_url], 
@@ -562,17 +640,13 @@ def spider_work():
                         'media',  # 只下载媒体文件
                         excel_name='',
                         force_download=data.get('force_download', False),
-                        use_database=True
+                        use_database=True,
+                        on_result=on_result
                     )
+                    if results.get('error'):
+                        raise ValueError(results['error'])
                     
-                    # 获取作品信息
-                    proxies = None
-                    if config.get('proxy'):
-                        proxies = {
-                            'http': config.get('proxy'),
-                            'https': config.get('proxy')
-                        }
-                    work_info = data_spider.spider_work(auth, work_url, proxies)
+                    work_info = results['work_info']
                     work_info['download_stats'] = download_stats
                     
                     return jsonify({'code': 0, 'message': 'success', 'data': work_info})
@@ -613,88 +687,74 @@ def spider_batch_works():
         if not config.get('cookie'):
             raise BadRequest('请先配置Cookie')
         
-        # 创建任务
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'batch-works',
-            'status': 'pending',
-            'urls': work_urls,
-            'progress': 0,
-            'total': len(work_urls),
-            'results': [],
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
+        # 确保下载目录存在
+        save_path = ensure_download_directories()
+        spider_base_path = {
+            'media': os.path.join(save_path, 'media'),
+            'excel': os.path.join(save_path, 'excel')
         }
-        tasks[task_id] = task
+        force_download = data.get('force_download', False)
         
-        # 在后台线程中执行下载
-        def run_batch_download():
-            try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
-                
-                # 确保下载目录存在
-                save_path = ensure_download_directories()
-                spider_base_path = {
-                    'media': os.path.join(save_path, 'media'),
-                    'excel': os.path.join(save_path, 'excel')
-                }
-                
-                results = []
-                
-                for idx, url in enumerate(work_urls):
-                    try:
-                        # 下载单个视频
-                        download_stats = data_spider.spider_some_work(
-                            auth, 
-                            [url], 
-                            spider_base_path, 
-                            'media',
-                            excel_name='',
-                            force_download=data.get('force_download', False),
-                            use_database=True
-                        )
-                        
-                        # 获取作品信息
-                        work_info = data_spider.spider_work(auth, url)
-                        work_info['download_stats'] = download_stats
-                        
-                        results.append({
-                            'url': url,
-                            'status': 'success',
-                            'info': work_info
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"下载视频失败 {url}: {e}")
-                        results.append({
-                            'url': url,
-                            'status': 'failed',
-                            'error': str(e)
-                        })
-                    
-                    # 更新进度
-                    task['progress'] = idx + 1
-                    task['results'] = results
-                    task['updated_at'] = int(time.time())
-                
-                task['status'] = 'completed'
-                logger.info(f"批量下载完成: {len(results)} 个视频")
-                
-            except Exception as e:
-                logger.error(f"批量下载任务失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+        # 提交任务前先把链接写入持久下载队列，任务排队期间重启也不会丢失，由下载队列任务继续下载
+        batch = get_download_queue().batch(spider_base_path['media'], 'media', force_download, priority='download')
+        batch.add_sources(work_urls)
+        
+        # 在任务队列中执行下载
+        def run_batch_download(job):
+            def on_result(url, work_info, stats, error):
+                # 每个链接只保留页面展示需要的字段，完整作品信息已保存到数据库
+                if error is None:
+                    job.add_result({
+                        'url': url,
+                        'status': 'success',
+                        'info': {
+                            'work_id': work_info['work_id'],
+                            'work_type': work_info['work_type'],
+                            'nickname': work_info['nickname'],
+                            'desc': work_info['desc'],
+                            'download_stats': stats
+                        }
+                    })
+                else:
+                    logger.error(f"下载视频失败 {url}: {error}")
+                    job.add_result({
+                        'url': url,
+                        'status': 'failed',
+                        'error': error
+                    })
+            
+            # 并发获取作品详情，每获取到一个就开始下载
+            with batch:
+                data_spider.spider_some_work(
+                    auth,
+                    work_urls,
+                    spider_base_path,
+                    'media',
+                    excel_name='',
+                    force_download=force_download,
+                    use_database=True,
+                    on_result=on_result,
+                    cancel_token=job.token,
+                    batch=batch
+                )
+            
+            logger.info(f"批量下载完成: {len(job.results)} 个视频")
         
-        threading.Thread(target=run_batch_download).start()
+        # 排队中取消或队列已满时，删除写入下载队列的链接
+        try:
+            job = get_job_manager().submit('batch-works', run_batch_download, priority='download',
+                                           total=len(work_urls), on_cancel=lambda: batch.close(discard=True),
+                                           urls=work_urls)
+        except JobQueueFull:
+            batch.close(discard=True)
+            raise
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
         
     except BadRequest as e:
         return jsonify({'code': 400, 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
 
@@ -712,109 +772,80 @@ def spider_search():
         if not config.get('cookie'):
             raise BadRequest('请先配置Cookie')
         
-        # 创建任务
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'search',
-            'status': 'pending',
-            'query': query,
-            'progress': 0,
-            'total': 0,
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
-        }
-        tasks[task_id] = task
-        
-        # 在后台线程中执行爬取
-        def run_spider():
-            try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
-                
-                print(f"开始搜索: {query}")
-                
-                # 确保下载目录存在
-                save_path = ensure_download_directories()
-                spider_base_path = {
-                    'media': os.path.join(save_path, 'media'),
-                    'excel': os.path.join(save_path, 'excel')
-                }
-                
-                # 调用爬虫
-                if data_spider and auth:
-                    options = data.get('options', {})
-                    download_stats = data_spider.spider_some_search_work(
-                        auth,
-                        query,
-                        options.get('require_num', 20),
-                        spider_base_path,
-                        options.get('save_choice', 'all'),
-                        options.get('sort_type', '0'),
-                        options.get('publish_time', '0'),
-                        options.get('filter_duration', ''),
-                        options.get('search_range', '0'),
-                        options.get('content_type', '0'),
-                        excel_name='',
-                        proxies=None,
-                        force_download=force_download,
-                        use_database=True
-                    )
-                    
-                    task['status'] = 'completed'
-                    task['progress'] = 100
-                    task['total'] = download_stats['total_works']
-                    task['download_stats'] = download_stats
-                    logger.info(f"搜索爬取完成: {query}")
-                    logger.info(f"下载统计: 新下载{download_stats['works_downloaded']}个作品, 跳过{download_stats['works_skipped']}个作品")
-                else:
-                    task['status'] = 'failed'
-                    task['error'] = '爬虫未初始化'
-                    
-            except Exception as e:
-                print(f"搜索任务失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+        # 在任务队列中执行爬取
+        def run_spider(job):
+            print(f"开始搜索: {query}")
+            
+            # 确保下载目录存在
+            save_path = ensure_download_directories()
+            spider_base_path = {
+                'media': os.path.join(save_path, 'media'),
+                'excel': os.path.join(save_path, 'excel')
+            }
+            
+            if not (data_spider and auth):
+                raise RuntimeError('爬虫未初始化')
+            
+            # 调用爬虫
+            options = data.get('options', {})
+            download_stats = data_spider.spider_some_search_work(
+                auth,
+                query,
+                options.get('require_num', 20),
+                spider_base_path,
+                options.get('save_choice', 'all'),
+                options.get('sort_type', '0'),
+                options.get('publish_time', '0'),
+                options.get('filter_duration', ''),
+                options.get('search_range', '0'),
+                options.get('content_type', '0'),
+                excel_name='',
+                proxies=None,
+                force_download=force_download,
+                use_database=True,
+                cancel_token=job.token
+            )
+            
+            job.update(progress=download_stats['total_works'], total=download_stats['total_works'],
+                       download_stats=download_stats)
+            logger.info(f"搜索爬取完成: {query}")
+            logger.info(f"下载统计: 新下载{download_stats['works_downloaded']}个作品, 跳过{download_stats['works_skipped']}个作品")
         
-        threading.Thread(target=run_spider).start()
+        job = get_job_manager().submit('search', run_spider, priority='download', query=query)
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
     except BadRequest as e:
         return jsonify({'code': 400, 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         return jsonify({'code': 500, 'message': str(e)}), 500
 
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
-    """获取任务列表"""
-    task_list = list(tasks.values())
-    task_list.sort(key=lambda x: x['created_at'], reverse=True)
+    """获取任务列表（不含每一项的结果，详情见 /api/tasks/<task_id>）"""
+    task_list = [job.to_dict(detail=False) for job in get_job_manager().list_jobs()]
     return jsonify({'code': 0, 'message': 'success', 'data': task_list})
 
 @app.route('/api/tasks/<task_id>', methods=['GET'])
 def get_task(task_id):
     """获取任务详情"""
-    task = tasks.get(task_id)
-    if not task:
+    job = get_job_manager().get(task_id)
+    if not job:
         return jsonify({'code': 404, 'message': 'Task not found'}), 404
-    return jsonify({'code': 0, 'message': 'success', 'data': task})
+    return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
 
 @app.route('/api/tasks/<task_id>/cancel', methods=['POST'])
 def cancel_task(task_id):
-    """取消任务"""
-    task = tasks.get(task_id)
-    if not task:
+    """取消任务，排队中的任务直接结束，执行中的任务在处理下一页或下一个作品前停止"""
+    manager = get_job_manager()
+    job = manager.get(task_id)
+    if not job:
         return jsonify({'code': 404, 'message': 'Task not found'}), 404
     
-    if task['status'] in ['completed', 'failed']:
+    if not manager.cancel(task_id):
         return jsonify({'code': 400, 'message': 'Task already finished'}), 400
     
-    task['status'] = 'failed'
-    task['error'] = 'Cancelled by user'
-    task['updated_at'] = int(time.time())
-    
     return jsonify({'code': 0, 'message': 'success'})
 
 @app.route('/api/works/<work_id>', methods=['GET'])
@@ -1008,6 +1039,65 @@ def get_works():
         logger.error(f"获取作品列表失败: {e}")
         return jsonify({'code': 500, 'message': str(e)}), 500
 
+@app.route('/api/exports', methods=['GET'])
+def get_exports():
+    """获取有导出数据的作者列表"""
+    try:
+        db = get_database()
+        return jsonify({'code': 0, 'message': 'success', 'data': db.get_work_export_users()})
+    except Exception as e:
+        logger.error(f"获取导出列表失败: {e}")
+        return jsonify({'code': 500, 'message': str(e)}), 500
+
+@app.route('/api/exports/<user_id>', methods=['GET'])
+def download_export(user_id):
+    """从导出数据生成作者的作品文件并下载，format 可选 excel、csv、jsonl、parquet"""
+    try:
+        export_format = request.args.get('format', 'excel')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'code': 400, 'message': f'不支持的导出格式: {export_format}'}), 400
+        save_path = ensure_download_directories()
+        files = export_user_works(user_id, export_format, os.path.join(save_path, 'excel'))
+        return send_file(os.path.abspath(files[0]), as_attachment=True)
+    except Exception as e:
+        logger.error(f"导出作品失败: {e}")
+        return jsonify({'code': 500, 'message': str(e)}), 500
+
+@app.route('/api/download-queue', methods=['GET'])
+def get_download_queue_status():
+    """持久下载队列: 各状态的作品数和按领取顺序排列的作品"""
+    try:
+        status = request.args.get('status') or None
+        limit = request.args.get('limit', 50, type=int)
+        download_queue = get_download_queue()
+        return jsonify({
+            'code': 0,
+            'message': 'success',
+            'data': {
+                'stats': download_queue.stats(),
+                'items': download_queue.db.get_download_queue(status, limit),
+                'job': _download_queue_job.to_dict(detail=False) if _download_queue_job else None
+            }
+        })
+    except Exception as e:
+        logger.error(f"获取下载队列失败: {e}")
+        return jsonify({'code': 500, 'message': str(e)}), 500
+
+@app.route('/api/download-queue/resume', methods=['POST'])
+def resume_download_queue_api():
+    """继续下载队列中的作品，retry_failed 为 true 时失败的作品也重新下载"""
+    try:
+        data = request.get_json(silent=True) or {}
+        job = resume_download_queue(retry_failed=data.get('retry_failed', False))
+        if job is None:
+            return jsonify({'code': 0, 'message': '下载队列中没有待下载的作品'})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
+    except Exception as e:
+        logger.error(f"继续下载队列失败: {e}")
+        return jsonify({'code': 500, 'message': str(e)}), 500
+
 @app.route('/api/database/stats', methods=['GET'])
 def get_database_stats():
     """获取数据库统计信息"""
@@ -1272,75 +1362,54 @@ def check_subscription_updates():
         db = get_database()
         subscriptions = db.get_all_subscriptions(enabled_only=True)
         
-        # 创建检查任务
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'subscription_check',
-            'status': 'pending',
-            'progress': 0,
-            'total': len(subscriptions),
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
-        }
-        tasks[task_id] = task
-        
-        # 在后台线程中执行检查
-        def run_check():
-            try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
-                
-                from dy_apis.douyin_api import DouyinAPI
-                new_videos_count = 0
-                
-                for idx, sub in enumerate(subscriptions):
-                    try:
-                        # 获取用户最新视频
-                        work_list = DouyinAPI.get_user_all_work_info(auth, sub['user_url'])
-                        logger.info(f"获取到 {sub['nickname']} 的 {len(work_list)} 个作品")
-                        
-                        # 更新用户信息
-                        user_info = DouyinAPI.get_user_info(auth, sub['user_url'])
-                        db.update_subscription(
-                            sub['user_id'],
-                            follower_count=user_info['user'].get('follower_count', 0),
-                            aweme_count=len(work_list),
-                            last_check_time=datetime.now().isoformat()
-                        )
-                        
-                        # 记录新视频
-                        for work in work_list:  # 检查所有视频
-                            if db.add_subscription_video(sub['id'], work):
-                                new_videos_count += 1
-                        
-                        task['progress'] = idx + 1
-                        task['updated_at'] = int(time.time())
-                        
-                        # 避免请求过快
-                        time.sleep(2)
-                    except Exception as e:
-                        logger.error(f"检查订阅 {sub['nickname']} 失败: {e}")
-                
-                task['status'] = 'completed'
-                task['result'] = {
-                    'checked_count': len(subscriptions),
-                    'new_videos_count': new_videos_count
-                }
-                logger.info(f"订阅检查完成，发现 {new_videos_count} 个新视频")
-                
-            except Exception as e:
-                logger.error(f"订阅检查任务失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+        # 在任务队列中执行检查
+        def run_check(job):
+            from dy_apis.douyin_api import DouyinAPI
+            new_videos_count = 0
+            
+            for idx, sub in enumerate(subscriptions):
+                job.token.raise_if_cancelled()
+                try:
+                    # 获取用户最新视频
+                    work_list = DouyinAPI.get_user_all_work_info(auth, sub['user_url'])
+                    logger.info(f"获取到 {sub['nickname']} 的 {len(work_list)} 个作品")
+                    
+                    # 更新用户信息
+                    user_info = DouyinAPI.get_user_info(auth, sub['user_url'])
+                    db.update_subscription(
+                        sub['user_id'],
+                        follower_count=user_info['user'].get('follower_count', 0),
+                        aweme_count=len(work_list),
+                        last_check_time=datetime.now().isoformat()
+                    )
+                    
+                    # 记录新视频
+                    for work in work_list:  # 检查所有视频
+                        if db.add_subscription_video(sub['id'], work):
+                            new_videos_count += 1
+                    
+                    job.update(progress=idx + 1)
+                    
+                    # 避免请求过快，取消时立即结束等待
+                    job.token.sleep(2)
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"检查订阅 {sub['nickname']} 失败: {e}")
+            
+            job.update(result={
+                'checked_count': len(subscriptions),
+                'new_videos_count': new_videos_count
+            })
+            logger.info(f"订阅检查完成，发现 {new_videos_count} 个新视频")
         
-        threading.Thread(target=run_check).start()
+        job = get_job_manager().submit('subscription_check', run_check, priority='scan', total=len(subscriptions))
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
     except BadRequest as e:
         return jsonify({'code': 400, 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         logger.error(f"启动订阅检查失败: {e}")
         return jsonify({'code': 500, 'message': str(e)}), 500
@@ -1413,70 +1482,58 @@ def download_subscription_new_videos():
         
         logger.info(f"准备下载 {len(aweme_ids)} 个视频")
         
-        # 创建下载任务
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'subscription_download',
-            'status': 'pending',
-            'url': subscription['user_url'],
-            'progress': 0,
-            'total': len(aweme_ids),
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
+        # 确保下载目录存在
+        save_path = ensure_download_directories()
+        spider_base_path = {
+            'media': os.path.join(save_path, 'media'),
+            'excel': os.path.join(save_path, 'excel')
         }
-        tasks[task_id] = task
         
-        # 在后台线程中执行下载
-        def run_download():
-            try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
-                
-                # 确保下载目录存在
-                save_path = ensure_download_directories()
-                spider_base_path = {
-                    'media': os.path.join(save_path, 'media'),
-                    'excel': os.path.join(save_path, 'excel')
-                }
-                
-                # 调用爬虫下载指定视频
-                if data_spider and auth:
-                    download_stats = data_spider.spider_user_all_work(
-                        auth,
-                        subscription['user_url'],
-                        spider_base_path,
-                        'media',  # 只下载媒体文件
-                        f"{subscription['nickname']}_{subscription['user_id']}",
-                        proxies=None,
-                        force_download=False,
-                        selected_videos=aweme_ids
-                    )
-                    
-                    # 标记视频为已下载
-                    for aweme_id in aweme_ids:
-                        db.mark_video_downloaded(aweme_id)
-                    
-                    task['status'] = 'completed'
-                    task['progress'] = len(aweme_ids)
-                    task['download_stats'] = download_stats
-                    logger.info(f"订阅下载完成: {subscription['nickname']}")
-                else:
-                    task['status'] = 'failed'
-                    task['error'] = '爬虫未初始化'
-                    
-            except Exception as e:
-                logger.error(f"订阅下载任务失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+        # 提交任务前先把作品ID写入持久下载队列，任务排队期间重启也不会丢失，由下载队列任务继续下载
+        batch = get_download_queue().batch(spider_base_path['media'], 'media', priority='download')
+        batch.add_sources(aweme_ids)
         
-        threading.Thread(target=run_download).start()
+        # 在任务队列中执行下载
+        def run_download(job):
+            if not (data_spider and auth):
+                raise RuntimeError('爬虫未初始化')
+            
+            # 调用爬虫下载指定视频
+            with batch:
+                download_stats = data_spider.spider_user_all_work(
+                    auth,
+                    subscription['user_url'],
+                    spider_base_path,
+                    'media',  # 只下载媒体文件
+                    f"{subscription['nickname']}_{subscription['user_id']}",
+                    proxies=None,
+                    force_download=False,
+                    selected_videos=aweme_ids,
+                    cancel_token=job.token,
+                    batch=batch
+                )
+            
+            # 标记视频为已下载
+            for aweme_id in aweme_ids:
+                db.mark_video_downloaded(aweme_id)
+            
+            job.update(progress=len(aweme_ids), download_stats=download_stats)
+            logger.info(f"订阅下载完成: {subscription['nickname']}")
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        # 排队中取消或队列已满时，删除写入下载队列的作品ID
+        try:
+            job = get_job_manager().submit('subscription_download', run_download, priority='download',
+                                           total=len(aweme_ids), on_cancel=lambda: batch.close(discard=True),
+                                           url=subscription['user_url'])
+        except JobQueueFull:
+            batch.close(discard=True)
+            raise
+        
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
     except BadRequest as e:
         return jsonify({'code': 400, 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         logger.error(f"启动订阅下载失败: {e}")
         return jsonify({'code': 500, 'message': str(e)}), 500
@@ -1507,8 +1564,6 @@ def get_scan_status():
 def start_scan():
     """启动扫描任务"""
     try:
-        global _scan_auth, _scan_data_spider
-        
         data = request.get_json() or {}
         scan_interval = data.get('scan_interval', 3600)  # 默认1小时
         auto_download = data.get('auto_download', True)
@@ -1519,80 +1574,47 @@ def start_scan():
         # 设置认证信息
         if auth:
             scanner.set_auth(auth)
-            # 保存到全局变量供回调使用
-            _scan_auth = auth
-            _scan_data_spider = data_spider
         else:
             return jsonify({'code': 400, 'message': '请先配置Cookie'}), 400
         
         async def new_videos_callback(user_id, videos):
-            """处理新发现的视频"""
-            global _scan_auth, _scan_data_spider
-            
+            """处理新发现的视频（翻页时每页调用一次）"""
             try:
-                # 获取用户信息
+                # 获取用户信息（在线程池中查询，不阻塞扫描所在的事件循环）
                 db = get_database()
-                user_info = db.get_subscription(user_id)
-                
-                # 发送通知
-                await send_new_videos_notification(user_info, videos)
+                user_info = await run_blocking(db.get_subscription, user_id)
                 
                 # 如果启用了自动下载
                 if auto_download and user_info.get('auto_download', True):
-                    logger.info(f"开始自动下载 {user_info['nickname']} 的 {len(videos)} 个新视频")
-                    
-                    # 准备下载参数
-                    work_urls = [f"https://www.douyin.com/video/{video['aweme_id']}" for video in videos]
+                    # 扫描随后会推进该订阅的 last_video_time，重启后不会再发现这些视频，
+                    # 因此先写入持久下载队列，再由下载队列任务按优先级下载，完成后标记订阅视频为已下载
+                    save_path = ensure_download_directories()
+                    work_infos = [handle_work_info(video) for video in videos]
+                    # 作品信息追加到该作者的导出数据中，需要时通过 /api/exports/<sec_uid> 导出
+                    await run_blocking(save_work_records, work_infos)
+                    queued = await run_blocking(get_download_queue().enqueue, work_infos,
+                                                os.path.join(save_path, 'media'), 'media', priority='download')
+                    logger.info(f"{user_info['nickname']} 的 {queued} 个新视频已加入下载队列")
                     
-                    # 在后台线程中执行下载
-                    def download_new_videos():
-                        try:
-                            save_path = ensure_download_directories()
-                            spider_base_path = {
-                                'media': os.path.join(save_path, 'media'),
-                                'excel': os.path.join(save_path, 'excel')
-                            }
-                            
-                            # 生成Excel文件名（使用用户昵称和时间戳）
-                            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                            excel_name = f"{user_info['nickname']}_自动下载_{timestamp}"
-                            
-                            # 调用爬虫下载全部内容
-                            if _scan_data_spider and _scan_auth:
-                                download_stats = _scan_data_spider.spider_some_work(
-                                    _scan_auth,
-                                    work_urls,
-                                    spider_base_path,
-                                    'all',  # 下载全部内容（媒体文件 + Excel）
-                                    excel_name,  # Excel文件名
-                                    proxies=None,
-                                    use_database=True
-                                )
-                                
-                                logger.info(f"自动下载完成 - {user_info['nickname']}: {download_stats}")
-                                
-                                # 标记视频为已下载
-                                db = get_database()
-                                for video in videos:
-                                    aweme_id = video.get('aweme_id')
-                                    if aweme_id:
-                                        db.mark_video_downloaded(aweme_id)
-                                        logger.info(f"标记视频 {aweme_id} 为已下载")
-                            else:
-                                logger.error("爬虫或认证信息未初始化")
-                            
-                        except Exception as e:
-                            logger.error(f"自动下载失败 - {user_info['nickname']}: {e}")
-                    
-                    # 在新线程中执行下载
-                    download_thread = threading.Thread(target=download_new_videos)
-                    download_thread.daemon = True  # 设置为守护线程
-                    download_thread.start()
+                    # 不在回调中等待任务队列空位：手动扫描本身占用一个工作线程，阻塞等待可能与下载任务互相卡死
+                    try:
+                        await run_blocking(resume_download_queue)
+                    except JobQueueFull:
+                        logger.warning("任务队列已满，新视频留在下载队列中，由之后的下载队列任务下载")
                     
             except Exception as e:
                 logger.error(f"处理新视频失败: {e}")
         
+        async def subscription_scanned_callback(user_id, videos):
+            """订阅扫描完成后，对本次发现的全部新视频发送一次通知"""
+            try:
+                user_info = await run_blocking(get_database().get_subscription, user_id)
+                await send_new_videos_notification(user_info, videos)
+            except Exception as e:
+                logger.error(f"发送新视频通知失败: {e}")
+        
         scanner.set_on_new_videos_callback(new_videos_callback)
+        scanner.set_on_subscription_scanned_callback(subscription_scanned_callback)
         
         # 启动扫描器
         run_async(start_scanner(scan_interval, auto_download))
@@ -1659,43 +1681,20 @@ def scan_once():
     try:
         scanner = get_scanner()
         
-        # 创建任务记录
-        task_id = str(uuid.uuid4())
-        task = {
-            'id': task_id,
-            'type': 'manual_scan',
-            'status': 'pending',
-            'progress': 0,
-            'total': 0,
-            'created_at': int(time.time()),
-            'updated_at': int(time.time())
-        }
-        tasks[task_id] = task
-        
-        # 在后台执行扫描
-        def run_scan():
-            try:
-                task['status'] = 'running'
-                task['updated_at'] = int(time.time())
-                
-                # 执行扫描
-                summary = run_async(scanner.scan_once())
-                
-                task['status'] = 'completed'
-                task['summary'] = summary
-                logger.info("手动扫描完成")
-                
-            except Exception as e:
-                logger.error(f"手动扫描失败: {e}")
-                task['status'] = 'failed'
-                task['error'] = str(e)
-            finally:
-                task['updated_at'] = int(time.time())
+        # 在任务队列中执行扫描
+        def run_scan(job):
+            # 手动扫描在工作线程中等待，整轮扫描可能超过默认超时；取消时一并取消事件循环中的扫描
+            summary = run_async(scanner.scan_once(), timeout=None, cancel_token=job.token)
+            
+            job.update(summary=summary)
+            logger.info("手动扫描完成")
         
-        threading.Thread(target=run_scan).start()
+        job = get_job_manager().submit('manual_scan', run_scan)
         
-        return jsonify({'code': 0, 'message': 'success', 'data': task})
+        return jsonify({'code': 0, 'message': 'success', 'data': job.to_dict()})
         
+    except JobQueueFull as e:
+        return jsonify({'code': 429, 'message': str(e)}), 429
     except Exception as e:
         logger.error(f"触发手动扫描失败: {e}")
         return jsonify({'code': 500, 'message': str(e)}), 500
@@ -1859,6 +1858,10 @@ def index():
 
 if __name__ == '__main__':
     initialize()
+    # debug 模式下 reloader 的父进程只负责监视文件，只在处理请求的子进程中恢复中断的下载
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_download_queue().recover()
+        resume_download_queue()
     print("DouYin Spider API Server")
     print("请先在Web界面设置Cookie")
     print("访问 http://localhost:8000")
@@ -0,0 +1,181 @@
+# coding=utf-8
+"""
+a_bogus 纯 Python 实现与 static/dy_ab.js 的差分对比和耗时测试
+用固定种子生成查询参数、表单、时间戳和随机数，JS 端固定 Date.now 和 Math.random 后逐条比对输出
+
+用法: python -m benchmarks.a_bogus_diff --cases 500 --bench 200
+需要 node 及 dy_ab.js 依赖的 node_modules
+"""
+import argparse
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+from typing import Any, Dict, List
+
+from builder import endpoints
+from utils import a_bogus
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+DY_AB_PATH = path.join(ROOT, 'static', 'dy_ab.js')
+
+# dy_ab.js 加载时读取一次 new Date() 作为结束时间戳，之后每次调用 get_ab 读取一次 Date.now 和三个随机数
+LOAD_TIME = 1700000000000
+NODE_DRIVER = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [srcPath, casesPath, benchRounds, loadTime] = process.argv.slice(2);
+let randoms = [], now = 0;
+Math.random = () => randoms.length ? randoms.shift() : 0.5;
+const RealDate = Date;
+globalThis.Date = class extends RealDate {
+    constructor(...args) { if (args.length) super(...args); else super(parseInt(loadTime)); }
+    static now() { return now; }
+};
+globalThis.require = require;
+vm.runInThisContext(fs.readFileSync(srcPath, 'utf8') + '\n;globalThis.__get_ab = get_ab;');
+const cases = JSON.parse(fs.readFileSync(casesPath, 'utf8'));
+const results = cases.map(c => { randoms = c.randoms.slice(); now = c.timestamp; return __get_ab(c.params, c.data); });
+let perSign = null;
+const rounds = parseInt(benchRounds);
+if (rounds > 0) {
+    const start = process.hrtime.bigint();
+    for (let i = 0; i < rounds; i++) { const c = cases[i % cases.length]; __get_ab(c.params, c.data); }
+    perSign = Number(process.hrtime.bigint() - start) / 1e9 / rounds;
+}
+process.stdout.write(JSON.stringify({results, perSign}));
+"""
+
+
+def find_node_modules() -> str:
+    for node_modules in (path.join(ROOT, 'node_modules'), path.join(ROOT, 'web', 'node_modules')):
+        if path.exists(node_modules):
+            return node_modules
+    raise FileNotFoundError("Cannot find node_modules directory")
+
+
+def _random_text(rng: random.Random, max_len: int) -> str:
+    alphabet = string.ascii_letters + string.digits + ' -_.~!*()中文测试&=?/'
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+def generate_cases(num: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    生成测试用例，一半使用真实接口参数，一半使用随机查询字符串，约四分之一带表单
+    :param num: 用例数量
+    :param seed: 随机种子
+    :return: 用例列表
+    """
+    rng = random.Random(seed)
+    endpoint_list = list(endpoints.ENDPOINTS.values())
+    cases = []
+    for i in range(num):
+        if i % 2 == 0:
+            endpoint = rng.choice(endpoint_list)
+            overrides = {key: _random_text(rng, 24) for key, value in endpoint.params.items()
+                         if value is endpoints.REQUIRED}
+            query = endpoint.build_params(overrides)
+            query['webid'] = str(rng.randint(10 ** 18, 10 ** 19))
+            query['msToken'] = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(107))
+            params = endpoint.serialize(query)
+        else:
+            params = '&'.join(f'{_random_text(rng, 12)}={_random_text(rng, 40)}' for _ in range(rng.randint(0, 12)))
+        data = '' if rng.random() < 0.75 else '&'.join(
+            f'{_random_text(rng, 8)}={_random_text(rng, 30)}' for _ in range(rng.randint(1, 6)))
+        cases.append({
+            'params': params,
+            'data': data,
+            # 覆盖 32 位以内和以上的时间戳
+            'timestamp': rng.choice([rng.randint(0, 2 ** 32), rng.randint(1500000000000, 2000000000000)]),
+            'randoms': [rng.random() for _ in range(3)],
+        })
+    return cases
+
+
+def run_node(cases: List[Dict[str, Any]], bench_rounds: int = 0) -> Dict[str, Any]:
+    """用 node 执行 dy_ab.js 的 get_ab"""
+    with tempfile.TemporaryDirectory() as tmp:
+        driver_path = path.join(tmp, 'driver.js')
+        cases_path = path.join(tmp, 'cases.json')
+        with open(driver_path, 'w', encoding='utf-8') as f:
+            f.write(NODE_DRIVER)
+        with open(cases_path, 'w', encoding='utf-8') as f:
+            json.dump(cases, f, ensure_ascii=False)
+        env = dict(os.environ, NODE_PATH=find_node_modules())
+        output = subprocess.run(['node', driver_path, DY_AB_PATH, cases_path, str(bench_rounds), str(LOAD_TIME)],
+                                capture_output=True, text=True, encoding='utf-8', env=env, check=True).stdout
+    return json.loads(output)
+
+
+def run_python(cases: List[Dict[str, Any]]) -> List[str]:
+    return [a_bogus.get_ab(c['params'], c['data'], start_time=c['timestamp'], end_time=LOAD_TIME, randoms=c['randoms'])
+            for c in cases]
+
+
+def bench_python(cases: List[Dict[str, Any]], rounds: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        c = cases[i % len(cases)]
+        a_bogus.get_ab(c['params'], c['data'])
+    return (time.perf_counter() - start) / rounds
+
+
+def bench_runtime(cases: List[Dict[str, Any]], rounds: int, runtime) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        c = cases[i % len(cases)]
+        runtime.call('get_ab', c['params'], c['data'])
+    return (time.perf_counter() - start) / rounds
+
+
+def bench_execjs(cases: List[Dict[str, Any]], rounds: int) -> float:
+    """execjs 每次 call 都会启动 node 进程"""
+    import execjs
+    with open(DY_AB_PATH, 'r', encoding='utf-8') as f:
+        runtime = execjs.compile(f.read(), cwd=find_node_modules())
+    return bench_runtime(cases, rounds, runtime)
+
+
+def bench_node_runtime(cases: List[Dict[str, Any]], rounds: int) -> float:
+    """utils.dy_util 使用的常驻 node 进程，包含进程间通信开销"""
+    from utils.js_runtime import NodeRuntime
+    runtime = NodeRuntime(DY_AB_PATH, find_node_modules())
+    runtime.start()
+    try:
+        return bench_runtime(cases, rounds, runtime)
+    finally:
+        runtime.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='a_bogus Python/JS 差分对比与耗时测试')
+    parser.add_argument('--cases', type=int, default=500, help='差分用例数量')
+    parser.add_argument('--seed', type=int, default=20240601, help='随机种子')
+    parser.add_argument('--bench', type=int, default=200, help='耗时测试签名次数, 0 表示不测')
+    parser.add_argument('--execjs-rounds', type=int, default=10, help='execjs 耗时测试次数, 0 表示不测')
+    args = parser.parse_args()
+
+    cases = generate_cases(args.cases, args.seed)
+    node = run_node(cases, args.bench)
+    python_results = run_python(cases)
+    mismatches = [(i, js, py) for i, (js, py) in enumerate(zip(node['results'], python_results)) if js != py]
+    print(f"差分对比: {len(cases) - len(mismatches)}/{len(cases)} 一致")
+    for i, js, py in mismatches[:10]:
+        print(f"  用例 {i}: {json.dumps(cases[i], ensure_ascii=False)}\n    js: {js}\n    py: {py}")
+
+    if args.bench:
+        print(f"Python 实现: {bench_python(cases, args.bench) * 1000:.3f} ms/次")
+        print(f"node 进程内 (不含进程启动): {node['perSign'] * 1000:.3f} ms/次")
+        print(f"常驻 node 进程 (含通信): {bench_node_runtime(cases, args.bench) * 1000:.3f} ms/次")
+    if args.execjs_rounds:
+        print(f"execjs: {bench_execjs(cases, args.execjs_rounds) * 1000:.3f} ms/次")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
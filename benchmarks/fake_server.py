@@ -0,0 +1,299 @@
+# coding=utf-8
+"""
+本地模拟的抖音服务
+提供作品列表、作品详情、一级/二级评论、综合搜索、用户信息接口以及视频和图片文件，数据由 fixtures 按固定种子生成，
+可配置每个请求的延迟和随机注入错误
+redirect_douyin 把 requests 发往 douyin.com / douyinpic.com 等域名的请求改发到本服务，DouyinAPI 和下载代码不需要改动
+
+单独运行: python -m benchmarks.fake_server --port 18080 --latency-ms 50 --error-rate 0.01
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import requests
+
+from benchmarks.fixtures import make_aweme, make_comment, make_profile
+
+AWEME_ID_BASE = 7300000000000000000
+# 改发到本服务的域名后缀
+REDIRECT_SUFFIXES = ('douyin.com', 'douyinpic.com', 'douyinvod.com', 'douyincdn.com', 'iesdouyin.com')
+ORIGINAL_HOST_HEADER = 'X-Original-Host'
+STATS_PATH = '/__stats__'
+
+
+@dataclass
+class ServerOptions:
+    """模拟服务的配置"""
+    works_per_creator: int = 5000  # 每个作者的作品数
+    comments_per_work: int = 50  # 每个作品的一级评论数
+    replies_per_comment: int = 3  # 每条一级评论的二级评论数
+    search_results: int = 1000  # 每个搜索词的结果数
+    video_kib: int = 256  # 视频文件大小(KiB)
+    image_kib: int = 32  # 图片文件大小(KiB)
+    latency_ms: float = 0.0  # 每个请求的固定延迟
+    jitter_ms: float = 0.0  # 在固定延迟上叠加的 0~jitter_ms 随机延迟
+    error_rate: float = 0.0  # 接口和文件请求返回错误的概率
+    error_status: int = 503  # 注入错误的 HTTP 状态码
+    seed: int = 0
+    host: str = '127.0.0.1'
+    port: int = 0  # 0 表示随机端口
+
+
+def _json(data: Any) -> Tuple[int, bytes, str]:
+    return 200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+
+
+class FakeDouyinServer:
+    """模拟的抖音服务，在后台线程中运行"""
+
+    def __init__(self, options: Optional[ServerOptions] = None):
+        self.options = options or ServerOptions()
+        self._rng = random.Random(self.options.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': {}, 'injected_errors': 0, 'bytes_sent': 0}
+        self._video = os.urandom(self.options.video_kib * 1024)
+        self._image = os.urandom(self.options.image_kib * 1024)
+        self._routes = {
+            '/aweme/v1/web/aweme/post/': self._user_work,
+            '/aweme/v1/web/aweme/detail/': self._work_detail,
+            '/aweme/v1/web/comment/list/': self._comment_list,
+            '/aweme/v1/web/comment/list/reply/': self._comment_reply_list,
+            '/aweme/v1/web/general/search/single/': self._search_general,
+            '/aweme/v1/web/user/profile/other/': self._user_profile,
+        }
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeDouyinServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.options.host, self.options.port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-douyin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def join(self):
+        """等待服务结束"""
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _count(self, route: str, sent: int, injected: bool = False):
+        with self._stats_lock:
+            self.stats['requests'][route] = self.stats['requests'].get(route, 0) + 1
+            self.stats['bytes_sent'] += sent
+            if injected:
+                self.stats['injected_errors'] += 1
+
+    def _delay_and_fail(self) -> Tuple[float, bool]:
+        with self._rng_lock:
+            delay = self.options.latency_ms + self._rng.random() * self.options.jitter_ms
+            failed = self._rng.random() < self.options.error_rate
+        return delay / 1000, failed
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        url = urlsplit(handler.path)
+        query = dict(parse_qsl(url.query, keep_blank_values=True))
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length:
+            query.update(parse_qsl(handler.rfile.read(length).decode('utf-8', 'replace')))
+
+        injected = False
+        if url.path.startswith('/obj/') or url.path in self._routes:
+            delay, injected = self._delay_and_fail()
+            if delay:
+                time.sleep(delay)
+
+        if url.path == STATS_PATH:
+            route = 'stats'
+            status, body, content_type = _json(self.stats)
+        elif injected:
+            route = 'media' if url.path.startswith('/obj/') else url.path
+            status, body, content_type = _json({'status_code': 2154, 'status_msg': 'injected error'})
+            status = self.options.error_status
+        elif url.path.startswith('/obj/'):
+            route = 'media'
+            host = handler.headers.get(ORIGINAL_HOST_HEADER, '')
+            status, content_type = 200, 'application/octet-stream'
+            body = self._video if host.startswith('v') or query.get('type') == 'video' else self._image
+        elif url.path in self._routes:
+            route = url.path
+            status, body, content_type = self._routes[url.path](query)
+        elif url.path.startswith('/aweme/'):
+            route = 'unknown'
+            status, body, content_type = _json({'status_code': 404, 'status_msg': f'not found: {url.path}'})
+            status = 404
+        else:
+            # 网页请求(获取 webid 等)
+            route = 'page'
+            body = ('<html><script>self.__pace_f.push([1,"{\\"user_unique_id\\":\\"%d\\"}"])</script></html>'
+                    % (AWEME_ID_BASE + 1)).encode('utf-8')
+            status, content_type = 200, 'text/html; charset=utf-8'
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        self._count(route, len(body), injected)
+
+    def _user_work(self, query: Dict[str, str]):
+        sec_uid = query.get('sec_user_id', '')
+        total = self.options.works_per_creator
+        start = int(query.get('max_cursor') or 0)
+        end = min(start + int(query.get('count') or 18), total)
+        awemes = [make_aweme(index, sec_uid, self.options.seed) for index in range(start, end)]
+        return _json({'status_code': 0, 'status_msg': '', 'aweme_list': awemes, 'has_more': int(end < total),
+                      'max_cursor': end, 'min_cursor': start})
+
+    def _work_detail(self, query: Dict[str, str]):
+        index = int(query.get('aweme_id') or AWEME_ID_BASE) - AWEME_ID_BASE
+        return _json({'status_code': 0, 'status_msg': '', 'filter_detail': None,
+                      'aweme_detail': make_aweme(index, seed=self.options.seed)})
+
+    def _comment_page(self, aweme_id: str, total: int, cursor: int, count: int, replies: int, reply_id: str = '0'):
+        end = min(cursor + count, total)
+        comments = [make_comment(aweme_id, index, replies, reply_id, self.options.seed) for index in range(cursor, end)]
+        return _json({'status_code': 0, 'status_msg': '', 'comments': comments, 'cursor': end,
+                      'has_more': int(end < total), 'total': total})
+
+    def _comment_list(self, query: Dict[str, str]):
+        return self._comment_page(query.get('aweme_id', str(AWEME_ID_BASE)), self.options.comments_per_work,
+                                  int(query.get('cursor') or 0), int(query.get('count') or 5),
+                                  self.options.replies_per_comment)
+
+    def _comment_reply_list(self, query: Dict[str, str]):
+        return self._comment_page(query.get('item_id', str(AWEME_ID_BASE)), self.options.replies_per_comment,
+                                  int(query.get('cursor') or 0), int(query.get('count') or 3), 0,
+                                  query.get('comment_id', '0'))
+
+    def _search_general(self, query: Dict[str, str]):
+        keyword = query.get('keyword', '')
+        total = self.options.search_results
+        offset = int(query.get('offset') or 0)
+        end = min(offset + int(query.get('count') or 10), total)
+        data = [{'type': 1, 'aweme_info': make_aweme(index, f'MS4wLjABAAAA_search_{index % 50}', self.options.seed)}
+                for index in range(offset, end)]
+        return _json({'status_code': 0, 'data': data, 'has_more': int(end < total), 'cursor': end,
+                      'extra': {'search_request_id': keyword}})
+
+    def _user_profile(self, query: Dict[str, str]):
+        return _json(make_profile(query.get('sec_user_id', ''), self.options.works_per_creator, self.options.seed))
+
+
+def _serve_forever(options: ServerOptions, address_queue):
+    server = FakeDouyinServer(options).start()
+    address_queue.put(server.base_url)
+    server.join()
+
+
+@contextmanager
+def serve(options: Optional[ServerOptions] = None, in_process: bool = False) -> Iterator[str]:
+    """
+    启动模拟服务
+    :param options: 服务配置
+    :param in_process: 是否在当前进程的线程中运行, 默认在子进程中运行, 避免生成数据与被测代码争用 GIL
+    :return: 服务地址
+    """
+    options = options or ServerOptions()
+    if in_process:
+        with FakeDouyinServer(options) as server:
+            yield server.base_url
+        return
+    address_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve_forever, args=(options, address_queue), daemon=True)
+    process.start()
+    try:
+        yield address_queue.get(timeout=30)
+    finally:
+        process.terminate()
+        process.join()
+
+
+def server_stats(base_url: str) -> Dict[str, Any]:
+    """读取模拟服务的请求统计"""
+    return requests.get(base_url + STATS_PATH, proxies={'http': None, 'https': None}).json()
+
+
+@contextmanager
+def redirect_douyin(base_url: str):
+    """
+    在上下文中把 requests 发往抖音域名的请求改发到模拟服务, 原域名放在 X-Original-Host 请求头中
+    :param base_url: 模拟服务地址
+    """
+    target = urlsplit(base_url)
+    original = requests.sessions.Session.request
+
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        if host.endswith(REDIRECT_SUFFIXES):
+            url = urlunsplit((target.scheme, target.netloc, parts.path, parts.query, ''))
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{ORIGINAL_HOST_HEADER: host})
+            kwargs['proxies'] = {'http': None, 'https': None}
+        return original(self, method, url, *args, **kwargs)
+
+    requests.sessions.Session.request = request
+    try:
+        yield
+    finally:
+        requests.sessions.Session.request = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Douyin API responses and media locally")
+    parser.add_argument('--port', type=int, default=18080)
+    for name, value in asdict(ServerOptions()).items():
+        if name not in ('port', 'host'):
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument('--host', default='127.0.0.1')
+    args = parser.parse_args()
+    options = ServerOptions(**{name: getattr(args, name) for name in asdict(ServerOptions())})
+    with FakeDouyinServer(options) as server:
+        print(f"fake douyin server listening on {server.base_url}")
+        try:
+            server.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# coding=utf-8
+"""
+合成的接口返回数据
+字段结构与 aweme/post、aweme/detail 返回的 aweme 一致，video、music、author 等子树保留真实数据的大致规模，
+用固定种子生成，同一参数每次生成的内容相同
+"""
+import random
+from typing import Any, Dict, List
+
+BASE_CREATE_TIME = 1700000000
+
+
+def _text(rng: random.Random, length: int) -> str:
+    return f'{rng.getrandbits(length * 4):0{length}x}'
+
+
+def _url_list(rng: random.Random, host: str, count: int = 3) -> List[str]:
+    path = _text(rng, 40)
+    return [f'https://{host}{i}.douyinpic.com/obj/{path}?x-expires={rng.randint(10 ** 9, 2 * 10 ** 9)}' for i in range(count)]
+
+
+def _image_obj(rng: random.Random, host: str) -> Dict[str, Any]:
+    return {'uri': _text(rng, 32), 'url_list': _url_list(rng, host), 'width': 720, 'height': 720}
+
+
+def make_author(sec_uid: str, seed: int = 0) -> Dict[str, Any]:
+    """作者信息，同一 sec_uid 生成的内容相同"""
+    rng = random.Random(f'{sec_uid}-{seed}')
+    return {
+        'uid': str(rng.randint(10 ** 10, 10 ** 11)),
+        'sec_uid': sec_uid,
+        'unique_id': _text(rng, 10),
+        'nickname': f'作者{_text(rng, 6)}',
+        'signature': _text(rng, 60),
+        'avatar_thumb': _image_obj(rng, 'p3'),
+        'avatar_medium': _image_obj(rng, 'p6'),
+        'avatar_larger': _image_obj(rng, 'p9'),
+        'following_count': rng.randint(0, 2000),
+        'follower_count': rng.randint(0, 10 ** 7),
+        'total_favorited': rng.randint(0, 10 ** 8),
+        'aweme_count': rng.randint(1, 5000),
+        'gender': rng.choice([0, 1, 2]),
+        'user_age': rng.randint(-1, 60),
+        'custom_verify': '',
+        'enterprise_verify_reason': '',
+        'is_verified': rng.random() < 0.1,
+        'cover_url': [_image_obj(rng, 'p11')],
+        'share_info': {'share_url': '', 'share_weibo_desc': _text(rng, 40), 'share_desc': _text(rng, 40),
+                       'share_title': _text(rng, 30), 'share_qrcode_url': _image_obj(rng, 'p26')},
+    }
+
+
+def make_aweme(index: int, sec_uid: str = 'MS4wLjABAAAA_bench', seed: int = 0) -> Dict[str, Any]:
+    """
+    一个作品
+    :param index: 作品序号, 决定 aweme_id 和发布时间（序号越大越早）
+    :param sec_uid: 作者 sec_uid
+    :param seed: 随机种子, 改变后统计数据等随之变化
+    """
+    rng = random.Random(f'{sec_uid}-{index}-{seed}')
+    aweme_id = str(7300000000000000000 + index)
+    is_image = rng.random() < 0.2
+    bit_rate = [{
+        'gear_name': f'normal_{height}_0',
+        'quality_type': rng.randint(1, 30),
+        'bit_rate': rng.randint(500000, 3000000),
+        'play_addr': {'uri': _text(rng, 32), 'url_list': _url_list(rng, 'v26'), 'width': height * 9 // 16,
+                      'height': height, 'data_size': rng.randint(10 ** 6, 10 ** 8), 'file_hash': _text(rng, 32)},
+        'is_h265': 0, 'FPS': 30,
+    } for height in (540, 720, 1080)]
+    return {
+        'aweme_id': aweme_id,
+        'desc': f'作品{index} ' + _text(rng, rng.randint(10, 120)),
+        'create_time': BASE_CREATE_TIME - index * 3600,
+        'aweme_type': 68 if is_image else 0,
+        'author': make_author(sec_uid),
+        'music': {
+            'id': rng.randint(10 ** 17, 10 ** 18), 'title': _text(rng, 20), 'author': _text(rng, 10),
+            'cover_hd': _image_obj(rng, 'p3'), 'cover_large': _image_obj(rng, 'p3'),
+            'cover_medium': _image_obj(rng, 'p3'), 'cover_thumb': _image_obj(rng, 'p3'),
+            'play_url': {'uri': _text(rng, 40), 'url_list': _url_list(rng, 'sf3')}, 'duration': rng.randint(5, 60),
+        },
+        'video': {
+            'play_addr': {'uri': _text(rng, 32), 'url_list': _url_list(rng, 'v3'), 'width': 1080, 'height': 1920},
+            'cover': _image_obj(rng, 'p3'),
+            'origin_cover': _image_obj(rng, 'p3'),
+            'dynamic_cover': _image_obj(rng, 'p3'),
+            'download_addr': {'uri': _text(rng, 32), 'url_list': _url_list(rng, 'v9')},
+            'bit_rate': bit_rate,
+            'duration': rng.randint(5000, 600000),
+            'ratio': '1080p',
+        },
+        'images': [_image_obj(rng, 'p26') for _ in range(rng.randint(2, 9))] if is_image else None,
+        'statistics': {
+            'aweme_id': aweme_id,
+            'admire_count': rng.randint(0, 100),
+            'digg_count': rng.randint(0, 10 ** 6),
+            'comment_count': rng.randint(0, 10 ** 4),
+            'collect_count': rng.randint(0, 10 ** 5),
+            'share_count': rng.randint(0, 10 ** 4),
+            'play_count': 0,
+        },
+        'text_extra': [{'start': 0, 'end': 5, 'type': 1, 'hashtag_name': _text(rng, 6),
+                        'hashtag_id': str(rng.randint(10 ** 17, 10 ** 18))} for _ in range(rng.randint(0, 4))],
+        'share_info': {'share_url': f'https://www.iesdouyin.com/share/video/{aweme_id}/', 'share_link_desc': _text(rng, 80)},
+        'status': {'is_delete': False, 'allow_share': True, 'is_prohibited': False, 'private_status': 0},
+        'video_tag': [{'tag_id': rng.randint(1000, 9999), 'tag_name': _text(rng, 4), 'level': level} for level in (1, 2, 3)],
+    }
+
+
+def make_profile(sec_uid: str, aweme_count: int, seed: int = 0) -> Dict[str, Any]:
+    """user/profile/other 的返回"""
+    user = make_author(sec_uid, seed)
+    user['aweme_count'] = aweme_count
+    user['ip_location'] = 'IP属地：北京'
+    return {'status_code': 0, 'status_msg': '', 'user': user}
+
+
+def make_comment(aweme_id: str, index: int, replies: int = 0, reply_id: str = '0', seed: int = 0) -> Dict[str, Any]:
+    """
+    一条评论
+    :param aweme_id: 所属作品
+    :param index: 评论序号, 决定 cid
+    :param replies: 二级评论数
+    :param reply_id: 二级评论所回复的一级评论 cid, 一级评论为 '0'
+    """
+    rng = random.Random(f'{aweme_id}-{reply_id}-{index}-{seed}')
+    return {
+        'cid': str(int(aweme_id) % 10 ** 12 * 10 ** 6 + index) if reply_id == '0' else f'{reply_id}{index:04d}',
+        'aweme_id': aweme_id,
+        'text': _text(rng, rng.randint(8, 80)),
+        'create_time': BASE_CREATE_TIME + rng.randint(0, 10 ** 6),
+        'digg_count': rng.randint(0, 10 ** 4),
+        'reply_comment_total': replies,
+        'reply_id': reply_id,
+        'reply_to_reply_id': '0',
+        'ip_label': '北京',
+        'label_text': '',
+        'image_list': None,
+        'user': make_author(f'MS4wLjABAAAA_commenter_{rng.randint(0, 999)}'),
+        'status': 1,
+        'is_author_digged': False,
+    }
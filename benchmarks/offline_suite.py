@@ -0,0 +1,341 @@
+# coding=utf-8
+"""
+离线吞吐量测试
+每个场景启动一个本地模拟的抖音服务(fake_server)，把发往抖音域名的请求改发到该服务，
+在临时工作目录(数据库、下载文件、导出文件都在其中)里运行真实的爬取、扫描、下载和 Flask 接口代码:
+  crawl_creator       spider_user_all_work 爬取一个作者的全部作品(默认 5000 个)并导出
+  scan_subscriptions  SubscriptionScanner 扫描一轮订阅(默认 500 个)
+  download_videos     download_work 下载视频和封面(默认 1000 个)
+  page_works_api      /api/works 从第一页翻到第 100000 个作品
+结果写成 JSON，提供 --baseline 时与上次结果比较吞吐量，下降超过 --tolerance 的场景视为回退，退出码为 1
+
+用法: python -m benchmarks.offline_suite --json result.json
+      python -m benchmarks.offline_suite --quick --scenarios crawl_creator,download_videos --latency-ms 30 --error-rate 0.01
+      python -m benchmarks.offline_suite --json new.json --baseline result.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from os import path
+from typing import Any, Callable, Dict, List
+
+from loguru import logger
+
+from benchmarks.fake_server import AWEME_ID_BASE, ServerOptions, redirect_douyin, serve, server_stats
+from benchmarks.fixtures import make_aweme
+from builder.auth import DouyinAuth
+from dy_apis import response_decoder
+from dy_apis.request_metrics import get_request_metrics
+from dy_apis.request_scheduler import get_request_scheduler
+from utils import dy_util
+from utils.data_util import download_work, handle_work_info
+from utils.database import get_database
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+# --quick 时各场景的规模
+QUICK_SIZES = {'creator_works': 500, 'subscriptions': 50, 'videos': 100, 'api_items': 10000}
+
+
+def make_auth() -> DouyinAuth:
+    """模拟已登录且已预取 webid 的会话"""
+    auth = DouyinAuth()
+    auth.perepare_auth('msToken=bench; s_v_web_id=verify_bench; ttwid=bench', bootstrap=False)
+    auth.webid = str(AWEME_ID_BASE + 1)
+    return auth
+
+
+@contextmanager
+def fake_douyin(args: argparse.Namespace, **options):
+    """
+    启动模拟服务并改发请求, 退出时把服务端统计写入产出的字典
+    :param options: ServerOptions 中场景相关的配置
+    """
+    options = ServerOptions(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                            error_status=args.error_status, seed=args.seed, **options)
+    session = {}
+    with serve(options, in_process=args.in_process) as base_url, redirect_douyin(base_url):
+        yield session
+        session.update(server_stats(base_url))
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """样本的 p50/p95/p99(毫秒)"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 2)
+    return {'p50_ms': at(0.5), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': round(ordered[-1] * 1000, 2)}
+
+
+def result(seconds: float, items: int, unit: str, **extra) -> Dict[str, Any]:
+    return dict(seconds=round(seconds, 3), items=items, throughput=round(items / seconds, 2) if seconds else 0.0,
+                unit=unit, **extra)
+
+
+def crawl_creator(args: argparse.Namespace) -> Dict[str, Any]:
+    """爬取一个作者的全部作品, 按 --crawl-save-choice 保存"""
+    from main import Data_Spider
+    sec_uid = 'MS4wLjABAAAA_bench_creator'
+    base_path = {'media': path.abspath('media'), 'excel': path.abspath('excel')}
+    for directory in base_path.values():
+        os.makedirs(directory, exist_ok=True)
+    with fake_douyin(args, works_per_creator=args.creator_works) as server:
+        start = time.perf_counter()
+        stats = Data_Spider().spider_user_all_work(make_auth(), f'https://www.douyin.com/user/{sec_uid}',
+                                                   base_path, args.crawl_save_choice)
+        seconds = time.perf_counter() - start
+    return result(seconds, stats['total_works'], 'works/s', expected=args.creator_works,
+                  completeness=round(stats['total_works'] / args.creator_works, 4),
+                  exported=sorted(os.listdir(base_path['excel'])), server=server)
+
+
+def scan_subscriptions(args: argparse.Namespace) -> Dict[str, Any]:
+    """扫描 --subscriptions 个订阅, 每个订阅 --scan-works 个作品, 不自动下载"""
+    from utils.scan_config import get_scan_config
+    from utils.scan_scheduler import SubscriptionScanner
+    db = get_database()
+    for index in range(args.subscriptions):
+        sec_uid = f'MS4wLjABAAAA_bench_sub_{index}'
+        db.add_subscription({'user_id': sec_uid, 'sec_uid': sec_uid, 'nickname': f'订阅{index}',
+                             'user_url': f'https://www.douyin.com/user/{sec_uid}'})
+    # 只在内存中修改, 不写回 scan_config.json
+    get_scan_config().source_delay = 0
+    scanner = SubscriptionScanner(auto_download=False)
+    scanner.set_auth(make_auth())
+    round_seconds = []
+    with fake_douyin(args, works_per_creator=args.scan_works) as server:
+        for _ in range(args.scan_rounds):
+            start = time.perf_counter()
+            asyncio.run(scanner.scan_once())
+            round_seconds.append(round(time.perf_counter() - start, 3))
+    return result(sum(round_seconds), args.subscriptions * args.scan_rounds, 'subscriptions/s',
+                  works_per_subscription=args.scan_works, round_seconds=round_seconds, server=server)
+
+
+def download_videos(args: argparse.Namespace) -> Dict[str, Any]:
+    """用 --download-workers 个线程下载 --videos 个视频作品(视频 + 封面)"""
+    works = []
+    for index in range(args.videos):
+        aweme = make_aweme(index, f'MS4wLjABAAAA_bench_{index % 20}', args.seed)
+        aweme['aweme_type'] = 0
+        aweme['images'] = None
+        works.append(handle_work_info(aweme))
+    media = path.abspath('media')
+    with fake_douyin(args, video_kib=args.video_kib) as server:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.download_workers) as pool:
+            stats = list(pool.map(lambda work: download_work(work, media, 'media-video'), works))
+        seconds = time.perf_counter() - start
+    complete = sum(1 for s in stats if s['is_complete'])
+    return result(seconds, complete, 'works/s', expected=args.videos,
+                  files_downloaded=sum(s['files_downloaded'] for s in stats),
+                  files_failed=sum(s['files_failed'] for s in stats),
+                  mb_per_second=round(server.get('bytes_sent', 0) / 2 ** 20 / seconds, 2) if seconds else 0.0,
+                  server=server)
+
+
+def _seed_downloads(items: int, info_dirs: int, seed: int):
+    """
+    向 downloads 表写入 items 条下载记录
+    记录的保存目录在 info_dirs 个目录中轮换, 每个目录有一份 info.json, /api/works 逐条读取的开销与真实目录一致
+    """
+    directories = []
+    for index in range(max(info_dirs, 1)):
+        directory = path.abspath(path.join('works', str(index)))
+        os.makedirs(directory, exist_ok=True)
+        with open(path.join(directory, 'info.json'), 'w', encoding='utf-8') as f:
+            json.dump(handle_work_info(make_aweme(index, seed=seed)), f, ensure_ascii=False, indent=2)
+        directories.append(directory)
+    newest = datetime(2024, 1, 1)
+    rows = []
+    for index in range(items):
+        work_id = str(AWEME_ID_BASE + index)
+        rows.append((work_id, f'user_{index % 100}', f'作者{index % 100}', f'作品{index}', '视频',
+                     directories[index % len(directories)], 1024 * 1024, 1, f'https://www.douyin.com/video/{work_id}',
+                     '', '', '{}', (newest - timedelta(seconds=index)).isoformat()))
+    with get_database().get_connection() as conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO downloads
+            (work_id, user_id, nickname, title, work_type, save_path, file_size, is_complete, work_url,
+             video_url, cover_url, metadata, download_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+def page_works_api(args: argparse.Namespace) -> Dict[str, Any]:
+    """用 Flask 测试客户端从第一页翻到第 --api-items 个作品, 每页 --api-limit 个"""
+    _seed_downloads(args.api_items, args.api_info_dirs, args.seed)
+    # 导入时在当前(临时)目录生成 config.json
+    import app_fixed
+    client = app_fixed.app.test_client()
+    latencies = []
+    fetched = 0
+    start = time.perf_counter()
+    for page in range(1, math.ceil(args.api_items / args.api_limit) + 1):
+        sent = time.perf_counter()
+        resp = client.get(f'/api/works?page={page}&limit={args.api_limit}')
+        latencies.append(time.perf_counter() - sent)
+        if resp.status_code != 200:
+            raise RuntimeError(f'/api/works 第 {page} 页返回 {resp.status_code}')
+        fetched += len(resp.get_json()['data']['items'])
+    seconds = time.perf_counter() - start
+    edge = min(10, len(latencies))
+    first_ms = sum(latencies[:edge]) / edge * 1000
+    last_ms = sum(latencies[-edge:]) / edge * 1000
+    return result(seconds, fetched, 'items/s', expected=args.api_items, pages=len(latencies),
+                  latency=percentiles(latencies), first_pages_ms=round(first_ms, 2), last_pages_ms=round(last_ms, 2),
+                  depth_slowdown=round(last_ms / first_ms, 2) if first_ms else 0.0)
+
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace], Dict[str, Any]]] = {
+    'crawl_creator': crawl_creator,
+    'scan_subscriptions': scan_subscriptions,
+    'download_videos': download_videos,
+    'page_works_api': page_works_api,
+}
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """运行一个场景, 附上本场景的 DouyinAPI 请求指标, 出错时记录错误而不中断其余场景"""
+    get_request_metrics().reset()
+    try:
+        data = SCENARIOS[name](args)
+        data['status'] = 'ok'
+    except Exception as e:
+        logger.exception(f"场景 {name} 失败")
+        data = {'status': 'failed', 'error': repr(e)}
+    data['request_metrics'] = get_request_metrics().summary()
+    return data
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线比较吞吐量
+    :return: 回退说明列表
+    """
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get('results', {}).get(name)
+        if not old or old.get('status') != 'ok':
+            continue
+        if current.get('status') != 'ok':
+            regressions.append(f"{name}: failed ({current.get('error')})")
+        elif current['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: {old['throughput']} -> {current['throughput']} {current['unit']} "
+                               f"({current['throughput'] / old['throughput'] - 1:+.1%})")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except Exception:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmarks against a local fake Douyin server")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma separated: " + ', '.join(SCENARIOS))
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="previous results file to compare throughput against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed throughput drop vs baseline")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes for a smoke run")
+    parser.add_argument('--workdir', help="working directory (default: a temporary directory, removed afterwards)")
+    parser.add_argument('--in-process', action='store_true', help="run the fake server in a thread of this process")
+    parser.add_argument('--log-level', default='WARNING')
+    # 模拟服务
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rate', type=float, default=0.0, help="request scheduler rate, <= 0 means unlimited")
+    # 场景规模
+    parser.add_argument('--creator-works', type=int, default=5000)
+    parser.add_argument('--crawl-save-choice', default='jsonl')
+    parser.add_argument('--subscriptions', type=int, default=500)
+    parser.add_argument('--scan-works', type=int, default=20)
+    parser.add_argument('--scan-rounds', type=int, default=1)
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--video-kib', type=int, default=256)
+    parser.add_argument('--download-workers', type=int, default=4)
+    parser.add_argument('--api-items', type=int, default=100000)
+    parser.add_argument('--api-limit', type=int, default=50)
+    parser.add_argument('--api-info-dirs', type=int, default=100)
+    args = parser.parse_args()
+    if args.quick:
+        for name, value in QUICK_SIZES.items():
+            setattr(args, name, value)
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    get_request_scheduler().rate = args.rate
+    output = path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    workdir = path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix='dy_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = {}
+    try:
+        for name in names:
+            results[name] = run_scenario(name, args)
+            r = results[name]
+            if r['status'] == 'ok':
+                print(f"{name:>18}: {r['throughput']:>10} {r['unit']:<16} ({r['items']} in {r['seconds']}s)")
+            else:
+                print(f"{name:>18}: FAILED {r['error']}")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sign_backend': dy_util.SIGN_BACKEND,
+            'json_decoder': response_decoder.BACKEND,
+            'json_projection': response_decoder.PROJECTION_ENABLED,
+        },
+        'options': vars(args),
+        'results': results,
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = [name for name, r in results.items() if r['status'] != 'ok']
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    for line in regressions:
+        print(f"regression: {line}")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+作品信息内存占用对比
+模拟一次爬取结束时仍然保留在内存中的数据:
+  raw+dict  原始 aweme 与 handle_work_info 的字典都保留（旧的搜索、批量爬取）
+  dict      只保留 handle_work_info 的字典
+  record    只保留 WorkRecord，同一作者共用 AuthorRecord
+
+用法: python -m benchmarks.work_record_memory --works 50000 --authors 20 --json result.json
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.fixtures import make_aweme
+from utils.data_util import handle_work_info
+from utils.work_record import WorkRecord
+
+
+def iter_awemes(works: int, authors: int):
+    for index in range(works):
+        yield make_aweme(index, sec_uid=f'MS4wLjABAAAA_bench_{index % authors}')
+
+
+def keep_raw_and_dict(works: int, authors: int) -> List[Any]:
+    return [(aweme, handle_work_info(aweme)) for aweme in iter_awemes(works, authors)]
+
+
+def keep_dict(works: int, authors: int) -> List[Any]:
+    return [handle_work_info(aweme) for aweme in iter_awemes(works, authors)]
+
+
+def keep_record(works: int, authors: int) -> List[Any]:
+    author_cache = {}
+    return [WorkRecord.from_aweme(aweme, author_cache) for aweme in iter_awemes(works, authors)]
+
+
+SCENARIOS: Dict[str, Callable[[int, int], List[Any]]] = {
+    'raw+dict': keep_raw_and_dict,
+    'dict': keep_dict,
+    'record': keep_record,
+}
+
+
+def measure(build: Callable[[int, int], List[Any]], works: int, authors: int) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build(works, authors)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {
+        'retained_mb': round(retained / 2 ** 20, 2),
+        'peak_mb': round(peak / 2 ** 20, 2),
+        'bytes_per_work': round(retained / works),
+        'seconds': round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory retained per crawled work")
+    parser.add_argument('--works', type=int, default=50000)
+    parser.add_argument('--authors', type=int, default=20)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in SCENARIOS.items():
+        results[name] = measure(build, args.works, args.authors)
+        r = results[name]
+        print(f"{name:>9}: retained {r['retained_mb']:>8.2f} MB  peak {r['peak_mb']:>8.2f} MB  "
+              f"{r['bytes_per_work']:>6} B/work  ({r['seconds']}s)")
+    base = results['raw+dict']['retained_mb']
+    for name in ('dict', 'record'):
+        print(f"{name} vs raw+dict: {results[name]['retained_mb'] / base:.1%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'works': args.works, 'authors': args.authors, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
 import base64
 import json
+import threading
+import time
 
 from dy_apis.douyin_api import DouyinAPI
-from utils.dy_util import trans_cookies, generate_msToken, generate_fake_webid
+from builder.session import SessionBootstrap
+from utils.dy_util import trans_cookies, generate_msToken, generate_s_v_web_id, generate_csrf_token, generate_ree_key
 
 
 class DouyinAuth:
+    # csrf token 缓存有效期(秒)
+    CSRF_TOKEN_TTL = 1800
+
     def __init__(self):
         self.cookie = None
         self.cookie_str = None
@@ -16,16 +22,27 @@ class DouyinAuth:
         self.ree_public_key = None
         self.uid = None
         self.msToken = None
+        self.ttwid = None
+        self.webid = None
+        self.session = None
+        # 由 cookie 和私钥派生的凭证缓存
+        self._csrf_token = None
+        self._csrf_expire_at = 0
+        self._ree_key = None
+        self._ree_key_source = None
+        self._credential_lock = threading.Lock()
 
-    def perepare_auth(self, cookieStr: str, web_protect_: str = "", keys_: str = ""):
+    def perepare_auth(self, cookieStr: str, web_protect_: str = "", keys_: str = "", bootstrap: bool = True):
+        self.invalidate_credentials()
         self.cookie = trans_cookies(cookieStr)
         self.cookie_str = cookieStr
-        self.msToken = self.cookie["msToken"] if "msToken" in self.cookie else generate_msToken()
+        ms_token_from_cookie = "msToken" in self.cookie
+        self.msToken = self.cookie["msToken"] if ms_token_from_cookie else generate_msToken()
         self.cookie["msToken"] = self.msToken
         
         # Add s_v_web_id if missing
         if "s_v_web_id" not in self.cookie:
-            self.cookie["s_v_web_id"] = generate_fake_webid()
+            self.cookie["s_v_web_id"] = generate_s_v_web_id()
         
         self.cookie_str = "; ".join([f"{k}={str(v)}" for k, v in self.cookie.items()])
         if web_protect_ != "":
@@ -37,9 +54,40 @@ class DouyinAuth:
             keys_ = json.loads(json.loads(keys_)['data'])
             self.private_key = keys_['ec_privateKey']
             self.ree_public_key = base64.b64encode(self.private_key.encode()).decode()
+        self.webid = None
+        if bootstrap:
+            # 在后台预取 ttwid、webid 等会话标识并定时刷新，获取完成后请求不再访问网页
+            if self.session is None:
+                self.session = SessionBootstrap(self)
+            self.session.keep_ms_token = ms_token_from_cookie
+            self.session.start()
 
 
     def get_uid(self):
         if self.uid is None:
             self.uid = DouyinAPI.get_my_uid(self)
         return self.uid
+
+    def get_csrf_token(self):
+        """获取 x-secsdk-csrf-token，过期前复用缓存"""
+        with self._credential_lock:
+            if self._csrf_token is None or time.time() >= self._csrf_expire_at:
+                token = generate_csrf_token(self.cookie_str)[0]
+                # 获取失败时不缓存，下次重新请求
+                self._csrf_token = token
+                self._csrf_expire_at = time.time() + self.CSRF_TOKEN_TTL if token else 0
+            return self._csrf_token
+
+    def get_ree_key(self):
+        """获取 bd-ticket-guard-ree-public-key，只依赖私钥，私钥不变时不重复计算"""
+        with self._credential_lock:
+            if self._ree_key is None or self._ree_key_source != self.private_key:
+                self._ree_key = generate_ree_key(self.private_key)
+                self._ree_key_source = self.private_key
+            return self._ree_key
+
+    def invalidate_credentials(self):
+        """作废缓存的 csrf token，请求返回 403 或 cookie 变化时调用"""
+        with self._credential_lock:
+            self._csrf_token = None
+            self._csrf_expire_at = 0
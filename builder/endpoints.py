@@ -0,0 +1,309 @@
+# coding=utf-8
+"""
+接口注册表，每个接口的固定参数和请求头在导入时构建一次并冻结
+调用时只合并变化的参数，序列化时复用预先编码好的固定参数片段
+各接口的 version_code 等取值沿用原实现，未做统一
+"""
+import urllib.parse
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from builder.header import HeaderBuilder, HeaderType
+
+DOUYIN_URL = 'https://www.douyin.com'
+LIVE_URL = 'https://live.douyin.com'
+
+
+class _Required:
+    """占位符，调用时必须提供的参数"""
+
+    def __repr__(self):
+        return 'REQUIRED'
+
+
+REQUIRED = _Required()
+
+
+def _quote(value: Any) -> str:
+    # 与 utils.dy_util.splice_url 的编码方式保持一致
+    return urllib.parse.quote(str('' if value is None else value))
+
+
+def client_params(round_trip_time: str = '100', downlink: str = '10', screen=('1707', '960'),
+                  browser_version: str = '125.0.0.0', cpu_core_num: str = '32') -> Tuple[Tuple[str, str], ...]:
+    """浏览器环境参数（cookie_enabled 到 round_trip_time）"""
+    return (
+        ('cookie_enabled', 'true'),
+        ('screen_width', screen[0]),
+        ('screen_height', screen[1]),
+        ('browser_language', 'zh-CN'),
+        ('browser_platform', 'Win32'),
+        ('browser_name', 'Edge'),
+        ('browser_version', browser_version),
+        ('browser_online', 'true'),
+        ('engine_name', 'Blink'),
+        ('engine_version', browser_version),
+        ('os_name', 'Windows'),
+        ('os_version', '10'),
+        ('cpu_core_num', cpu_core_num),
+        ('device_memory', '8'),
+        ('platform', 'PC'),
+        ('downlink', downlink),
+        ('effective_type', '4g'),
+        ('round_trip_time', round_trip_time),
+    )
+
+
+def version_params(version_code: str = '170400', version_name: str = '17.4.0') -> Tuple[Tuple[str, str], ...]:
+    """版本参数（update_version_code 到 version_name）"""
+    return (
+        ('update_version_code', '170400'),
+        ('pc_client_type', '1'),
+        ('version_code', version_code),
+        ('version_name', version_name),
+    )
+
+
+WEB_PARAMS = (
+    ('device_platform', 'webapp'),
+    ('aid', '6383'),
+    ('channel', 'channel_pc_web'),
+)
+
+
+class Endpoint:
+    """接口定义"""
+
+    def __init__(self, name: str, path: str, params: Iterable[Tuple[str, Any]],
+                 signed_tail: Tuple[str, ...] = ('webid', 'msToken'), unsigned_tail: Tuple[str, ...] = (),
+                 header_type: HeaderType = HeaderType.GET, extra_headers: Optional[Dict[str, str]] = None,
+                 base_url: str = DOUYIN_URL, method: str = 'GET'):
+        """
+        :param name: 接口名.
+        :param path: 接口路径.
+        :param params: 固定参数, 按请求顺序排列, 值为 REQUIRED 的参数调用时必须提供.
+        :param signed_tail: 参与 a_bogus 签名的认证参数(webid, verifyFp, fp, msToken), 按顺序追加在固定参数之后.
+        :param unsigned_tail: 追加在 a_bogus 之后、不参与签名的认证参数.
+        :param header_type: 请求头类型.
+        :param extra_headers: 额外的固定请求头.
+        :param base_url: 接口域名.
+        :param method: 请求方法.
+        """
+        self.name = name
+        self.path = path
+        self.url = f'{base_url}{path}'
+        self.method = method
+        self.signed_tail = signed_tail
+        self.unsigned_tail = unsigned_tail
+        self.params = MappingProxyType(dict(params))
+        headers = HeaderBuilder.build(header_type).get()
+        headers.update(extra_headers or {})
+        self.headers = MappingProxyType(headers)
+        # 固定参数预先编码好的 key=value 片段
+        self._fragments = MappingProxyType({
+            key: f'{key}={_quote(value)}' for key, value in self.params.items() if value is not REQUIRED
+        })
+
+    def build_params(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """合并调用参数，保持固定参数的顺序"""
+        params = dict(self.params)
+        if overrides:
+            params.update(overrides)
+        missing = [key for key, value in params.items() if value is REQUIRED]
+        if missing:
+            raise ValueError(f'{self.name} 缺少参数: {", ".join(missing)}')
+        return params
+
+    def build_headers(self, referer: Optional[str] = None) -> Dict[str, str]:
+        """复制固定请求头并设置 referer"""
+        headers = dict(self.headers)
+        if referer is not None:
+            headers['referer'] = referer
+        return headers
+
+    def serialize(self, params: Dict[str, Any]) -> str:
+        """
+        生成 a_bogus 签名所用的查询字符串，与 splice_url(params) 结果一致
+        值未被覆盖的固定参数直接使用预编码片段
+        """
+        fixed = self.params
+        fragments = self._fragments
+        parts = []
+        for key, value in params.items():
+            fragment = fragments.get(key)
+            if fragment is not None and value is fixed[key]:
+                parts.append(fragment)
+            else:
+                parts.append(f'{key}={_quote(value)}')
+        return '&'.join(parts)
+
+    def __repr__(self):
+        return f'Endpoint({self.name}, {self.method} {self.path})'
+
+
+@dataclass
+class PreparedRequest:
+    """已签名、可直接发送的请求"""
+    endpoint: Endpoint
+    headers: Dict[str, str]
+    params: Dict[str, Any]
+    data: Optional[Dict[str, Any]] = None
+    timings: Dict[str, float] = field(default_factory=dict)  # 准备阶段耗时(webid / sign), 计入请求指标
+
+
+USER_WORK = Endpoint('user_work', '/aweme/v1/web/aweme/post/', WEB_PARAMS + (
+    ('sec_user_id', REQUIRED),
+    ('max_cursor', REQUIRED),
+    ('locate_query', 'false'),
+    ('show_live_replay_strategy', '1'),
+    ('need_time_list', REQUIRED),
+    ('time_list_query', '0'),
+    ('whale_cut_token', ''),
+    ('cut_version', '1'),
+    ('count', '18'),
+    ('publish_video_strategy_type', '2'),
+) + version_params('290100', '29.1.0') + client_params(), signed_tail=('webid', 'verifyFp', 'fp', 'msToken'))
+
+WORK_DETAIL = Endpoint('work_detail', '/aweme/v1/web/aweme/detail/', WEB_PARAMS + (
+    ('aweme_id', REQUIRED),
+) + version_params('190500', '19.5.0') + client_params('150', '4.75'), unsigned_tail=('verifyFp', 'fp'))
+
+COMMENT_LIST = Endpoint('comment_list', '/aweme/v1/web/comment/list/', WEB_PARAMS + (
+    ('aweme_id', REQUIRED),
+    ('cursor', REQUIRED),
+    ('count', '5'),
+    ('item_type', '0'),
+    ('whale_cut_token', ''),
+    ('cut_version', '1'),
+    ('rcFT', ''),
+) + version_params() + client_params('0'), signed_tail=('webid', 'verifyFp', 'fp', 'msToken'))
+
+COMMENT_REPLY_LIST = Endpoint('comment_reply_list', '/aweme/v1/web/comment/list/reply/', WEB_PARAMS + (
+    ('item_id', REQUIRED),
+    ('comment_id', REQUIRED),
+    ('cut_version', '1'),
+    ('cursor', REQUIRED),
+    ('count', '3'),
+    ('item_type', '0'),
+) + version_params() + client_params('0'), signed_tail=('webid', 'verifyFp', 'fp', 'msToken'))
+
+USER_PROFILE = Endpoint('user_profile', '/aweme/v1/web/user/profile/other/', WEB_PARAMS + (
+    ('publish_video_strategy_type', '2'),
+    ('source', 'channel_pc_web'),
+    ('sec_user_id', REQUIRED),
+    ('personal_center_strategy', '1'),
+) + version_params() + client_params(), signed_tail=('webid', 'msToken', 'verifyFp', 'fp'))
+
+SEARCH_GENERAL = Endpoint('search_general', '/aweme/v1/web/general/search/single/', WEB_PARAMS + (
+    ('search_channel', 'aweme_general'),
+    ('enable_history', '1'),
+    ('filter_selected', REQUIRED),
+    ('keyword', REQUIRED),
+    ('search_source', 'tab_search'),
+    ('query_correct_type', '1'),
+    ('is_filter_search', '1'),
+    ('from_group_id', ''),
+    ('offset', REQUIRED),
+    ('count', '25'),
+    ('need_filter_settings', REQUIRED),
+    ('list_type', 'single'),
+) + version_params('190600', '19.6.0') + client_params('50'))
+
+SEARCH_USER = Endpoint('search_user', '/aweme/v1/web/discover/search', WEB_PARAMS + (
+    ('search_channel', 'aweme_user_web'),
+    ('search_filter_value', REQUIRED),
+    ('keyword', REQUIRED),
+    ('search_source', 'switch_tab'),
+    ('query_correct_type', '1'),
+    ('is_filter_search', '1'),
+    ('offset', REQUIRED),
+    ('count', REQUIRED),
+    ('need_filter_settings', REQUIRED),
+    ('list_type', 'single'),
+) + version_params() + client_params('150'))
+
+SEARCH_LIVE = Endpoint('search_live', '/aweme/v1/web/live/search/', WEB_PARAMS + (
+    ('search_channel', 'aweme_live'),
+    ('keyword', REQUIRED),
+    ('search_source', 'normal_search'),
+    ('query_correct_type', '1'),
+    ('is_filter_search', '0'),
+    ('from_group_id', ''),
+    ('offset', REQUIRED),
+    ('count', REQUIRED),
+    ('need_filter_settings', REQUIRED),
+    ('list_type', 'single'),
+) + version_params() + client_params('50'))
+
+LIVE_PROMOTIONS = Endpoint('live_promotions', '/live/promotions/page/', WEB_PARAMS + (
+    ('room_id', REQUIRED),
+    ('author_id', REQUIRED),
+    ('offset', REQUIRED),
+    ('limit', '20'),
+    ('pc_client_type', '1'),
+    ('version_code', '210800'),
+    ('version_name', '21.8.0'),
+) + client_params('50', screen=('2560', '1440'), browser_version='121.0.0.0', cpu_core_num='20'),
+    extra_headers={'origin': LIVE_URL}, base_url=LIVE_URL, method='POST')
+
+COLLECT_LIST = Endpoint('collect_list', '/aweme/v1/web/collects/list/', WEB_PARAMS + (
+    ('cursor', '0'),
+    ('count', '20'),
+) + version_params() + client_params('200', '5.95'), unsigned_tail=('verifyFp', 'fp'))
+
+USER_FOLLOWER_LIST = Endpoint('user_follower_list', '/aweme/v1/web/user/follower/list/', WEB_PARAMS + (
+    ('user_id', REQUIRED),
+    ('sec_user_id', REQUIRED),
+    ('offset', '0'),
+    ('min_time', '0'),
+    ('max_time', REQUIRED),
+    ('count', REQUIRED),
+    ('source_type', REQUIRED),
+    ('gps_access', '0'),
+    ('address_book_access', '0'),
+) + version_params() + client_params('150'), unsigned_tail=('verifyFp', 'fp'))
+
+USER_FOLLOWING_LIST = Endpoint('user_following_list', '/aweme/v1/web/user/following/list/', WEB_PARAMS + (
+    ('user_id', REQUIRED),
+    ('sec_user_id', REQUIRED),
+    ('offset', '0'),
+    ('min_time', '0'),
+    ('max_time', REQUIRED),
+    ('count', REQUIRED),
+    ('source_type', REQUIRED),
+    ('gps_access', '0'),
+    ('address_book_access', '0'),
+    ('is_top', '1'),
+) + version_params() + client_params('150'), unsigned_tail=('verifyFp', 'fp'))
+
+NOTICE_LIST = Endpoint('notice_list', '/aweme/v1/web/notice/', WEB_PARAMS + (
+    ('is_new_notice', '1'),
+    ('is_mark_read', '1'),
+    ('notice_group', REQUIRED),
+    ('count', REQUIRED),
+    ('min_time', REQUIRED),
+    ('max_time', REQUIRED),
+) + version_params() + client_params('50'), unsigned_tail=('verifyFp', 'fp'))
+
+FEED = Endpoint('feed', '/aweme/v1/web/module/feed/', WEB_PARAMS + (
+    ('module_id', '3003101'),
+    ('count', REQUIRED),
+    ('filterGids', ''),
+    ('presented_ids', ''),
+    ('refresh_index', REQUIRED),
+    ('refer_id', ''),
+    ('refer_type', '10'),
+    ('awemePcRecRawData', '{"is_client":false}'),
+    ('Seo-Flag', '0'),
+    ('install_time', '1715480185'),
+    ('pc_client_type', '1'),
+    ('update_version_code', '170400'),
+    ('version_code', '170400'),
+    ('version_name', '17.4.0'),
+) + client_params(), unsigned_tail=('verifyFp', 'fp'))
+
+ENDPOINTS = MappingProxyType({endpoint.name: endpoint for endpoint in (
+    USER_WORK, WORK_DETAIL, COMMENT_LIST, COMMENT_REPLY_LIST, USER_PROFILE, SEARCH_GENERAL, SEARCH_USER,
+    SEARCH_LIVE, LIVE_PROMOTIONS, COLLECT_LIST, USER_FOLLOWER_LIST, USER_FOLLOWING_LIST, NOTICE_LIST, FEED,
+)})
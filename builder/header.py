@@ -18,7 +18,8 @@ class Header:
     def with_bd(self, api, auth):
         self.set_header('bd-ticket-guard-client-data', generate_bd_ticket_client_data(api, auth.ticket, auth.ts_sign, auth.private_key))
         self.set_header('bd-ticket-guard-iteration-version', '1')
-        self.set_header('bd-ticket-guard-ree-public-key', generate_ree_key(auth.private_key))
+        ree_key = auth.get_ree_key() if hasattr(auth, 'get_ree_key') else generate_ree_key(auth.private_key)
+        self.set_header('bd-ticket-guard-ree-public-key', ree_key)
         self.set_header('bd-ticket-guard-version', '2')
         self.set_header('bd-ticket-guard-web-version', '1')
 
@@ -26,8 +27,12 @@ class Header:
         self.headers[key] = value
         return self
 
-    def with_csrf(self, cookie_str):
-        self.set_header('x-secsdk-csrf-token', generate_csrf_token(cookie_str)[0])
+    def with_csrf(self, auth):
+        # 传入 DouyinAuth 时使用其缓存的 token，传入 cookie 字符串时每次重新获取
+        if isinstance(auth, str):
+            self.set_header('x-secsdk-csrf-token', generate_csrf_token(auth)[0])
+        else:
+            self.set_header('x-secsdk-csrf-token', auth.get_csrf_token())
 
     def set_referer(self, url):
         self.set_header('referer', url)
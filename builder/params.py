@@ -42,7 +42,10 @@ class Params:
         return self
 
     def with_web_id(self, auth=None, url="", fake=False):
-        webid = generate_fake_webid() if fake else generate_webid(auth, url)
+        if fake:
+            webid = generate_fake_webid()
+        else:
+            webid = getattr(auth, 'webid', None) or generate_webid(auth, url)
         self.params['webid'] = webid
         return self
 
@@ -9,7 +9,6 @@ import random
 
 import uuid
 
-import static.Request_pb2 as RequestProto
 from builder.header import HeaderBuilder
 from utils.dy_util import generate_webid, generate_req_sign, generate_millisecond
 
@@ -17,6 +16,8 @@ from utils.dy_util import generate_webid, generate_req_sign, generate_millisecon
 class ProtoBuilder:
     @staticmethod
     def build_normal_request(auth, cmd):
+        # protobuf 只在构建私信请求时才加载
+        import static.Request_pb2 as RequestProto
         request = RequestProto.Request()
         request.cmd = cmd
         request.sequence_id = random.randint(10000, 11000)
@@ -43,7 +44,7 @@ class ProtoBuilder:
         request.headers['referer'] = ''
         request.headers['timezone_name'] = 'Etc/GMT-8'
         request.headers['deviceId'] = '0'
-        request.headers['webid'] = generate_webid()
+        request.headers['webid'] = getattr(auth, 'webid', None) or generate_webid(auth)
         request.headers['fp'] = auth.cookie['s_v_web_id']
         request.headers['is-retry'] = '0'
         request.auth_type = 4
@@ -76,6 +77,7 @@ class ProtoBuilder:
 
     @staticmethod
     def build_send_message_request(auth, conversation_id, conversation_short_id, ticket, message):
+        import static.Request_pb2 as RequestProto
         client_message_id = str(uuid.uuid4())
         request = ProtoBuilder.build_normal_request(auth, 100)
         msg_content = {
@@ -0,0 +1,210 @@
+# coding=utf-8
+"""
+会话标识预取
+ttwid、webid、msToken、s_v_web_id 在创建 auth 时交给后台线程并行生成并校验，保存在 auth 上，之后按固定间隔刷新
+所有 auth 共用一个后台刷新线程，创建 auth 不阻塞；后台获取完成前请求照旧按需访问网页获取 webid
+请求路径上只读取缓存，不再触发网络请求
+"""
+import heapq
+import itertools
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from utils.dy_util import generate_ttwid, generate_webid, generate_msToken, generate_fake_webid, generate_s_v_web_id
+
+# 默认刷新间隔(秒)
+DEFAULT_REFRESH_INTERVAL = 3600
+# 获取 webid 失败改用随机 webid 后，首次重试的间隔(秒)，之后每次失败加倍，最长为刷新间隔
+WEBID_RETRY_INTERVAL = 60
+
+# 各标识的校验规则
+_VALIDATORS: Dict[str, Callable[[Optional[str]], bool]] = {
+    'ttwid': lambda value: bool(value),
+    'webid': lambda value: bool(value) and re.fullmatch(r'\d{15,20}', value) is not None,
+    'msToken': lambda value: bool(value) and len(value) >= 100,
+    's_v_web_id': lambda value: bool(value) and value.startswith('verify_'),
+}
+
+
+class _SessionRefresher:
+    """所有 SessionBootstrap 共用的后台线程，按到期时间依次获取或刷新会话标识"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, session: 'SessionBootstrap', due: float):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), weakref.ref(session)))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='session-refresh', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    self._cond.wait(self._heap[0][0] - time.time() if self._heap else None)
+                due, _, ref = heapq.heappop(self._heap)
+            # auth 已被回收时直接丢弃
+            session = ref()
+            if session is not None:
+                session._run_scheduled(due)
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _get_refresher() -> _SessionRefresher:
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                _refresher = _SessionRefresher()
+    return _refresher
+
+
+class SessionBootstrap:
+    """为 DouyinAuth 预取并定期刷新会话标识"""
+
+    def __init__(self, auth, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        """
+        :param auth: DouyinAuth object, 需已设置 cookie.
+        :param refresh_interval: 刷新间隔(秒), 0 表示不自动刷新.
+        """
+        self.auth = auth
+        self.refresh_interval = refresh_interval
+        self.bootstrapped_at = 0.0
+        # cookie 中自带 msToken 时定时刷新也保留, 由 perepare_auth 设置
+        self.keep_ms_token = False
+        # 当前 webid 是否为获取失败后使用的随机值
+        self.webid_fallback = False
+        self._webid_retry_delay = WEBID_RETRY_INTERVAL
+        self._lock = threading.Lock()
+        # 已安排的下次执行时间, None 表示已停止; 与此不一致的安排视为已作废
+        self._due: Optional[float] = None
+
+    def _fetch_webid(self) -> str:
+        webid = generate_webid(self.auth, fallback=False)
+        if _VALIDATORS['webid'](webid):
+            self._webid_found()
+            return webid
+        self.webid_fallback = True
+        logger.warning(f"获取 webid 失败, 暂时使用随机 webid, {self._webid_retry_delay} 秒后重试")
+        return generate_fake_webid()
+
+    def _webid_found(self):
+        self.webid_fallback = False
+        self._webid_retry_delay = WEBID_RETRY_INTERVAL
+
+    def retry_webid(self) -> bool:
+        """
+        使用随机 webid 期间重新获取 webid, 失败时加倍重试间隔
+        :return: 是否获取成功.
+        """
+        webid = generate_webid(self.auth, fallback=False)
+        if not _VALIDATORS['webid'](webid):
+            self._webid_retry_delay = min(self._webid_retry_delay * 2,
+                                          max(self.refresh_interval, WEBID_RETRY_INTERVAL))
+            logger.warning(f"重新获取 webid 失败, {self._webid_retry_delay} 秒后重试")
+            return False
+        with self._lock:
+            self.auth.webid = webid
+        self._webid_found()
+        logger.info("已重新获取 webid")
+        return True
+
+    def bootstrap(self, refresh: bool = False) -> Dict[str, str]:
+        """
+        生成并校验所有会话标识, 写入 auth.
+        cookie 中已有的 ttwid、msToken、s_v_web_id 优先使用, refresh=True 时重新获取 webid,
+        cookie 没有自带 msToken 时同时生成新的 msToken; ttwid 和 s_v_web_id 与浏览器指纹绑定, 只在缺失或无效时生成.
+        获取期间 auth 的 cookie 被替换(重新设置 cookie)时不写入.
+        :param refresh: 是否为定时刷新.
+        :return: 会话标识.
+        """
+        cookie = self.auth.cookie
+        ttwid = cookie.get('ttwid')
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='session-bootstrap') as executor:
+            # ttwid 和 webid 需要请求网页, 并行获取
+            ttwid_future = None if _VALIDATORS['ttwid'](ttwid) else executor.submit(generate_ttwid)
+            webid_future = executor.submit(self._fetch_webid)
+            ms_token = self.auth.msToken
+            if not _VALIDATORS['msToken'](ms_token) or (refresh and not self.keep_ms_token):
+                ms_token = generate_msToken()
+            s_v_web_id = cookie.get('s_v_web_id', '')
+            if not _VALIDATORS['s_v_web_id'](s_v_web_id):
+                s_v_web_id = generate_s_v_web_id()
+            if ttwid_future is not None:
+                ttwid = ttwid_future.result()
+            webid = webid_future.result()
+
+        session = {'ttwid': ttwid, 'webid': webid, 'msToken': ms_token, 's_v_web_id': s_v_web_id}
+        invalid = [key for key, value in session.items() if not _VALIDATORS[key](value)]
+        if invalid:
+            logger.warning(f"会话标识校验未通过: {', '.join(invalid)}")
+        with self._lock:
+            if self.auth.cookie is not cookie:
+                logger.debug("获取会话标识期间 cookie 已更新, 丢弃本次结果")
+                return session
+            # 替换而不是原地修改 cookie, 避免与正在发送的请求冲突
+            cookie = dict(cookie)
+            if ttwid:
+                cookie['ttwid'] = ttwid
+            cookie['msToken'] = ms_token
+            cookie['s_v_web_id'] = s_v_web_id
+            self.auth.cookie = cookie
+            self.auth.ttwid = ttwid
+            self.auth.webid = webid
+            self.auth.msToken = ms_token
+            self.auth.cookie_str = "; ".join([f"{k}={str(v)}" for k, v in cookie.items()])
+            self.bootstrapped_at = time.time()
+        return session
+
+    def _schedule(self, due: float):
+        self._due = due
+        _get_refresher().schedule(self, due)
+
+    def _run_scheduled(self, due: float):
+        """由后台线程调用: 首次获取、定时刷新, 或在使用随机 webid 期间重试获取 webid"""
+        if self._due != due:
+            return
+        try:
+            if self.bootstrapped_at and self.webid_fallback \
+                    and time.time() < self.bootstrapped_at + self.refresh_interval:
+                self.retry_webid()
+            else:
+                self.bootstrap(refresh=bool(self.bootstrapped_at))
+                logger.debug("会话标识已刷新")
+        except Exception as e:
+            logger.error(f"刷新会话标识失败: {e}")
+        if self._due != due:
+            # 执行期间已停止或重新启动
+            return
+        now = time.time()
+        candidates = []
+        if self.refresh_interval > 0:
+            candidates.append((self.bootstrapped_at or now) + self.refresh_interval)
+        if self.webid_fallback or not self.bootstrapped_at:
+            candidates.append(now + self._webid_retry_delay)
+        if candidates:
+            self._schedule(min(candidates))
+        else:
+            self._due = None
+
+    def start(self):
+        """在共用的后台线程中立即获取会话标识, 之后定时刷新; 不等待获取完成"""
+        self._schedule(time.time())
+
+    def stop(self):
+        self._due = None
@@ -0,0 +1,190 @@
+# coding=utf-8
+"""
+评论树爬取，一级评论翻页的同时用有限线程池并发获取各条评论的二级评论
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from dy_apis.douyin_api import DouyinAPI
+from dy_apis.request_scheduler import bind_priority
+
+# 评论接口单页可取的最大数量
+MAX_OUT_COMMENT_COUNT = 20
+MAX_INNER_COMMENT_COUNT = 20
+# 评论按热度排序, 增量模式下连续这么多页都是已保存的评论时才停止翻页
+KNOWN_PAGES_TO_STOP = 3
+
+
+class CommentCrawler:
+    """作品评论树爬虫"""
+
+    def __init__(self, auth, max_workers: int = 4, max_comments: Optional[int] = None,
+                 time_budget: Optional[float] = None, out_count: int = MAX_OUT_COMMENT_COUNT,
+                 inner_count: int = MAX_INNER_COMMENT_COUNT):
+        """
+        :param auth: DouyinAuth object.
+        :param max_workers: 并发获取二级评论的线程数.
+        :param max_comments: 最多获取的评论数(含二级评论), None 表示不限.
+        :param time_budget: 最长耗时(秒), None 表示不限.
+        :param out_count: 一级评论每页数量.
+        :param inner_count: 二级评论每页数量.
+        """
+        self.auth = auth
+        self.max_workers = max(int(max_workers), 1)
+        self.max_comments = max_comments
+        self.time_budget = time_budget
+        self.out_count = str(out_count)
+        self.inner_count = str(inner_count)
+        self._lock = threading.Lock()
+        self._fetched = 0
+        self._deadline = None
+
+    def _add_fetched(self, num: int):
+        with self._lock:
+            self._fetched += num
+
+    def budget_exhausted(self) -> bool:
+        """评论数或时间预算是否已用完"""
+        if self.max_comments is not None and self._fetched >= self.max_comments:
+            return True
+        if self._deadline is not None and time.time() >= self._deadline:
+            return True
+        return False
+
+    def _fetch_replies(self, comment: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        获取一条一级评论的全部二级评论，预算用完或出错时返回已获取的部分
+        :return: (二级评论列表, 是否已获取全部回复)
+        """
+        replies = []
+        complete = False
+        try:
+            for page in DouyinAPI.iter_work_inner_comment_pages(self.auth, comment, count=self.inner_count):
+                replies.extend(page.items)
+                self._add_fetched(len(page.items))
+                # 响应缺少评论字段时翻页会提前结束, 只有最后一页明确没有下一页才算获取完整
+                complete = not page.cursor.has_more
+                if self.budget_exhausted():
+                    break
+        except Exception as e:
+            logger.error(f"获取评论 {comment.get('cid')} 的回复失败: {e}")
+            complete = False
+        return replies, complete
+
+    def crawl(self, url: str, on_page=None, on_replies=None, reply_filter=None) -> List[Dict[str, Any]]:
+        """
+        爬取作品评论树
+        :param url: 作品URL.
+        :param on_page: on_page(comments) 每获取一页一级评论时回调, 返回 False 时停止翻页.
+        :param on_replies: on_replies(comment, replies, complete) 每条评论的二级评论获取完成时回调,
+            complete 为 False 表示因出错或预算用完只获取了部分回复.
+        :param reply_filter: reply_filter(comment) 返回 False 时不获取该评论的二级评论.
+        :return: 一级评论列表, 二级评论在 comment['reply_comment'] 中.
+        """
+        self._fetched = 0
+        self._deadline = time.time() + self.time_budget if self.time_budget is not None else None
+        comments: List[Dict[str, Any]] = []
+        futures = {}
+
+        def harvest(done):
+            for future in done:
+                comment = futures.pop(future)
+                if not future.cancelled():
+                    self._attach_replies(comment, *future.result(), on_replies=on_replies)
+
+        fetch_replies = bind_priority(self._fetch_replies)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for page in DouyinAPI.iter_work_out_comment_pages(self.auth, url, count=self.out_count):
+                self._add_fetched(len(page.items))
+                stop = on_page is not None and on_page(page.items) is False
+                for comment in page.items:
+                    comment['reply_comment'] = []
+                    comments.append(comment)
+                    if comment.get('reply_comment_total', 0) > 0 and (reply_filter is None or reply_filter(comment)):
+                        futures[executor.submit(fetch_replies, comment)] = comment
+                # 翻页的同时处理已完成的二级评论
+                harvest([future for future in futures if future.done()])
+                if stop:
+                    break
+                if self.budget_exhausted():
+                    logger.info(f"评论预算已用完, 停止翻页: {url}")
+                    break
+
+            timeout = max(self._deadline - time.time(), 0) if self._deadline is not None else None
+            done, not_done = wait(list(futures), timeout=timeout)
+            # 未开始的直接取消; 已在执行的无法取消, 预算用完后会在当前页结束并返回部分回复
+            for future in not_done:
+                future.cancel()
+            harvest(done)
+        # 线程池退出时执行中的任务均已结束, 保存其部分回复(complete=False)
+        harvest([future for future in futures if not future.cancelled()])
+
+        logger.info(f"获取作品评论 {len(comments)} 条, 共计 {self._fetched} 条(含回复): {url}")
+        return comments
+
+    def crawl_to_database(self, url: str, incremental: bool = True, db=None) -> Dict[str, int]:
+        """
+        爬取作品评论并逐页写入数据库
+        增量模式下连续 KNOWN_PAGES_TO_STOP 页都是已保存的一级评论时停止翻页(评论按热度排序, 新评论不一定在第一页),
+        只重新获取回复数比上次完整抓取时增加的二级评论
+        :param url: 作品URL.
+        :param incremental: 是否增量爬取.
+        :param db: Database 实例，默认使用全局实例.
+        :return: 统计信息.
+        """
+        if db is None:
+            from utils.database import get_database
+            db = get_database()
+        stats = {'comments': 0, 'new_comments': 0, 'reply_threads': 0, 'new_replies': 0}
+        crawl_state = {}
+        known_pages = 0
+
+        def on_page(comments):
+            nonlocal crawl_state, known_pages
+            if not comments:
+                return True
+            if stats['comments'] == 0 and incremental:
+                crawl_state = db.get_comment_crawl_state(comments[0].get('aweme_id', ''))
+            stats['comments'] += len(comments)
+            stats['new_comments'] += db.save_comments(comments)
+            if not incremental or not crawl_state:
+                return True
+            if all(str(c.get('cid')) in crawl_state for c in comments):
+                known_pages += 1
+            else:
+                known_pages = 0
+            if known_pages >= KNOWN_PAGES_TO_STOP:
+                logger.info(f"连续 {known_pages} 页都是已保存的评论, 停止翻页: {url}")
+                return False
+            return True
+
+        def reply_filter(comment):
+            if not incremental:
+                return True
+            return comment.get('reply_comment_total', 0) > crawl_state.get(str(comment.get('cid')), 0)
+
+        def on_replies(comment, replies, complete):
+            stats['reply_threads'] += 1
+            # 只获取了部分回复时不记录回复总数, 下次增量爬取会重新获取这条评论的回复
+            reply_total = comment.get('reply_comment_total', 0) if complete else None
+            stats['new_replies'] += db.save_comment_replies(comment.get('cid'), replies, reply_total)
+
+        self.crawl(url, on_page=on_page, on_replies=on_replies, reply_filter=reply_filter)
+        logger.info(f"评论入库完成 {url}: {stats}")
+        return stats
+
+    @staticmethod
+    def _attach_replies(comment: Dict[str, Any], replies: List[Dict[str, Any]], complete: bool = True,
+                        on_replies=None):
+        """按 reply_id 把二级评论挂到对应的一级评论下"""
+        cid = comment.get('cid')
+        matched = [reply for reply in replies if str(reply.get('reply_id') or '0') in ('0', str(cid))]
+        if len(matched) != len(replies):
+            logger.warning(f"评论 {cid} 有 {len(replies) - len(matched)} 条回复不属于该评论, 已丢弃")
+        comment['reply_comment'] = matched
+        if on_replies is not None:
+            on_replies(comment, matched, complete)
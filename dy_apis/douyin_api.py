@@ -5,19 +5,24 @@ import time
 import urllib
 import uuid
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 
 import requests
 requests.packages.urllib3.disable_warnings()
-from bs4 import BeautifulSoup
-from protobuf_to_dict import protobuf_to_dict
 from loguru import logger
 
-import static.Response_pb2 as ResponseProto
+from builder import endpoints
+from builder.endpoints import Endpoint, PreparedRequest
 from builder.header import HeaderBuilder, HeaderType
 from builder.params import Params
 from builder.proto import ProtoBuilder
-from utils.dy_util import splice_url, generate_a_bogus, generate_msToken, trans_cookies
+from utils.dy_util import splice_url, generate_a_bogus, generate_msToken, trans_cookies, generate_webid
+from utils.url_util import resolve_aweme_id, to_video_url
+from dy_apis.pagination import Page, iter_pages, iter_items, iter_checkpointed, DEFAULT_CHECKPOINT_EVERY
+from dy_apis.sign_pipeline import SignAheadPipeline
+from dy_apis.request_scheduler import get_request_scheduler
+from dy_apis.response_decoder import decode_response
+from dy_apis.request_metrics import track_request
 
 
 
@@ -30,27 +35,155 @@ class DouyinAPI:
         """初始化DouyinAPI"""
         self.auth = auth
 
+    @staticmethod
+    def _prepare(auth, endpoint: Endpoint, referer: str, params: Optional[Dict[str, Any]] = None,
+                 data: Optional[Dict[str, Any]] = None) -> PreparedRequest:
+        """
+        按接口注册表构建并签名请求.
+        :param auth: DouyinAuth object.
+        :param endpoint: 接口定义.
+        :param referer: 请求来源页面, 同时用于获取webid.
+        :param params: 本次调用的参数.
+        :param data: 表单数据.
+        :return: PreparedRequest.
+        """
+        query = endpoint.build_params(params)
+        timings = {}
+
+        def webid():
+            # 已预取会话标识时直接使用, 否则请求网页获取
+            if getattr(auth, 'webid', None):
+                return auth.webid
+            start = time.perf_counter()
+            try:
+                return generate_webid(auth, referer)
+            finally:
+                timings['webid'] = time.perf_counter() - start
+
+        auth_values = {
+            "webid": webid,
+            "verifyFp": lambda: auth.cookie['s_v_web_id'],
+            "fp": lambda: auth.cookie['s_v_web_id'],
+            "msToken": lambda: auth.msToken,
+        }
+        for key in endpoint.signed_tail:
+            query[key] = auth_values[key]()
+        start = time.perf_counter()
+        query["a_bogus"] = generate_a_bogus(endpoint.serialize(query), splice_url(data) if data is not None else '')
+        timings['sign'] = time.perf_counter() - start
+        for key in endpoint.unsigned_tail:
+            query[key] = auth_values[key]()
+        return PreparedRequest(endpoint, endpoint.build_headers(referer), query, data, timings)
+
+    @staticmethod
+    def _send(auth, prepared: PreparedRequest) -> dict:
+        """
+        发送已签名的请求.
+        :param auth: DouyinAuth object.
+        :param prepared: PreparedRequest.
+        :return: JSON, 有投影结构的接口只包含投影字段.
+        """
+        endpoint = prepared.endpoint
+        with track_request(endpoint.name, endpoint.method, prepared.timings) as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                resp = requests.request(endpoint.method, endpoint.url, headers=prepared.headers,
+                                        cookies=auth.cookie, params=prepared.params, data=prepared.data, verify=False)
+            record.set_response(resp)
+            with record.phase('decode'):
+                return decode_response(resp.content, endpoint.name)
+
+    @staticmethod
+    def _request(auth, endpoint: Endpoint, referer: str, params: Optional[Dict[str, Any]] = None,
+                 data: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        按接口注册表发送请求.
+        :param auth: DouyinAuth object.
+        :param endpoint: 接口定义.
+        :param referer: 请求来源页面, 同时用于获取webid.
+        :param params: 本次调用的参数.
+        :param data: 表单数据.
+        :return: JSON.
+        """
+        return DouyinAPI._send(auth, DouyinAPI._prepare(auth, endpoint, referer, params, data))
+
+    @staticmethod
+    def _post_authenticated(auth, url: str, build_headers, **kwargs) -> requests.Response:
+        """
+        发送带 csrf / bd-ticket-guard 凭证的 POST 请求, 返回 403 时作废缓存的凭证并重试一次.
+        :param auth: DouyinAuth object.
+        :param url: 请求地址.
+        :param build_headers: build_headers() -> 请求头, 重试时重新构建.
+        :return: Response.
+        """
+        with track_request(urllib.parse.urlparse(url).path, 'POST') as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                res = requests.post(url, headers=build_headers(), cookies=auth.cookie, verify=False, **kwargs)
+            record.set_response(res)
+            if res.status_code == 403 and hasattr(auth, 'invalidate_credentials'):
+                logger.warning(f"请求返回403, 刷新凭证后重试: {url}")
+                auth.invalidate_credentials()
+                record.retries += 1
+                record.add_phase('queue', get_request_scheduler().acquire())
+                with record.phase('network'):
+                    res = requests.post(url, headers=build_headers(), cookies=auth.cookie, verify=False, **kwargs)
+                record.set_response(res)
+        return res
 
     @staticmethod
-    def get_user_all_work_info(auth, user_url: str, **kwargs) -> list:
+    def _pipelined_fetch(auth, prepare, pipeline: Optional[SignAheadPipeline], step: int):
+        """
+        生成按 offset 翻页的 fetch 函数, 提供 pipeline 时预先签好下一页的请求.
+        下一页的偏移量按上一页实际前进的条数预测, 第一页按 step 预测.
+        :param auth: DouyinAuth object.
+        :param prepare: prepare(offset) -> PreparedRequest.
+        :param pipeline: 预签名流水线, None 表示不预签名.
+        :param step: 第一页预测的偏移量增量.
+        :return: fetch(offset) -> JSON.
+        """
+        if pipeline is None:
+            return lambda o: DouyinAPI._send(auth, prepare(o))
+        last = {'offset': None, 'step': step}
+
+        def predict(o):
+            if last['offset'] is not None and int(o) > int(last['offset']):
+                last['step'] = int(o) - int(last['offset'])
+            last['offset'] = o
+            return str(int(o) + last['step'])
+
+        return pipeline.fetcher(prepare, lambda prepared: DouyinAPI._send(auth, prepared), predict)
+
+    @staticmethod
+    def iter_user_work_pages(auth, user_url: str, max_cursor: str = "0", checkpoint_every: int = 0,
+                             **kwargs) -> Iterator[Page]:
+        """
+        逐页获取用户作品信息.
+        :param auth: DouyinAuth object.
+        :param user_url: 用户主页URL.
+        :param max_cursor: 起始max_cursor.
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
+        :return: 逐页产出 Page, page.cursor.next_cursor 为下一页的max_cursor.
+        """
+        def make_pages(cursor, fetched):
+            return iter_pages(lambda c: DouyinAPI.get_user_work_info(auth, user_url, c),
+                              "aweme_list", lambda res_json, c, items: str(res_json["max_cursor"]),
+                              cursor=max_cursor if cursor is None else cursor)
+
+        if checkpoint_every:
+            return iter_checkpointed(make_pages, "user_work", user_url.split('?')[0], checkpoint_every)
+        return make_pages(None, 0)
+
+    @staticmethod
+    def get_user_all_work_info(auth, user_url: str, checkpoint_every: int = 0, **kwargs) -> list:
         """
         获取用户全部作品信息.
         :param auth: DouyinAuth object.
         :param user_url: 用户主页URL.
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
         :return: 全部作品信息.
         """
-        max_cursor = "0"
-        work_list = []
-        while True:
-            res_json = DouyinAPI.get_user_work_info(auth, user_url, max_cursor)
-            if "aweme_list" not in res_json.keys():
-                break
-            works = res_json["aweme_list"]
-            max_cursor = str(res_json["max_cursor"])
-            work_list.extend(works)
-            if res_json["has_more"] != 1:
-                break
-        return work_list
+        return list(iter_items(DouyinAPI.iter_user_work_pages(auth, user_url, checkpoint_every=checkpoint_every)))
 
 
     @staticmethod
@@ -62,55 +195,12 @@ class DouyinAPI:
         :param max_cursor:  上一次请求的max_cursor.
         :return:
         """
-        api = f"/aweme/v1/web/aweme/post/"
         user_id = user_url.split("/")[-1].split("?")[0]
-        headers = HeaderBuilder().build(HeaderType.GET)
-        headers.set_referer(user_url)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("sec_user_id", user_id)
-        params.add_param("max_cursor", max_cursor)
-        params.add_param("locate_query", 'false')
-        params.add_param("show_live_replay_strategy", '1')
-        params.add_param("need_time_list", '1' if max_cursor == '0' else '0')
-        params.add_param("time_list_query", '0')
-        params.add_param("whale_cut_token", '')
-        params.add_param("cut_version", '1')
-        params.add_param("count", '18')
-        params.add_param("publish_video_strategy_type", '2')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '290100')
-        params.add_param("version_name", '29.1.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '100')
-        params.with_web_id(auth, user_url)
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        params.add_param("msToken",
-                         auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        return json.loads(resp.text)
+        return DouyinAPI._request(auth, endpoints.USER_WORK, user_url, {
+            "sec_user_id": user_id,
+            "max_cursor": max_cursor,
+            "need_time_list": '1' if max_cursor == '0' else '0',
+        })
 
     @staticmethod
     def get_work_info(auth, url: str) -> dict:
@@ -120,155 +210,45 @@ class DouyinAPI:
         :param url: 作品URL.
         :return: JSON.
         """
-        api = f"/aweme/v1/web/aweme/detail/"
-        
-        # 处理短链接
-        if 'v.douyin.com' in url:
-            try:
-                # 发送请求获取重定向后的URL
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                # 不使用代理，直接连接
-                response = requests.get(url, allow_redirects=True, headers=headers, verify=False)
-                print(f"短链接最终URL: {response.url}")
-                
-                # 从最终URL中提取视频ID
-                final_url = response.url
-                
-                # 处理各种格式的URL
-                if 'iesdouyin.com' in final_url:
-                    # 从iesdouyin.com格式中提取ID
-                    # https://www.iesdouyin.com/share/video/7525755905897663790/?region=CN&mid=7525755957479426852&u_code=18b19ml3i&did=MS4wLjABAAAANwkJuWIRFOzg5uCpDRpMj4OX-QryoDgn-yYlXQnRwQQ&iid=MS4wLjABAAAANwkJuWIRFOzg5uCpDRpMj4OX-QryoDgn-yYlXQnRwQQ&with_sec_did=1&titleType=title&share_sign=T70qnCnoIcC5dMdHmhKFE1fJJQNqI0afrCIfsJFpOzU-&share_version=170400&from_ssr=1&from=web_code_link
-                    id_match = re.search(r'/video/(\d+)', final_url)
-                    if id_match:
-                        aweme_id = id_match.group(1)
-                    else:
-                        raise ValueError(f"无法从iesdouyin URL提取视频ID: {final_url}")
-                elif 'douyin.com' in final_url:
-                    # 标准douyin.com格式
-                    if '/video/' in final_url:
-                        id_match = re.search(r'/video/(\d+)', final_url)
-                        if id_match:
-                            aweme_id = id_match.group(1)
-                        else:
-                            aweme_id = final_url.split("/")[-1].split("?")[0]
-                    elif 'modal_id=' in final_url:
-                        aweme_id = re.findall(r'modal_id=(\d+)', final_url)[0]
-                    else:
-                        raise ValueError(f"无法从douyin URL提取视频ID: {final_url}")
-                else:
-                    raise ValueError(f"未知的URL格式: {final_url}")
-                
-                print(f"提取的作品ID: {aweme_id}")
-                url = f'https://www.douyin.com/video/{aweme_id}'
-            except Exception as e:
-                raise ValueError(f"处理短链接失败: {e}")
-        elif 'video' in url:
-            aweme_id = url.split("/")[-1].split("?")[0]
-        elif 'modal_id=' in url:
-            aweme_id = re.findall(r'modal_id=(\d+)', url)[0]
-            url = f'https://www.douyin.com/video/{aweme_id}'
-        else:
-            raise ValueError(f"无法识别的URL格式: {url}")
-        headers = HeaderBuilder().build(HeaderType.GET)
-        headers.set_referer(url)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("aweme_id", aweme_id)
-        params.add_param("update_version_code", "170400")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "190500")
-        params.add_param("version_name", "19.5.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "1707")
-        params.add_param("screen_height", "960")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "125.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "125.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "32")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "4.75")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "150")
-        params.with_web_id(auth, url)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        resp_json = json.loads(resp.text)
-        return resp_json
+        # 短链接只跟随重定向头解析，结果持久化缓存
+        aweme_id = resolve_aweme_id(url)
+        url = to_video_url(aweme_id)
+        return DouyinAPI._request(auth, endpoints.WORK_DETAIL, url, {"aweme_id": aweme_id})
 
     @staticmethod
-    def get_work_out_comment(auth, url: str, cursor: str = '0', **kwargs) -> dict:
+    def get_work_out_comment(auth, url: str, cursor: str = '0', count: str = '5', **kwargs) -> dict:
         """
         获取作品的全部一级评论.
         :param auth: DouyinAuth object.
         :param url: 作品URL.
         :param cursor: 评论游标.
+        :param count: 每页数量.
         :return: JSON.
         """
-        api = f"/aweme/v1/web/comment/list/"
         if 'video' in url:
             aweme_id = url.split("/")[-1].split("?")[0]
         else:
             aweme_id = re.findall(r'modal_id=(\d+)', url)[0]
             url = f'https://www.douyin.com/video/{aweme_id}'
-        headers = HeaderBuilder().build(HeaderType.GET)
-        headers.set_referer(url)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("aweme_id", aweme_id)
-        params.add_param("cursor", cursor)
-        params.add_param("count", "5")
-        params.add_param("item_type", "0")
-        params.add_param("whale_cut_token", "")
-        params.add_param("cut_version", "1")
-        params.add_param("rcFT", "")
-        params.add_param("update_version_code", "170400")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "170400")
-        params.add_param("version_name", "17.4.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "1707")
-        params.add_param("screen_height", "960")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "125.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "125.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "32")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "10")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "0")
-        params.with_web_id(auth, url)
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        resp_json = json.loads(resp.text)
-        return resp_json
+        return DouyinAPI._request(auth, endpoints.COMMENT_LIST, url, {
+            "aweme_id": aweme_id,
+            "cursor": cursor,
+            "count": count,
+        })
+
+    @staticmethod
+    def iter_work_out_comment_pages(auth, url: str, cursor: str = "0", count: str = '5', **kwargs) -> Iterator[Page]:
+        """
+        逐页获取作品一级评论.
+        :param auth: DouyinAuth object.
+        :param url: 作品URL.
+        :param cursor: 起始评论游标.
+        :param count: 每页数量.
+        :return: 逐页产出 Page.
+        """
+        return iter_pages(lambda c: DouyinAPI.get_work_out_comment(auth, url, c, count),
+                          "comments", lambda res_json, c, items: str(res_json["cursor"]),
+                          cursor=cursor, stop_on_empty=True)
 
     @staticmethod
     def get_work_all_out_comment(auth, url: str, **kwargs) -> list:
@@ -278,18 +258,7 @@ class DouyinAPI:
         :param url: 作品URL.
         :return:
         """
-        cursor = "0"
-        comment_list = []
-        while True:
-            res_json = DouyinAPI.get_work_out_comment(auth, url, cursor)
-            comments = res_json["comments"]
-            cursor = str(res_json["cursor"])
-            if comments is None or len(comments) == 0:
-                break
-            comment_list.extend(comments)
-            if res_json["has_more"] != 1:
-                break
-        return comment_list
+        return list(iter_items(DouyinAPI.iter_work_out_comment_pages(auth, url)))
 
     @staticmethod
     def get_work_inner_comment(auth, comment: dict, cursor: str, count: str = '3', **kwargs):
@@ -301,53 +270,29 @@ class DouyinAPI:
         :param cursor: 评论游标.
         :return:
         """
-        api = f"/aweme/v1/web/comment/list/reply/"
         aweme_id = comment['aweme_id']
-        comment_id = comment['cid']
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = f'https://www.douyin.com/video/{aweme_id}'
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("item_id", aweme_id)
-        params.add_param("comment_id", comment_id)
-        params.add_param("cut_version", "1")
-        params.add_param("cursor", cursor)
-        params.add_param("count", count)
-        params.add_param("item_type", "0")
-        params.add_param("update_version_code", "170400")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "170400")
-        params.add_param("version_name", "17.4.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "1707")
-        params.add_param("screen_height", "960")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "125.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "125.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "32")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "10")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "0")
-        params.with_web_id(auth, refer)
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        resp_json = json.loads(resp.text)
-        return resp_json
+        return DouyinAPI._request(auth, endpoints.COMMENT_REPLY_LIST, refer, {
+            "item_id": aweme_id,
+            "comment_id": comment['cid'],
+            "cursor": cursor,
+            "count": count,
+        })
+
+    @staticmethod
+    def iter_work_inner_comment_pages(auth, comment: dict, cursor: str = "0", count: str = '5',
+                                      **kwargs) -> Iterator[Page]:
+        """
+        逐页获取作品评论的二级评论.
+        :param auth: DouyinAuth object.
+        :param comment: 一级评论信息.
+        :param cursor: 起始评论游标.
+        :param count: 每页数量.
+        :return: 逐页产出 Page.
+        """
+        return iter_pages(lambda c: DouyinAPI.get_work_inner_comment(auth, comment, c, count),
+                          "comments", lambda res_json, c, items: str(res_json["cursor"]),
+                          cursor=cursor)
 
     @staticmethod
     def get_work_all_inner_comment(auth, comment: dict, **kwargs) -> list:
@@ -357,34 +302,23 @@ class DouyinAPI:
         :param comment: 一级评论信息.
         :return: 二级评论列表.
         """
-        cursor = "0"
-        count = '5'
-        comment_list = []
-        while True:
-            res_json = DouyinAPI.get_work_inner_comment(auth, comment, cursor, count)
-            comments = res_json["comments"]
-            cursor = str(res_json["cursor"])
-            if type(comments) is list and len(comments) > 0:
-                comment_list.extend(comments)
-            if res_json["has_more"] != 1:
-                break
-        return comment_list
+        return list(iter_items(DouyinAPI.iter_work_inner_comment_pages(auth, comment)))
 
     @staticmethod
-    def get_work_all_comment(auth, url: str, **kwargs):
+    def get_work_all_comment(auth, url: str, max_workers: int = 4, max_comments: Optional[int] = None,
+                             time_budget: Optional[float] = None, **kwargs):
         """
         获取作品全部评论.
         :param auth: DouyinAuth object.
         :param url: 作品URL.
-        :return: 全部评论列表.
-        """
-        out_comment_list = DouyinAPI.get_work_all_out_comment(auth, url)
-        for comment in out_comment_list:
-            comment['reply_comment'] = []
-            if comment['reply_comment_total'] > 0:
-                inner_comment_list = DouyinAPI.get_work_all_inner_comment(auth, comment)
-                comment['reply_comment'] = inner_comment_list
-        return out_comment_list
+        :param max_workers: 并发获取二级评论的线程数.
+        :param max_comments: 最多获取的评论数(含二级评论), None 表示不限.
+        :param time_budget: 最长耗时(秒), None 表示不限.
+        :return: 全部评论列表, 二级评论在 comment['reply_comment'] 中.
+        """
+        from dy_apis.comment_crawler import CommentCrawler
+        crawler = CommentCrawler(auth, max_workers=max_workers, max_comments=max_comments, time_budget=time_budget)
+        return crawler.crawl(url)
 
     @staticmethod
     def get_user_info(auth, user_url: str, **kwargs) -> dict:
@@ -394,48 +328,8 @@ class DouyinAPI:
         :param user_url: 用户主页URL.
         :return: 用户信息.
         """
-        api = f"/aweme/v1/web/user/profile/other/"
         user_id = user_url.split("/")[-1].split("?")[0]
-        headers = HeaderBuilder().build(HeaderType.GET)
-        headers.set_referer(user_url)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("publish_video_strategy_type", '2')
-        params.add_param("source", 'channel_pc_web')
-        params.add_param("sec_user_id", user_id)
-        params.add_param("personal_center_strategy", '1')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '100')
-        params.with_web_id(auth, user_url)
-        params.add_param("msToken", auth.msToken)
-        params.add_param('verifyFp', auth.cookie['s_v_web_id'])
-        params.add_param('fp', auth.cookie['s_v_web_id'])
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        return json.loads(resp.text)
+        return DouyinAPI._request(auth, endpoints.USER_PROFILE, user_url, {"sec_user_id": user_id})
 
     @staticmethod
     def search_general_work(auth, query: str, sort_type: str = '0', publish_time: str = '0', offset: str = '0',
@@ -452,60 +346,50 @@ class DouyinAPI:
         :param content_type: 内容形式 0 不限, 1 视频, 2 图文
         :return: JSON数据.
         """
-        api = f"/aweme/v1/web/general/search/single/"
-        headers = HeaderBuilder().build(HeaderType.GET)
+        return DouyinAPI._send(auth, DouyinAPI.prepare_search_general_work(
+            auth, query, sort_type, publish_time, offset, filter_duration, search_range, content_type))
+
+    @staticmethod
+    def prepare_search_general_work(auth, query: str, sort_type: str = '0', publish_time: str = '0', offset: str = '0',
+                                    filter_duration="", search_range="", content_type="", **kwargs) -> PreparedRequest:
+        """
+        构建并签名综合频道作品搜索请求, 参数同 search_general_work.
+        :return: PreparedRequest.
+        """
         refer = f'https://www.douyin.com/search/{urllib.parse.quote(query)}?aid={uuid.uuid4()}&type=general'
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("search_channel", "aweme_general")
-        params.add_param("enable_history", "1")
-        params.add_param("filter_selected", r'{"sort_type":"%s","publish_time":"%s","filter_duration":"%s",'
-                                            r'"search_range":"%s","content_type":"%s"}' % (sort_type, publish_time,
-                                                                                           filter_duration,
-                                                                                           search_range, content_type))
-        params.add_param("keyword", query)
-        params.add_param("search_source", "tab_search")
-        params.add_param("query_correct_type", "1")
-        params.add_param("is_filter_search", "1")
-        params.add_param("from_group_id", "")
-        params.add_param("offset", offset)
-        params.add_param("count", '25')
-        params.add_param("need_filter_settings", '1' if offset == '0' else '0')
-        params.add_param("list_type", "single")
-        params.add_param("update_version_code", "170400")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "190600")
-        params.add_param("version_name", "19.6.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "1707")
-        params.add_param("screen_height", "960")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "125.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "125.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "32")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "10")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "50")
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        return json.loads(resp.text)
+        return DouyinAPI._prepare(auth, endpoints.SEARCH_GENERAL, refer, {
+            "filter_selected": r'{"sort_type":"%s","publish_time":"%s","filter_duration":"%s",'
+                               r'"search_range":"%s","content_type":"%s"}' % (sort_type, publish_time, filter_duration,
+                                                                             search_range, content_type),
+            "keyword": query,
+            "offset": offset,
+            "need_filter_settings": '1' if offset == '0' else '0',
+        })
 
     @staticmethod
-    def search_some_general_work(auth, query: str, num: int, sort_type: str, publish_time: str, filter_duration="", search_range="", content_type="", **kwargs) -> list:
+    def iter_search_general_work_pages(auth, query: str, sort_type: str = '0', publish_time: str = '0',
+                                       filter_duration="", search_range="", content_type="", num: Optional[int] = None,
+                                       offset: str = "0", pipeline: Optional[SignAheadPipeline] = None,
+                                       **kwargs) -> Iterator[Page]:
+        """
+        逐页搜索综合频道作品.
+        :param num: 最多获取的数量, None 表示不限.
+        :param offset: 起始偏移量.
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页(按上一页的条数预测偏移量).
+        其余参数同 search_general_work.
+        :return: 逐页产出 Page.
+        """
+        def prepare(o):
+            return DouyinAPI.prepare_search_general_work(auth, query, sort_type, publish_time, o,
+                                                         filter_duration, search_range, content_type)
+
+        fetch = DouyinAPI._pipelined_fetch(auth, prepare, pipeline, 25)
+        return iter_pages(fetch, "data", lambda res_json, o, items: str(int(o) + len(items)),
+                          cursor=offset, limit=num)
+
+    @staticmethod
+    def search_some_general_work(auth, query: str, num: int, sort_type: str, publish_time: str, filter_duration="", search_range="", content_type="",
+                                 pipeline: Optional[SignAheadPipeline] = None, **kwargs) -> list:
         """
         搜索指定数量综合频道作品.
         :param auth: DouyinAuth object.
@@ -516,44 +400,42 @@ class DouyinAPI:
         :param filter_duration: 视频时长 空字符串 不限, 0-1 一分钟内, 1-5 1-5分钟内, 5-10000 5分钟以上
         :param search_range: 搜索范围 0 不限, 1 最近看过, 2 还未看过, 3 关注的人
         :param content_type: 内容形式 0 不限, 1 视频, 2 图文
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页.
         :return: 作品列表.
         """
-        offset = "0"
-        work_list = []
-        while True:
-            res_json = DouyinAPI.search_general_work(auth, query, sort_type, publish_time, offset,
-                                                     filter_duration, search_range, content_type)
-            works = res_json["data"]
-            work_list.extend(works)
-            if res_json["has_more"] != 1 or len(work_list) >= num:
-                break
-            offset = str(int(offset) + len(works))
-        if len(work_list) > num:
-            work_list = work_list[:num]
-        return work_list
+        return list(iter_items(DouyinAPI.iter_search_general_work_pages(
+            auth, query, sort_type, publish_time, filter_duration, search_range, content_type, num=num,
+            pipeline=pipeline)))
+
+    @staticmethod
+    def iter_search_user_pages(auth, query: str, num: Optional[int] = None, offset: str = "0", count: str = "25",
+                               pipeline: Optional[SignAheadPipeline] = None, **kwargs) -> Iterator[Page]:
+        """
+        逐页搜索用户.
+        :param auth: DouyinAuth object.
+        :param query: 搜索关键字.
+        :param num: 最多获取的数量, None 表示不限.
+        :param offset: 起始偏移量.
+        :param count: 每页数量.
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页.
+        :return: 逐页产出 Page.
+        """
+        fetch = DouyinAPI._pipelined_fetch(auth, lambda o: DouyinAPI.prepare_search_user(auth, query, o, count), pipeline,
+                                           int(count))
+        return iter_pages(fetch, "user_list", lambda res_json, o, items: str(int(o) + int(count)),
+                          cursor=offset, limit=num)
 
     @staticmethod
-    def search_some_user(auth, query: str, num: int, **kwargs) -> list:
+    def search_some_user(auth, query: str, num: int, pipeline: Optional[SignAheadPipeline] = None, **kwargs) -> list:
         """
         搜索指定数量用户.
         :param auth: DouyinAuth object.
         :param query: 搜索关键字.
         :param num: 搜索结果数量.
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页.
         :return: 用户列表.
         """
-        offset = "0"
-        count = "25"
-        user_list = []
-        while True:
-            res_json = DouyinAPI.search_user(auth, query, offset, count)
-            users = res_json["user_list"]
-            user_list.extend(users)
-            if res_json["has_more"] != 1 or len(user_list) >= num:
-                break
-            offset = str(int(offset) + int(count))
-        if len(user_list) > num:
-            user_list = user_list[:num]
-        return user_list
+        return list(iter_items(DouyinAPI.iter_search_user_pages(auth, query, num, pipeline=pipeline)))
 
 
     @staticmethod
@@ -565,137 +447,84 @@ class DouyinAPI:
         :param offset:  搜索结果偏移量.
         :param num:  搜索结果数量.
         :param douyin_user_fans: 粉丝数量 空字符串 (0_1k 1000以下) (1k_1w 1000-10000) (1w_10w 10000-100000) (10w_100w 10w-100w粉丝) (100w_ 100w以上)
-        :param douyin_user_type: 用户类型 空字符串 不限 common_user 普通用户 enterprise_user 企业用户 personal_user 个人认证用户
-        :return: JSON数据.
-        """
-        api = "/aweme/v1/web/discover/search"
-        headers = HeaderBuilder().build(HeaderType.GET)
-        refer = f'https://www.douyin.com/search/{urllib.parse.quote(query)}?aid={uuid.uuid4()}&type=general'
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("search_channel", 'aweme_user_web')
-        params.add_param("search_filter_value", r'{"douyin_user_fans":["%s"],"douyin_user_type":["%s"]}' % (
-            douyin_user_fans, douyin_user_type))
-        params.add_param("keyword", query)
-        params.add_param("search_source", 'switch_tab')
-        params.add_param("query_correct_type", '1')
-        params.add_param("is_filter_search", '1')
-        # params.add_param("from_group_id", '7378456704385600820')
-        params.add_param("offset", offset)
-        params.add_param("count", num)
-        params.add_param("need_filter_settings", '1' if offset == '0' else '0')
-        params.add_param("list_type", 'single')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '150')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        return resp.json()
-
-    @staticmethod
-    def search_live(auth, query: str, offset: str = '0', num: str = '25', **kwargs):
-        """
-        搜索直播.
-        :param auth: DouyinAuth object.
-        :param query:  搜索关键字.
-        :param offset:  搜索结果偏移量.
-        :param num:  搜索数量.
-        :return: JSON数据.
-        """
-        api = "/aweme/v1/web/live/search/"
-        headers = HeaderBuilder().build(HeaderType.GET)
-        refer = f'https://www.douyin.com/search/{urllib.parse.quote(query)}?aid={uuid.uuid4()}&type=live'
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("search_channel", 'aweme_live')
-        params.add_param("keyword", query)
-        params.add_param("search_source", 'normal_search')
-        params.add_param("query_correct_type", '1')
-        params.add_param("is_filter_search", '0')
-        params.add_param("from_group_id", '')
-        params.add_param("offset", offset)
-        params.add_param("count", num)
-        params.add_param("need_filter_settings", '1' if offset == '0' else '0')
-        params.add_param("list_type", 'single')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '50')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        resp = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                            params=params.get(), verify=False)
-        return resp.json()
+        :param douyin_user_type: 用户类型 空字符串 不限 common_user 普通用户 enterprise_user 企业用户 personal_user 个人认证用户
+        :return: JSON数据.
+        """
+        return DouyinAPI._send(auth, DouyinAPI.prepare_search_user(
+            auth, query, offset, num, douyin_user_fans, douyin_user_type))
+
+    @staticmethod
+    def prepare_search_user(auth, query: str, offset: str = '0', num: str = '25', douyin_user_fans="",
+                            douyin_user_type="", **kwargs) -> PreparedRequest:
+        """
+        构建并签名用户搜索请求, 参数同 search_user.
+        :return: PreparedRequest.
+        """
+        refer = f'https://www.douyin.com/search/{urllib.parse.quote(query)}?aid={uuid.uuid4()}&type=general'
+        return DouyinAPI._prepare(auth, endpoints.SEARCH_USER, refer, {
+            "search_filter_value": r'{"douyin_user_fans":["%s"],"douyin_user_type":["%s"]}' % (
+                douyin_user_fans, douyin_user_type),
+            "keyword": query,
+            "offset": offset,
+            "count": num,
+            "need_filter_settings": '1' if offset == '0' else '0',
+        })
+
+    @staticmethod
+    def search_live(auth, query: str, offset: str = '0', num: str = '25', **kwargs):
+        """
+        搜索直播.
+        :param auth: DouyinAuth object.
+        :param query:  搜索关键字.
+        :param offset:  搜索结果偏移量.
+        :param num:  搜索数量.
+        :return: JSON数据.
+        """
+        return DouyinAPI._send(auth, DouyinAPI.prepare_search_live(auth, query, offset, num))
+
+    @staticmethod
+    def prepare_search_live(auth, query: str, offset: str = '0', num: str = '25', **kwargs) -> PreparedRequest:
+        """
+        构建并签名直播搜索请求, 参数同 search_live.
+        :return: PreparedRequest.
+        """
+        refer = f'https://www.douyin.com/search/{urllib.parse.quote(query)}?aid={uuid.uuid4()}&type=live'
+        return DouyinAPI._prepare(auth, endpoints.SEARCH_LIVE, refer, {
+            "keyword": query,
+            "offset": offset,
+            "count": num,
+            "need_filter_settings": '1' if offset == '0' else '0',
+        })
 
     @staticmethod
-    def search_some_live(auth, query: str, num: int, **kwargs) -> list:
+    def iter_search_live_pages(auth, query: str, num: Optional[int] = None, offset: str = "0", count: str = "25",
+                               pipeline: Optional[SignAheadPipeline] = None, **kwargs) -> Iterator[Page]:
+        """
+        逐页搜索直播.
+        :param auth: DouyinAuth object.
+        :param query:  搜索关键字.
+        :param num: 最多获取的数量, None 表示不限.
+        :param offset: 起始偏移量.
+        :param count: 每页数量.
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页.
+        :return: 逐页产出 Page.
+        """
+        fetch = DouyinAPI._pipelined_fetch(auth, lambda o: DouyinAPI.prepare_search_live(auth, query, o, count), pipeline,
+                                           int(count))
+        return iter_pages(fetch, "data", lambda res_json, o, items: str(int(o) + int(count)),
+                          cursor=offset, limit=num)
+
+    @staticmethod
+    def search_some_live(auth, query: str, num: int, pipeline: Optional[SignAheadPipeline] = None, **kwargs) -> list:
         """
         搜索指定数量直播.
         :param auth: DouyinAuth object.
         :param query:  搜索关键字.
         :param num:  搜索数量.
+        :param pipeline: 预签名流水线, 提供时在当前页请求期间预先签好下一页.
         :return: 直播列表.
         """
-        offset = "0"
-        count = "25"
-        live_list = []
-        while True:
-            res_json = DouyinAPI.search_live(auth, query, offset, count)
-            lives = res_json["data"]
-            live_list.extend(lives)
-            if res_json["has_more"] != 1 or len(live_list) >= num:
-                break
-            offset = str(int(offset) + int(count))
-        if len(live_list) > num:
-            live_list = live_list[:num]
-        return live_list
+        return list(iter_items(DouyinAPI.iter_search_live_pages(auth, query, num, pipeline=pipeline)))
 
     @staticmethod
     def get_user_favorite(auth, sec_id: str, max_cursor: str = '0', num: str = '18', **kwargs):
@@ -749,10 +578,15 @@ class DouyinAPI:
         params.add_param("msToken",
                          auth.msToken)
         params.with_a_bogus()
-        response = requests.get('https://www.douyin.com/aweme/v1/web/aweme/favorite/', params=params.get(),
-                                headers=headers.get(), cookies=auth.cookie,
-                                verify=False)
-        return response.json()
+        with track_request('user_favorite') as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                response = requests.get('https://www.douyin.com/aweme/v1/web/aweme/favorite/', params=params.get(),
+                                        headers=headers.get(), cookies=auth.cookie,
+                                        verify=False)
+            record.set_response(response)
+            with record.phase('decode'):
+                return response.json()
 
 
     @staticmethod
@@ -773,8 +607,13 @@ class DouyinAPI:
         params.add_param('verifyFp', auth.cookie['s_v_web_id'])
         params.add_param('fp', auth.cookie['s_v_web_id'])
         params.with_a_bogus()
-        resp = requests.get(url, params=params.get(), verify=False, headers=headers.get(), cookies=auth.cookie)
-        resp_json = json.loads(resp.text)
+        with track_request('my_uid') as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                resp = requests.get(url, params=params.get(), verify=False, headers=headers.get(), cookies=auth.cookie)
+            record.set_response(resp)
+            with record.phase('decode'):
+                resp_json = decode_response(resp.content)
         return int(resp_json['user_uid'])
 
     @staticmethod
@@ -789,7 +628,11 @@ class DouyinAPI:
         params = {
             "from_tab_name": "main"
         }
-        response = requests.get(url, headers=headers.get(), cookies=auth.cookie, params=params)
+        with track_request('my_sec_uid') as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                response = requests.get(url, headers=headers.get(), cookies=auth.cookie, params=params)
+            record.set_response(response)
         sec_uid = re.findall(r'\\"secUid\\":\\"(.*?)\\"', response.text)[0]
         return sec_uid
 
@@ -803,8 +646,13 @@ class DouyinAPI:
         """
         url = "https://live.douyin.com/" + live_id
         headers = HeaderBuilder().build(HeaderType.GET)
-        res = requests.get(url, headers=headers.get(), cookies=auth_.cookie, verify=False)
+        with track_request('live_info') as record:
+            record.add_phase('queue', get_request_scheduler().acquire())
+            with record.phase('network'):
+                res = requests.get(url, headers=headers.get(), cookies=auth_.cookie, verify=False)
+            record.set_response(res)
         ttwid = res.cookies.get_dict()['ttwid']
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(res.text, 'html.parser')
         scripts = soup.select('script[nonce]')
         for script in scripts:
@@ -838,45 +686,11 @@ class DouyinAPI:
         :param offset: 翻页游标.
         :return: JSON 商品列表.
         """
-        api = f"/live/promotions/page/"
-        headers = HeaderBuilder().build(HeaderType.GET)
-        headers.set_header("origin", DouyinAPI.live_url)
-        headers.set_referer(url)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("room_id", room_id)
-        params.add_param("author_id", author_id)
-        params.add_param("offset", offset)
-        params.add_param("limit", "20")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "210800")
-        params.add_param("version_name", "21.8.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "2560")
-        params.add_param("screen_height", "1440")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "121.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "121.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "20")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "10")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "50")
-        params.with_web_id(auth, url)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        res = requests.post(f'{DouyinAPI.live_url}{api}', headers=headers.get(), cookies=auth.cookie,
-                           params=params.get(), verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.LIVE_PROMOTIONS, url, {
+            "room_id": room_id,
+            "author_id": author_id,
+            "offset": offset,
+        })
 
     @staticmethod
     def get_all_live_production(auth, url: str, **kwargs):
@@ -886,19 +700,23 @@ class DouyinAPI:
         :param url: 直播间链接.
         :return:
         """
+        return list(iter_items(DouyinAPI.iter_live_production_pages(auth, url)))
+
+    @staticmethod
+    def iter_live_production_pages(auth, url: str, offset: str = "0", **kwargs) -> Iterator[Page]:
+        """
+        逐页获取直播间的商品信息.
+        :param auth: DouyinAuth object.
+        :param url: 直播间链接.
+        :param offset: 起始翻页游标.
+        :return: 逐页产出 Page.
+        """
         room_info = DouyinAPI.get_live_info(auth, url.split("/")[-1].split("?")[0])
         room_id = room_info["room_id"]
         author_id = room_info["author_id"]
-        offset = "0"
-        production_list = []
-        while True:
-            res_json = DouyinAPI.get_live_production(auth, url, room_id, author_id, offset)
-            productions = res_json["promotions"]
-            production_list.extend(productions)
-            offset = str(res_json["next_offset"])
-            if offset == "-1":
-                break
-        return production_list
+        return iter_pages(lambda o: DouyinAPI.get_live_production(auth, url, room_id, author_id, o),
+                          "promotions", lambda res_json, o, items: str(res_json["next_offset"]),
+                          cursor=offset, has_more=lambda res_json: str(res_json["next_offset"]) != "-1")
 
     @staticmethod
     def get_live_production_detail(auth, url, ec_promotion_id, sec_author_id, live_room_id, **kwargs):
@@ -912,10 +730,14 @@ class DouyinAPI:
         :return: JSON 商品详情.
         """
         api = f"/ecom/product/detail/saas/pc/"
-        headers = HeaderBuilder().build(HeaderType.FORM)
-        headers.set_header("origin", DouyinAPI.live_url)
-        headers.set_referer(url)
-        headers.with_csrf(auth.cookie_str)
+
+        def build_headers():
+            headers = HeaderBuilder().build(HeaderType.FORM)
+            headers.set_header("origin", DouyinAPI.live_url)
+            headers.set_referer(url)
+            headers.with_csrf(auth)
+            return headers.get()
+
         params = Params()
         params.add_param("is_h5", "1")
         params.add_param("origin_type", "638301")
@@ -959,8 +781,8 @@ class DouyinAPI:
             "use_new_price": "1"
         }
         params.with_a_bogus(data)
-        res = requests.post(f'{DouyinAPI.live_url}{api}', headers=headers.get(), params=params.get(),
-                            cookies=auth.cookie, data=data, verify=False)
+        res = DouyinAPI._post_authenticated(auth, f'{DouyinAPI.live_url}{api}', build_headers,
+                                            params=params.get(), data=data)
         return res.json()
 
     @staticmethod
@@ -973,12 +795,16 @@ class DouyinAPI:
         :return: 响应JSON.
         """
         api = '/aweme/v1/web/aweme/collect/'
-        headers = HeaderBuilder().build(HeaderType.FORM)
         refer = "https://www.douyin.com/?recommend=1"
-        headers.set_referer(refer)
-        headers.with_bd(api, auth)
-        headers.with_csrf(auth.cookie_str)
-        headers.set_header("origin", DouyinAPI.douyin_url)
+
+        def build_headers():
+            headers = HeaderBuilder().build(HeaderType.FORM)
+            headers.set_referer(refer)
+            headers.with_bd(api, auth)
+            headers.with_csrf(auth)
+            headers.set_header("origin", DouyinAPI.douyin_url)
+            return headers.get()
+
         params = Params()
         params.add_param("device_platform", "webapp")
         params.add_param("aid", "6383")
@@ -1015,8 +841,8 @@ class DouyinAPI:
             "aweme_type": "0",
         }
         params.with_a_bogus(data)
-        res = requests.post(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                            cookies=auth.cookie, data=data, verify=False)
+        res = DouyinAPI._post_authenticated(auth, f'{DouyinAPI.douyin_url}{api}', build_headers,
+                                            params=params.get(), data=data)
         return res.json()
 
     @staticmethod
@@ -1030,12 +856,16 @@ class DouyinAPI:
         :return: 响应JSON.
         """
         api = '/aweme/v1/web/collects/video/move/'
-        headers = HeaderBuilder().build(HeaderType.FORM)
         refer = "https://www.douyin.com/?recommend=1"
-        headers.set_referer(refer)
-        headers.with_bd(api, auth)
-        headers.with_csrf(auth.cookie_str)
-        headers.set_header("origin", DouyinAPI.douyin_url)
+
+        def build_headers():
+            headers = HeaderBuilder().build(HeaderType.FORM)
+            headers.set_referer(refer)
+            headers.with_bd(api, auth)
+            headers.with_csrf(auth)
+            headers.set_header("origin", DouyinAPI.douyin_url)
+            return headers.get()
+
         params = Params()
         params.add_param("aid", "6383")
         params.add_param("browser_language", "zh-CN")
@@ -1073,8 +903,8 @@ class DouyinAPI:
         params.add_param("fp", auth.cookie['s_v_web_id'])
         params.add_param("msToken", auth.msToken)
         params.with_a_bogus()
-        res = requests.post(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                            cookies=auth.cookie, verify=False)
+        res = DouyinAPI._post_authenticated(auth, f'{DouyinAPI.douyin_url}{api}', build_headers,
+                                            params=params.get())
         return res.json()
 
     @staticmethod
@@ -1088,12 +918,16 @@ class DouyinAPI:
         :return: 响应JSON.
         """
         api = '/aweme/v1/web/collects/video/move/'
-        headers = HeaderBuilder().build(HeaderType.FORM)
         refer = "https://www.douyin.com/user/self?showTab=favorite_collection"
-        headers.set_referer(refer)
-        headers.with_bd(api, auth)
-        headers.with_csrf(auth.cookie_str)
-        headers.set_header("origin", DouyinAPI.douyin_url)
+
+        def build_headers():
+            headers = HeaderBuilder().build(HeaderType.FORM)
+            headers.set_referer(refer)
+            headers.with_bd(api, auth)
+            headers.with_csrf(auth)
+            headers.set_header("origin", DouyinAPI.douyin_url)
+            return headers.get()
+
         params = Params()
         params.add_param("aid", "6383")
         params.add_param("browser_language", "zh-CN")
@@ -1129,8 +963,8 @@ class DouyinAPI:
         params.add_param("fp", auth.cookie['s_v_web_id'])
         params.add_param("msToken", auth.msToken)
         params.with_a_bogus()
-        res = requests.post(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                            cookies=auth.cookie, verify=False)
+        res = DouyinAPI._post_authenticated(auth, f'{DouyinAPI.douyin_url}{api}', build_headers,
+                                            params=params.get())
         return res.json()
 
     @staticmethod
@@ -1140,46 +974,8 @@ class DouyinAPI:
         :param auth: DouyinAuth object.
         :return: JSON.
         """
-        api = "/aweme/v1/web/collects/list/"
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = "https://www.douyin.com/?recommend=1"
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", "webapp")
-        params.add_param("aid", "6383")
-        params.add_param("channel", "channel_pc_web")
-        params.add_param("cursor", "0")
-        params.add_param("count", "20")
-        params.add_param("update_version_code", "170400")
-        params.add_param("pc_client_type", "1")
-        params.add_param("version_code", "170400")
-        params.add_param("version_name", "17.4.0")
-        params.add_param("cookie_enabled", "true")
-        params.add_param("screen_width", "1707")
-        params.add_param("screen_height", "960")
-        params.add_param("browser_language", "zh-CN")
-        params.add_param("browser_platform", "Win32")
-        params.add_param("browser_name", "Edge")
-        params.add_param("browser_version", "125.0.0.0")
-        params.add_param("browser_online", "true")
-        params.add_param("engine_name", "Blink")
-        params.add_param("engine_version", "125.0.0.0")
-        params.add_param("os_name", "Windows")
-        params.add_param("os_version", "10")
-        params.add_param("cpu_core_num", "32")
-        params.add_param("device_memory", "8")
-        params.add_param("platform", "PC")
-        params.add_param("downlink", "5.95")
-        params.add_param("effective_type", "4g")
-        params.add_param("round_trip_time", "200")
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        res = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                           cookies=auth.cookie, verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.COLLECT_LIST, refer)
 
     @staticmethod
     def get_user_follower_list(auth, user_id: str, sec_id: str, max_time: str = '0', count: str = '20', **kwargs):
@@ -1192,77 +988,53 @@ class DouyinAPI:
         :param count: 数量.
         :return:  JSON.
         """
-        api = "/aweme/v1/web/user/follower/list/"
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = f"https://www.douyin.com/user/{sec_id}"
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("user_id", user_id)
-        params.add_param("sec_user_id", sec_id)
-        params.add_param("offset", '0')
-        params.add_param("min_time", '0')
-        params.add_param("max_time", max_time)
-        params.add_param("count", count)
-        params.add_param("source_type", '2' if max_time == '0' else '1')
-        params.add_param("gps_access", '0')
-        params.add_param("address_book_access", '0')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '150')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        res = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                           cookies=auth.cookie, verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.USER_FOLLOWER_LIST, refer, {
+            "user_id": user_id,
+            "sec_user_id": sec_id,
+            "max_time": max_time,
+            "count": count,
+            "source_type": '2' if max_time == '0' else '1',
+        })
+
+    @staticmethod
+    def iter_user_follower_pages(auth, user_id: str, sec_id: str, num: Optional[int] = None, max_time: str = "0",
+                                 count: str = "20", checkpoint_every: int = 0, **kwargs) -> Iterator[Page]:
+        """
+        逐页获取用户的粉丝列表
+        :param auth: DouyinAuth object.
+        :param user_id: 用户ID.
+        :param sec_id: 用户sec_id.
+        :param num: 最多获取的数量, None 表示不限.
+        :param max_time: 起始最大时间戳.
+        :param count: 每页数量.
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
+        :return: 逐页产出 Page, page.cursor.next_cursor 为下一页的max_time.
+        """
+        def make_pages(cursor, fetched):
+            return iter_pages(lambda t: DouyinAPI.get_user_follower_list(auth, user_id, sec_id, t, count),
+                              "followers", lambda res_json, t, items: res_json["min_time"],
+                              cursor=max_time if cursor is None else cursor,
+                              limit=None if num is None else num - fetched)
+
+        if checkpoint_every:
+            return iter_checkpointed(make_pages, "user_follower", sec_id, checkpoint_every, limit=num)
+        return make_pages(None, 0)
 
     @staticmethod
-    def get_some_user_follower_list(auth, user_id: str, sec_id: str, num: int, **kwargs) -> list:
+    def get_some_user_follower_list(auth, user_id: str, sec_id: str, num: int,
+                                    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, **kwargs) -> list:
         """
         获取用户的前num个粉丝列表
         :param auth: DouyinAuth object.
         :param user_id: 用户ID.
         :param sec_id: 用户sec_id.
         :param num: 要获取的数量
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
         :return: 粉丝列表.
         """
-        max_time = "0"
-        count = "20"
-        follower_list = []
-        while True:
-            res_json = DouyinAPI.get_user_follower_list(auth, user_id, sec_id, max_time, count)
-            followers = res_json["followers"]
-            follower_list.extend(followers)
-            if res_json["has_more"] != 1 or len(follower_list) >= num:
-                break
-            max_time = res_json["min_time"]
-        if len(follower_list) > num:
-            follower_list = follower_list[:num]
-        return follower_list
+        return list(iter_items(DouyinAPI.iter_user_follower_pages(auth, user_id, sec_id, num,
+                                                               checkpoint_every=checkpoint_every)))
 
     @staticmethod
     def get_user_following_list(auth, user_id: str, sec_id: str, max_time: str = '0', count: str = '20', **kwargs):
@@ -1275,78 +1047,53 @@ class DouyinAPI:
         :param count: 数量.
         :return:
         """
-        api = "/aweme/v1/web/user/following/list/"
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = f"https://www.douyin.com/user/{sec_id}"
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("user_id", user_id)
-        params.add_param("sec_user_id", sec_id)
-        params.add_param("offset", '0')
-        params.add_param("min_time", '0')
-        params.add_param("max_time", max_time)
-        params.add_param("count", count)
-        params.add_param("source_type", '2' if max_time == '0' else '1')
-        params.add_param("gps_access", '0')
-        params.add_param("address_book_access", '0')
-        params.add_param("is_top", '1')
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '150')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        res = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                           cookies=auth.cookie, verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.USER_FOLLOWING_LIST, refer, {
+            "user_id": user_id,
+            "sec_user_id": sec_id,
+            "max_time": max_time,
+            "count": count,
+            "source_type": '2' if max_time == '0' else '1',
+        })
+
+    @staticmethod
+    def iter_user_following_pages(auth, user_id: str, sec_id: str, num: Optional[int] = None, max_time: str = "0",
+                                  count: str = "20", checkpoint_every: int = 0, **kwargs) -> Iterator[Page]:
+        """
+        逐页获取用户的关注列表
+        :param auth: DouyinAuth object.
+        :param user_id: 用户ID.
+        :param sec_id: 用户sec_id.
+        :param num: 最多获取的数量, None 表示不限.
+        :param max_time: 起始最大时间戳.
+        :param count: 每页数量.
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
+        :return: 逐页产出 Page, page.cursor.next_cursor 为下一页的max_time.
+        """
+        def make_pages(cursor, fetched):
+            return iter_pages(lambda t: DouyinAPI.get_user_following_list(auth, user_id, sec_id, t, count),
+                              "followings", lambda res_json, t, items: res_json["min_time"],
+                              cursor=max_time if cursor is None else cursor,
+                              limit=None if num is None else num - fetched)
+
+        if checkpoint_every:
+            return iter_checkpointed(make_pages, "user_following", sec_id, checkpoint_every, limit=num)
+        return make_pages(None, 0)
 
     @staticmethod
-    def get_some_user_following_list(auth, user_id: str, sec_id: str, num: int, **kwargs) -> list:
+    def get_some_user_following_list(auth, user_id: str, sec_id: str, num: int,
+                                     checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, **kwargs) -> list:
         """
         获取用户的前num个关注列表
         :param auth: DouyinAuth object.
         :param user_id: 用户ID.
         :param sec_id: 用户sec_id.
         :param num: 要获取的数量
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点.
         :return: 关注列表.
         """
-        max_time = "0"
-        count = "20"
-        following_list = []
-        while True:
-            res_json = DouyinAPI.get_user_following_list(auth, user_id, sec_id, max_time, count)
-            followings = res_json["followings"]
-            following_list.extend(followings)
-            if res_json["has_more"] != 1 or len(following_list) >= num:
-                break
-            max_time = res_json["min_time"]
-        if len(following_list) > num:
-            following_list = following_list[:num]
-        return following_list
+        return list(iter_items(DouyinAPI.iter_user_following_pages(auth, user_id, sec_id, num,
+                                                                checkpoint_every=checkpoint_every)))
 
     @staticmethod
     def get_notice_list(auth, min_time='0', max_time='0', count='10', notice_group='700', **kwargs):
@@ -1359,50 +1106,28 @@ class DouyinAPI:
         :param notice_group: 消息类型 700 全部消息 401 粉丝 601 @我的 2 评论 3 点赞 520 弹幕
         :return: JSON.
         """
-        api = "/aweme/v1/web/notice/"
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = "https://www.douyin.com/?recommend=1"
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("is_new_notice", '1')
-        params.add_param("is_mark_read", '1')
-        params.add_param("notice_group", notice_group)
-        params.add_param("count", count)
-        params.add_param("min_time", min_time)
-        params.add_param("max_time", max_time)
-        params.add_param("update_version_code", '170400')
-        params.add_param("pc_client_type", '1')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '50')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-        res = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                           cookies=auth.cookie, verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.NOTICE_LIST, refer, {
+            "notice_group": notice_group,
+            "count": count,
+            "min_time": min_time,
+            "max_time": max_time,
+        })
+
+    @staticmethod
+    def iter_notice_pages(auth, num: Optional[int] = None, notice_group='700', count: str = "10",
+                          **kwargs) -> Iterator[Page]:
+        """
+        逐页获得通知
+        :param auth: DouyinAuth object.
+        :param num: 最多获取的数量, None 表示不限.
+        :param notice_group: 消息类型 | 700 全部消息 401 粉丝 601 @我的 2 评论 3 点赞 520 弹幕
+        :param count: 每页数量.
+        :return: 逐页产出 Page, 游标为 (min_time, max_time).
+        """
+        return iter_pages(lambda t: DouyinAPI.get_notice_list(auth, t[0], t[1], count, notice_group),
+                          "notice_list_v2", lambda res_json, t, items: (res_json["min_time"], res_json["max_time"]),
+                          cursor=("0", "0"), limit=num)
 
     @staticmethod
     def get_some_notice_list(auth, num: int = 20, notice_group='700', **kwargs) -> list:
@@ -1413,21 +1138,7 @@ class DouyinAPI:
         :param notice_group: 消息类型 | 700 全部消息 401 粉丝 601 @我的 2 评论 3 点赞 520 弹幕
         :return:
         """
-        min_time = "0"
-        max_time = "0"
-        count = "10"
-        notice_list = []
-        while True:
-            res_json = DouyinAPI.get_notice_list(auth, min_time, max_time, count, notice_group)
-            notices = res_json["notice_list_v2"]
-            notice_list.extend(notices)
-            if res_json["has_more"] != 1 or len(notice_list) >= num:
-                break
-            min_time = res_json["min_time"]
-            max_time = res_json["max_time"]
-        if len(notice_list) > num:
-            notice_list = notice_list[:num]
-        return notice_list
+        return list(iter_items(DouyinAPI.iter_notice_pages(auth, num, notice_group)))
 
     @staticmethod
     def get_feed(auth, count='20', refresh_index='2', **kwargs):
@@ -1438,55 +1149,11 @@ class DouyinAPI:
         :param refresh_index: 刷新索引.
         :return: JSON.
         """
-        api = "/aweme/v1/web/module/feed/"
-        headers = HeaderBuilder().build(HeaderType.GET)
         refer = "https://www.douyin.com/"
-        headers.set_referer(refer)
-        params = Params()
-        params.add_param("device_platform", 'webapp')
-        params.add_param("aid", '6383')
-        params.add_param("channel", 'channel_pc_web')
-        params.add_param("module_id", '3003101')
-        params.add_param("count", count)
-        params.add_param("filterGids", '')
-        params.add_param("presented_ids", '')
-        params.add_param("refresh_index", refresh_index)
-        params.add_param("refer_id", '')
-        params.add_param("refer_type", '10')
-        params.add_param("awemePcRecRawData", '{"is_client":false}')
-        params.add_param("Seo-Flag", '0')
-        params.add_param("install_time", '1715480185')
-        params.add_param("pc_client_type", '1')
-        params.add_param("update_version_code", '170400')
-        params.add_param("version_code", '170400')
-        params.add_param("version_name", '17.4.0')
-        params.add_param("cookie_enabled", 'true')
-        params.add_param("screen_width", '1707')
-        params.add_param("screen_height", '960')
-        params.add_param("browser_language", 'zh-CN')
-        params.add_param("browser_platform", 'Win32')
-        params.add_param("browser_name", 'Edge')
-        params.add_param("browser_version", '125.0.0.0')
-        params.add_param("browser_online", 'true')
-        params.add_param("engine_name", 'Blink')
-        params.add_param("engine_version", '125.0.0.0')
-        params.add_param("os_name", 'Windows')
-        params.add_param("os_version", '10')
-        params.add_param("cpu_core_num", '32')
-        params.add_param("device_memory", '8')
-        params.add_param("platform", 'PC')
-        params.add_param("downlink", '10')
-        params.add_param("effective_type", '4g')
-        params.add_param("round_trip_time", '100')
-        params.with_web_id(auth, refer)
-        params.add_param("msToken", auth.msToken)
-        params.with_a_bogus()
-        params.add_param("verifyFp", auth.cookie['s_v_web_id'])
-        params.add_param("fp", auth.cookie['s_v_web_id'])
-
-        res = requests.get(f'{DouyinAPI.douyin_url}{api}', headers=headers.get(), params=params.get(),
-                           cookies=auth.cookie, verify=False)
-        return res.json()
+        return DouyinAPI._request(auth, endpoints.FEED, refer, {
+            "count": count,
+            "refresh_index": refresh_index,
+        })
 
 
 
@@ -2,11 +2,11 @@
 """
 异步版本的抖音API封装
 """
-import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 from loguru import logger
 
 from .douyin_api import DouyinAPI
+from .pagination import Page, aiter_pages, DEFAULT_CHECKPOINT_EVERY
 
 
 class DouyinAsyncAPI(DouyinAPI):
@@ -23,16 +23,13 @@ class DouyinAsyncAPI(DouyinAPI):
             # 构造用户主页URL
             user_url = f"https://www.douyin.com/user/{user_id}"
             
-            # 使用现有的同步方法获取作品
-            # 在实际应用中，这里应该改为异步HTTP请求
-            loop = asyncio.get_event_loop()
-            works = await loop.run_in_executor(
-                None, 
-                self.get_user_all_work_info,
-                self.auth,
-                user_url
-            )
-            
+            # 逐页获取，达到最大数量后不再请求后续页
+            works = []
+            async for page in self.aiter_user_work_pages(user_url):
+                works.extend(page.items)
+                if max_count and len(works) >= max_count:
+                    break
+
             # 如果指定了最大数量，只返回前N个
             if max_count and len(works) > max_count:
                 works = works[:max_count]
@@ -42,4 +39,80 @@ class DouyinAsyncAPI(DouyinAPI):
             
         except Exception as e:
             logger.error(f"获取用户 {user_id} 作品失败: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def aiter_pages(self, pages: Iterator[Page]) -> AsyncIterator[Page]:
+        """
+        把任意同步分页迭代器包装为异步迭代器，每页请求在线程池中执行
+        :param pages: DouyinAPI.iter_*_pages 返回的迭代器
+        :return: 异步逐页产出 Page
+        """
+        return aiter_pages(pages)
+
+    def aiter_user_work_pages(self, user_url: str, max_cursor: str = "0",
+                              checkpoint_every: int = 0) -> AsyncIterator[Page]:
+        """
+        异步逐页获取用户作品
+        :param user_url: 用户主页URL
+        :param max_cursor: 起始max_cursor
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点
+        """
+        return aiter_pages(self.iter_user_work_pages(self.auth, user_url, max_cursor,
+                                                     checkpoint_every=checkpoint_every))
+
+    def aiter_work_out_comment_pages(self, url: str, cursor: str = "0") -> AsyncIterator[Page]:
+        """
+        异步逐页获取作品一级评论
+        :param url: 作品URL
+        :param cursor: 起始评论游标
+        """
+        return aiter_pages(self.iter_work_out_comment_pages(self.auth, url, cursor))
+
+    def aiter_work_inner_comment_pages(self, comment: dict, cursor: str = "0") -> AsyncIterator[Page]:
+        """
+        异步逐页获取作品评论的二级评论
+        :param comment: 一级评论信息
+        :param cursor: 起始评论游标
+        """
+        return aiter_pages(self.iter_work_inner_comment_pages(self.auth, comment, cursor))
+
+    def aiter_search_general_work_pages(self, query: str, num: Optional[int] = None, **kwargs) -> AsyncIterator[Page]:
+        """
+        异步逐页搜索综合频道作品
+        :param query: 搜索关键字
+        :param num: 最多获取的数量，None表示不限
+        :param kwargs: 其余参数同 iter_search_general_work_pages
+        """
+        return aiter_pages(self.iter_search_general_work_pages(self.auth, query, num=num, **kwargs))
+
+    def aiter_search_user_pages(self, query: str, num: Optional[int] = None) -> AsyncIterator[Page]:
+        """
+        异步逐页搜索用户
+        :param query: 搜索关键字
+        :param num: 最多获取的数量，None表示不限
+        """
+        return aiter_pages(self.iter_search_user_pages(self.auth, query, num))
+
+    def aiter_user_follower_pages(self, user_id: str, sec_id: str, num: Optional[int] = None,
+                                  checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> AsyncIterator[Page]:
+        """
+        异步逐页获取用户的粉丝列表
+        :param user_id: 用户ID
+        :param sec_id: 用户sec_id
+        :param num: 最多获取的数量，None表示不限
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点
+        """
+        return aiter_pages(self.iter_user_follower_pages(self.auth, user_id, sec_id, num,
+                                                         checkpoint_every=checkpoint_every))
+
+    def aiter_user_following_pages(self, user_id: str, sec_id: str, num: Optional[int] = None,
+                                   checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> AsyncIterator[Page]:
+        """
+        异步逐页获取用户的关注列表
+        :param user_id: 用户ID
+        :param sec_id: 用户sec_id
+        :param num: 最多获取的数量，None表示不限
+        :param checkpoint_every: 每隔多少页保存一次断点, 0 表示不保存断点
+        """
+        return aiter_pages(self.iter_user_following_pages(self.auth, user_id, sec_id, num,
+                                                          checkpoint_every=checkpoint_every))
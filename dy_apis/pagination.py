@@ -0,0 +1,219 @@
+# coding=utf-8
+"""
+分页迭代器，逐页产出接口数据并暴露游标状态
+调用方可以边翻页边处理（下载、入库），无需等待最后一页返回
+长时间翻页（作者全部作品、粉丝/关注列表、新订阅的首次扫描）默认每 DY_CHECKPOINT_EVERY 页保存一次断点，0 表示不保存；
+超过 DY_CHECKPOINT_MAX_AGE 秒的断点作废，重新从第一页开始（期间可能有新作品，保存的条目中的 CDN 地址也已过期）
+"""
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from os import getenv
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from dy_apis.request_scheduler import bind_priority
+
+# 长时间翻页默认的断点间隔(页)
+DEFAULT_CHECKPOINT_EVERY = int(getenv('DY_CHECKPOINT_EVERY', '5'))
+# 断点的最长保留时间(秒)，<= 0 表示不限
+DEFAULT_CHECKPOINT_MAX_AGE = float(getenv('DY_CHECKPOINT_MAX_AGE', '21600'))
+
+
+@dataclass
+class PageCursor:
+    """分页游标状态"""
+    cursor: Any  # 本页请求使用的游标
+    next_cursor: Any = None  # 下一页游标，None 表示没有下一页
+    has_more: bool = False  # 是否还有下一页
+    page_index: int = 0  # 页序号，从0开始
+    fetched: int = 0  # 截至本页累计获取的条目数
+
+
+@dataclass
+class Page:
+    """一页数据"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    cursor: PageCursor = None
+    response: Dict[str, Any] = None  # 本页原始响应
+
+
+def _default_has_more(res_json: Dict) -> bool:
+    return res_json.get("has_more") == 1
+
+
+def iter_pages(fetch: Callable[[Any], Dict], items_key: str, next_cursor: Callable[[Dict, Any, List], Any],
+               cursor: Any = "0", limit: Optional[int] = None, stop_on_empty: bool = False,
+               has_more: Callable[[Dict], bool] = _default_has_more) -> Iterator[Page]:
+    """
+    通用分页迭代器.
+    :param fetch: fetch(cursor) -> 响应JSON.
+    :param items_key: 响应中条目列表的字段名.
+    :param next_cursor: next_cursor(res_json, cursor, items) -> 下一页游标.
+    :param cursor: 起始游标.
+    :param limit: 最多获取的条目数，None 表示不限.
+    :param stop_on_empty: 本页为空时是否结束.
+    :param has_more: has_more(res_json) -> 是否还有下一页.
+    :return: 逐页产出 Page.
+    """
+    fetched = 0
+    page_index = 0
+    while True:
+        res_json = fetch(cursor)
+        if items_key not in res_json:
+            break
+        items = res_json[items_key]
+        if not isinstance(items, list):
+            items = []
+        if stop_on_empty and len(items) == 0:
+            break
+        more = has_more(res_json)
+        # 下一页游标基于完整的本页数据计算，截断只影响产出
+        nxt = next_cursor(res_json, cursor, items) if more else None
+        if limit is not None and fetched + len(items) > limit:
+            items = items[:max(limit - fetched, 0)]
+        fetched += len(items)
+        reached = limit is not None and fetched >= limit
+        more = more and nxt is not None and not reached
+        yield Page(items=items,
+                   cursor=PageCursor(cursor=cursor, next_cursor=nxt if more else None, has_more=more,
+                                     page_index=page_index, fetched=fetched),
+                   response=res_json)
+        if not more:
+            break
+        cursor = nxt
+        page_index += 1
+
+
+def iter_checkpointed(make_pages: Callable[[Any, int], Iterator[Page]], endpoint: str, target: str,
+                      checkpoint_every: int = 5, replay: bool = True, limit: Optional[int] = None,
+                      max_age: float = DEFAULT_CHECKPOINT_MAX_AGE, db=None) -> Iterator[Page]:
+    """
+    带断点续传的分页迭代器，每 checkpoint_every 页把游标和已获取的条目写入数据库
+    中断后再次调用会从断点游标继续翻页，断点之前的页不会重新请求和签名
+    :param make_pages: make_pages(cursor, fetched) -> 分页迭代器，cursor 为 None 表示从头开始，fetched 为断点前已获取的条目数.
+    :param endpoint: 接口名.
+    :param target: 翻页目标（用户URL、sec_uid等）.
+    :param checkpoint_every: 每隔多少页保存一次断点.
+    :param replay: 续传时是否先把断点之前的条目作为一页产出.
+    :param limit: 最多获取的条目数，续传时产出的断点之前的条目不超过该数量.
+    :param max_age: 断点最长保留时间(秒)，更早的断点作废并从头翻页，<= 0 表示不限.
+    :param db: Database 实例，默认使用全局实例.
+    :return: 逐页产出 Page，全部翻页完成后清除断点.
+    """
+    if db is None:
+        from utils.database import get_database
+        db = get_database()
+    checkpoint_every = max(int(checkpoint_every), 1)
+
+    start_cursor = None
+    page_offset = 0
+    fetched_offset = 0
+    checkpoint = db.get_pagination_checkpoint(endpoint, target)
+    if checkpoint and max_age > 0:
+        age = (datetime.now() - datetime.fromisoformat(checkpoint['updated_at'])).total_seconds()
+        if age > max_age:
+            logger.info(f'{endpoint} {target} 的断点已保存 {int(age)} 秒, 超过 {int(max_age)} 秒, 从第 1 页重新开始')
+            db.clear_pagination_checkpoint(endpoint, target)
+            checkpoint = None
+    if checkpoint:
+        start_cursor = checkpoint['cursor']
+        page_offset = checkpoint['page_index'] + 1
+        fetched_offset = checkpoint['fetched']
+        logger.info(f'{endpoint} {target} 从第 {page_offset + 1} 页断点继续, 已获取 {fetched_offset} 条')
+        # 断点之前已获取的条目达到本次的数量上限时不再翻页
+        reached = limit is not None and fetched_offset >= limit
+        if replay:
+            items = db.get_pagination_items(endpoint, target)
+            if limit is not None:
+                items = items[:limit]
+            yield Page(items=items,
+                       cursor=PageCursor(cursor=None, next_cursor=None if reached else start_cursor,
+                                         has_more=not reached, page_index=checkpoint['page_index'],
+                                         fetched=min(fetched_offset, limit) if limit is not None else fetched_offset))
+        if reached:
+            db.clear_pagination_checkpoint(endpoint, target)
+            return
+
+    pending: List[List[Dict[str, Any]]] = []
+    first_pending_index = page_offset
+    last_cursor: Optional[PageCursor] = None
+    completed = False
+
+    def flush():
+        nonlocal pending, first_pending_index
+        if pending and last_cursor is not None:
+            db.save_pagination_checkpoint(endpoint, target, last_cursor.next_cursor, last_cursor.page_index,
+                                          last_cursor.fetched, pending, first_pending_index)
+            first_pending_index = last_cursor.page_index + 1
+            pending = []
+
+    try:
+        for page in make_pages(start_cursor, fetched_offset):
+            page.cursor.page_index += page_offset
+            page.cursor.fetched += fetched_offset
+            pending.append(page.items)
+            last_cursor = page.cursor
+            if not page.cursor.has_more:
+                completed = True
+            elif len(pending) >= checkpoint_every:
+                flush()
+            yield page
+        completed = True
+    finally:
+        if completed:
+            db.clear_pagination_checkpoint(endpoint, target)
+        else:
+            # 异常或调用方提前结束，保存最后一次成功的游标
+            flush()
+
+
+def iter_items(pages: Iterator[Page]) -> Iterator[Dict[str, Any]]:
+    """把分页迭代器展开为逐条迭代器"""
+    for page in pages:
+        for item in page.items:
+            yield item
+
+
+_SENTINEL = object()
+
+
+async def aiter_pages(pages: Iterator[Page]) -> AsyncIterator[Page]:
+    """
+    把同步分页迭代器包装为异步迭代器，每一页的请求在线程池中执行，不阻塞事件循环
+    :param pages: 同步分页迭代器.
+    """
+    loop = asyncio.get_event_loop()
+    # 任务被取消时线程池中的请求仍在执行，关闭迭代器前需等待其结束
+    step = threading.Lock()
+
+    def fetch_next():
+        with step:
+            return next(pages, _SENTINEL)
+
+    def close_pages():
+        close = getattr(pages, 'close', None)
+        if close is not None:
+            with step:
+                close()
+
+    # 线程池中的请求沿用调用方声明的请求类别
+    fetch_next = bind_priority(fetch_next)
+    try:
+        while True:
+            page = await loop.run_in_executor(None, fetch_next)
+            if page is _SENTINEL:
+                break
+            yield page
+    finally:
+        # 调用方提前结束或任务被取消时关闭同步迭代器，保存断点等收尾工作也在线程池中执行
+        await loop.run_in_executor(None, close_pages)
+
+
+async def aiter_items(pages: AsyncIterator[Page]) -> AsyncIterator[Dict[str, Any]]:
+    """把异步分页迭代器展开为逐条异步迭代器"""
+    async for page in pages:
+        for item in page.items:
+            yield item
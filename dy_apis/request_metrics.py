@@ -0,0 +1,281 @@
+# coding=utf-8
+"""
+请求指标
+DouyinAPI 的每个请求生成一条 RequestRecord，包含接口名、各阶段耗时、状态码、响应字节数和重试次数
+阶段: webid(请求网页获取 webid)、sign(计算 a_bogus)、queue(请求调度器排队)、network(发送到收到响应)、
+decode(解码响应)、total(从开始准备到解码完成)
+记录先交给 add_request_hook 注册的钩子，再计入进程内按接口和阶段划分的直方图，
+summary 给出 p50/p95/p99，export_prometheus 输出 Prometheus 文本格式
+搜索翻页的预签名流水线另外按接口统计预签名请求的命中(被下一页使用)和作废(预测的偏移量不对)次数
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+PHASES = ('webid', 'sign', 'queue', 'network', 'decode', 'total')
+QUANTILES = (0.5, 0.95, 0.99)
+# 直方图桶上界(秒)，最后隐含 +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class RequestRecord:
+    """单个请求的记录"""
+    endpoint: str
+    method: str = 'GET'
+    status: Optional[int] = None  # HTTP 状态码, 未收到响应时为 None
+    bytes: int = 0  # 响应体字节数, 重试时累加
+    retries: int = 0
+    phases: Dict[str, float] = field(default_factory=dict)  # 阶段 -> 耗时(秒), 重试时累加
+    error: Optional[str] = None  # 抛出的异常类型
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def status_label(self) -> str:
+        if self.error is not None and self.status is None:
+            return 'error'
+        return str(self.status) if self.status is not None else 'unknown'
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase: str):
+        """计时一个阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(phase, time.perf_counter() - start)
+
+    def set_response(self, resp):
+        """记录响应的状态码和字节数"""
+        self.status = resp.status_code
+        self.bytes += len(resp.content)
+
+
+class LatencyHistogram:
+    """固定桶直方图，分位数按桶内线性插值估算(与 Prometheus histogram_quantile 一致)"""
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+class RequestMetrics:
+    """请求指标汇总"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._requests: Dict[Tuple[str, str], int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._retries: Dict[str, int] = {}
+        self._sign_ahead: Dict[Tuple[str, str], int] = {}
+        self._hooks: List[Callable[[RequestRecord], Any]] = []
+
+    def add_hook(self, hook: Callable[[RequestRecord], Any]):
+        """
+        注册钩子, 每个请求结束后以 RequestRecord 调用, 钩子抛出的异常只记录日志
+        :param hook: hook(record).
+        """
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[RequestRecord], Any]):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def record(self, record: RequestRecord):
+        """计入一条请求记录"""
+        with self._lock:
+            hooks = list(self._hooks)
+            for phase, seconds in record.phases.items():
+                key = (record.endpoint, phase)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram()
+                histogram.observe(seconds)
+            key = (record.endpoint, record.status_label)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._bytes[record.endpoint] = self._bytes.get(record.endpoint, 0) + record.bytes
+            self._retries[record.endpoint] = self._retries.get(record.endpoint, 0) + record.retries
+        for hook in hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                logger.error(f"请求指标钩子执行失败: {e}")
+
+    def record_sign_ahead(self, endpoint: str, hit: bool):
+        """
+        计入一次预签名结果
+        :param endpoint: 接口名.
+        :param hit: True 表示预签名的请求被下一页使用, False 表示预测错误被作废.
+        """
+        key = (endpoint, 'hit' if hit else 'miss')
+        with self._lock:
+            self._sign_ahead[key] = self._sign_ahead.get(key, 0) + 1
+
+    def reset(self):
+        """清空统计, 保留钩子"""
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._bytes.clear()
+            self._retries.clear()
+            self._sign_ahead.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        按接口汇总
+        :return: {接口: {'requests': {状态: 次数}, 'bytes', 'retries', 'phases': {阶段: {count, avg, p50, p95, p99}}}},
+            使用过预签名的接口另有 'sign_ahead': {'hit': 次数, 'miss': 次数}
+        """
+        with self._lock:
+            result = {}
+            for (endpoint, status), count in self._requests.items():
+                entry = result.setdefault(endpoint, {'requests': {}, 'bytes': self._bytes.get(endpoint, 0),
+                                                     'retries': self._retries.get(endpoint, 0), 'phases': {}})
+                entry['requests'][status] = count
+            for (endpoint, phase), histogram in sorted(self._histograms.items()):
+                phases = result[endpoint]['phases']
+                phases[phase] = {'count': histogram.count, 'avg': round(histogram.sum / histogram.count, 4)}
+                for q in QUANTILES:
+                    phases[phase][f'p{int(q * 100)}'] = round(histogram.quantile(q), 4)
+            for (endpoint, outcome), count in self._sign_ahead.items():
+                if endpoint in result:
+                    result[endpoint].setdefault('sign_ahead', {'hit': 0, 'miss': 0})[outcome] = count
+            return result
+
+    def export_prometheus(self) -> str:
+        """Prometheus 文本格式(0.0.4)"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            lines.append('# HELP douyin_request_phase_seconds DouyinAPI 请求各阶段耗时')
+            lines.append('# TYPE douyin_request_phase_seconds histogram')
+            for (endpoint, phase), histogram in histograms:
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _format_float(bound)
+                    lines.append(f'douyin_request_phase_seconds_bucket'
+                                 f'{_labels(endpoint=endpoint, phase=phase, le=le)} {cumulative}')
+                labels = _labels(endpoint=endpoint, phase=phase)
+                lines.append(f'douyin_request_phase_seconds_sum{labels} {_format_float(histogram.sum)}')
+                lines.append(f'douyin_request_phase_seconds_count{labels} {histogram.count}')
+
+            lines.append('# HELP douyin_request_phase_quantile_seconds 按直方图估算的阶段耗时分位数')
+            lines.append('# TYPE douyin_request_phase_quantile_seconds gauge')
+            for (endpoint, phase), histogram in histograms:
+                for q in QUANTILES:
+                    lines.append(f'douyin_request_phase_quantile_seconds'
+                                 f'{_labels(endpoint=endpoint, phase=phase, quantile=q)} '
+                                 f'{_format_float(histogram.quantile(q))}')
+
+            lines.append('# HELP douyin_requests_total DouyinAPI 请求数')
+            lines.append('# TYPE douyin_requests_total counter')
+            for (endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'douyin_requests_total{_labels(endpoint=endpoint, status=status)} {count}')
+
+            lines.append('# HELP douyin_response_bytes_total 响应体字节数')
+            lines.append('# TYPE douyin_response_bytes_total counter')
+            for endpoint, total in sorted(self._bytes.items()):
+                lines.append(f'douyin_response_bytes_total{_labels(endpoint=endpoint)} {total}')
+
+            lines.append('# HELP douyin_request_retries_total 重试次数')
+            lines.append('# TYPE douyin_request_retries_total counter')
+            for endpoint, total in sorted(self._retries.items()):
+                lines.append(f'douyin_request_retries_total{_labels(endpoint=endpoint)} {total}')
+
+            lines.append('# HELP douyin_sign_ahead_total 预签名请求的命中和作废次数')
+            lines.append('# TYPE douyin_sign_ahead_total counter')
+            for (endpoint, outcome), count in sorted(self._sign_ahead.items()):
+                lines.append(f'douyin_sign_ahead_total{_labels(endpoint=endpoint, result=outcome)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+# 全局指标实例
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_request_metrics() -> RequestMetrics:
+    """获取全局请求指标"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = RequestMetrics()
+    return _metrics
+
+
+def add_request_hook(hook: Callable[[RequestRecord], Any]):
+    """注册请求结束后的钩子"""
+    get_request_metrics().add_hook(hook)
+
+
+def remove_request_hook(hook: Callable[[RequestRecord], Any]):
+    get_request_metrics().remove_hook(hook)
+
+
+@contextmanager
+def track_request(endpoint: str, method: str = 'GET', phases: Optional[Dict[str, float]] = None):
+    """
+    记录一个请求, 退出时计算 total 并计入全局指标, 异常照常抛出
+    :param endpoint: 接口名.
+    :param method: 请求方法.
+    :param phases: 已经发生的阶段耗时, 如 PreparedRequest.timings 中的 webid / sign.
+    :return: RequestRecord.
+    """
+    record = RequestRecord(endpoint, method)
+    record.phases.update(phases or {})
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.phases['total'] = time.perf_counter() - start + sum(
+            (phases or {}).get(phase, 0.0) for phase in ('webid', 'sign'))
+        get_request_metrics().record(record)
@@ -0,0 +1,183 @@
+# coding=utf-8
+"""
+请求调度器
+前台接口和后台扫描共用同一个 cookie，所有请求共享一个全局令牌桶，按优先级类别做加权公平排队:
+interactive(前台请求) > download(下载任务的元数据请求) > scan(订阅扫描) > backfill(新订阅的首次全量扫描)
+调用方通过 request_priority 声明当前类别，DouyinAPI 发送请求前调用 acquire 排队
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from os import getenv
+from typing import Any, Callable, Dict, Optional
+
+PRIORITY_CLASSES = ('interactive', 'download', 'scan', 'backfill')
+# 各类别的权重，队列都不空时按权重比例分配请求额度
+DEFAULT_WEIGHTS = {'interactive': 8, 'download': 4, 'scan': 2, 'backfill': 1}
+# 全局速率(次/秒)和突发容量，速率 <= 0 表示不限速
+DEFAULT_RATE = float(getenv('DY_REQUEST_RATE', '2'))
+DEFAULT_BURST = int(getenv('DY_REQUEST_BURST', '5'))
+
+# 未声明类别的请求(命令行、Flask 接口)按前台请求处理
+_current_priority = ContextVar('request_priority', default='interactive')
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+@contextmanager
+def request_priority(priority: str):
+    """
+    在上下文中声明请求类别
+    :param priority: PRIORITY_CLASSES 之一
+    """
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"未知的请求类别: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def bind_priority(func: Callable, priority: Optional[str] = None) -> Callable:
+    """
+    把请求类别绑定到函数上，用于线程和线程池任务(工作线程不继承调用方的上下文)
+    :param func: 在其他线程执行的函数.
+    :param priority: 请求类别, 默认取当前声明的类别.
+    """
+    priority = priority or current_priority()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_priority(priority):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@dataclass
+class ClassStats:
+    """单个类别的排队统计"""
+    waiting: int = 0
+    dispatched: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class RequestScheduler:
+    """全局令牌桶 + 加权公平队列"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 weights: Optional[Dict[str, float]] = None):
+        """
+        :param rate: 每秒放行的请求数, <= 0 表示不限速.
+        :param burst: 令牌桶容量.
+        :param weights: 各类别权重, 默认 DEFAULT_WEIGHTS.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._cond = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        # 虚拟时间: 已放行请求的最大完成标记，新请求的完成标记从这里起算
+        self._virtual_time = 0.0
+        self._last_finish = {name: 0.0 for name in self.weights}
+        self._queue = []
+        self._seq = itertools.count()
+        self._stats = {name: ClassStats() for name in self.weights}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        排队等待发送许可
+        :param priority: 请求类别, 默认取 request_priority 声明的类别.
+        :param timeout: 最长等待时间(秒), 超时抛出 TimeoutError.
+        :return: 排队耗时(秒).
+        """
+        priority = priority or current_priority()
+        if priority not in self.weights:
+            raise ValueError(f"未知的请求类别: {priority}")
+        start = time.monotonic()
+        with self._cond:
+            stats = self._stats[priority]
+            if self.rate <= 0:
+                stats.dispatched += 1
+                return 0.0
+            # 同类别的请求依次排在该类别上一个请求之后，权重越大间隔越小
+            finish = max(self._virtual_time, self._last_finish[priority]) + 1.0 / self.weights[priority]
+            self._last_finish[priority] = finish
+            entry = (finish, next(self._seq), priority)
+            heapq.heappush(self._queue, entry)
+            stats.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    is_head = self._queue[0] is entry
+                    if is_head and self._tokens >= 1:
+                        break
+                    # 队首等待令牌补充，其余等待被唤醒
+                    wait = (1 - self._tokens) / self.rate if is_head else None
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            raise TimeoutError(f"{priority} 请求排队超时")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+                heapq.heappop(self._queue)
+                self._tokens -= 1
+                self._virtual_time = max(self._virtual_time, finish)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                stats.waiting -= 1
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            stats.dispatched += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """各类别的排队深度、已放行数和等待时间"""
+        with self._cond:
+            self._refill(time.monotonic())
+            classes = {
+                name: {
+                    'weight': self.weights[name],
+                    'depth': s.waiting,
+                    'dispatched': s.dispatched,
+                    'avg_wait': round(s.total_wait / s.dispatched, 3) if s.dispatched else 0.0,
+                    'max_wait': round(s.max_wait, 3),
+                }
+                for name, s in self._stats.items()
+            }
+            return {'rate': self.rate, 'burst': self.burst, 'tokens': round(self._tokens, 2), 'classes': classes}
+
+
+# 全局调度器实例
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """获取全局请求调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
@@ -0,0 +1,116 @@
+# coding=utf-8
+"""
+接口响应解码
+直接从响应字节解码，依次使用 msgspec、orjson、标准库 json 中已安装的第一个
+安装了 msgspec 时，作品列表、作品详情、评论列表和用户信息按投影结构解码，只构建下方 PROJECTIONS 中列出的字段，
+其余接口以及与投影结构不符的响应按完整 JSON 解码
+环境变量 DY_JSON_DECODER 可指定 msgspec / orjson / json，DY_JSON_PROJECTION=0 关闭投影
+"""
+import json
+from os import getenv
+from typing import Any, Dict, List, Optional, Union
+
+from loguru import logger
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 投影结构: 字段 -> None 表示原样保留该字段的值, dict 表示嵌套对象, [dict] 表示对象列表
+_URL = {'uri': None, 'url_list': None, 'width': None, 'height': None}
+_IMAGE = dict(_URL, download_url_list=None, url=None)
+_USER = {
+    'uid': None, 'sec_uid': None, 'unique_id': None, 'short_id': None, 'nickname': None, 'signature': None,
+    'avatar_thumb': _URL, 'avatar_medium': _URL, 'avatar_larger': _URL,
+    'following_count': None, 'follower_count': None, 'total_favorited': None, 'aweme_count': None,
+    'favoriting_count': None, 'user_age': None, 'gender': None, 'ip_location': None,
+    'custom_verify': None, 'enterprise_verify_reason': None,
+}
+_AWEME = {
+    'aweme_id': None, 'desc': None, 'create_time': None, 'duration': None, 'aweme_type': None,
+    'is_top': None, 'preview_title': None, 'author': _USER, 'user': {'ip_location': None},
+    'video': {'play_addr': _URL, 'cover': _URL, 'origin_cover': _URL, 'duration': None, 'width': None, 'height': None},
+    'images': [_IMAGE], 'statistics': None,
+    'text_extra': [{'hashtag_name': None, 'hashtag_id': None, 'type': None, 'start': None, 'end': None}],
+}
+_COMMENT = {
+    'cid': None, 'aweme_id': None, 'text': None, 'create_time': None, 'digg_count': None,
+    'reply_comment_total': None, 'reply_id': None, 'reply_to_reply_id': None, 'ip_label': None,
+    'label_text': None, 'image_list': None, 'user': _USER,
+}
+_COMMENT_PAGE = {'status_code': None, 'status_msg': None, 'cursor': None, 'has_more': None, 'total': None,
+                 'comments': [_COMMENT]}
+
+PROJECTIONS: Dict[str, Dict[str, Any]] = {
+    'user_work': {'status_code': None, 'status_msg': None, 'has_more': None, 'max_cursor': None,
+                  'min_cursor': None, 'aweme_list': [_AWEME]},
+    'work_detail': {'status_code': None, 'status_msg': None, 'filter_detail': None, 'aweme_detail': _AWEME},
+    'comment_list': _COMMENT_PAGE,
+    'comment_reply_list': _COMMENT_PAGE,
+    'user_profile': {'status_code': None, 'status_msg': None, 'user': _USER},
+}
+
+
+def _select_backend() -> str:
+    backend = getenv('DY_JSON_DECODER', '').lower()
+    available = {'msgspec': msgspec is not None, 'orjson': orjson is not None, 'json': True}
+    if backend in available:
+        if available[backend]:
+            return backend
+        logger.warning(f"DY_JSON_DECODER={backend} 未安装, 自动选择解码器")
+    return next(name for name, ok in available.items() if ok)
+
+
+BACKEND = _select_backend()
+PROJECTION_ENABLED = BACKEND == 'msgspec' and getenv('DY_JSON_PROJECTION', '1') != '0'
+
+
+def _build_struct(name: str, spec: Dict[str, Any]):
+    """按投影结构生成 msgspec.Struct, 未出现的字段为 UNSET, 转换为 dict 时省略"""
+    fields = []
+    for field, sub in spec.items():
+        if sub is None:
+            field_type = Any
+        elif isinstance(sub, list):
+            field_type = Union[List[_build_struct(f'{name}_{field}', sub[0])], None, msgspec.UnsetType]
+        else:
+            field_type = Union[_build_struct(f'{name}_{field}', sub), None, msgspec.UnsetType]
+        fields.append((field, field_type, msgspec.UNSET))
+    return msgspec.defstruct(name, fields)
+
+
+_decoders: Dict[str, Any] = {}
+if PROJECTION_ENABLED:
+    _decoders = {endpoint: msgspec.json.Decoder(_build_struct(endpoint, spec)) for endpoint, spec in PROJECTIONS.items()}
+_full_decoder = msgspec.json.Decoder() if BACKEND == 'msgspec' else None
+
+
+def decode_full(body: Union[bytes, str]) -> Any:
+    """完整解码"""
+    if BACKEND == 'msgspec':
+        return _full_decoder.decode(body)
+    if BACKEND == 'orjson':
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decode_response(body: Union[bytes, str], endpoint: Optional[str] = None) -> Any:
+    """
+    解码接口响应
+    :param body: 响应字节(resp.content).
+    :param endpoint: 接口名, 有投影结构时只构建投影字段.
+    :return: JSON.
+    """
+    decoder = _decoders.get(endpoint)
+    if decoder is not None:
+        try:
+            return msgspec.to_builtins(decoder.decode(body))
+        except msgspec.ValidationError as e:
+            logger.debug(f"{endpoint} 响应与投影结构不符, 完整解码: {e}")
+    return decode_full(body)
@@ -0,0 +1,121 @@
+# coding=utf-8
+"""
+预签名流水线，适用于下一页参数可以提前确定的接口（按 offset 翻页的搜索接口）
+当前页请求在途时，工作线程提前为下一页获取 webid 并计算 a_bogus，使签名耗时与网络等待重叠
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from builder.endpoints import PreparedRequest
+from dy_apis.request_metrics import get_request_metrics
+
+
+@dataclass
+class RequestTiming:
+    """单个请求的耗时"""
+    cursor: Any
+    sign_time: float  # 准备请求（webid + 签名）耗时
+    sign_wait: float  # 发送前等待签名完成的时间，完全重叠时接近0
+    network_time: float  # 发送请求到收到响应的耗时
+    prefetched: bool  # 是否使用了提前签好的请求
+
+    @property
+    def overlap(self) -> float:
+        """签名耗时中被网络等待掩盖的部分"""
+        return max(self.sign_time - self.sign_wait, 0.0)
+
+
+class SignAheadPipeline:
+    """预签名流水线"""
+
+    def __init__(self):
+        self.timings: List[RequestTiming] = []
+        self.misses = 0  # 预测的下一页参数与实际不符、预签名作废的次数
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sign-ahead')
+        self._pending: Dict[Any, Future] = {}
+
+    @staticmethod
+    def _timed_prepare(prepare: Callable[[Any], PreparedRequest], cursor: Any) -> Tuple[PreparedRequest, float]:
+        start = time.perf_counter()
+        prepared = prepare(cursor)
+        return prepared, time.perf_counter() - start
+
+    def fetcher(self, prepare: Callable[[Any], PreparedRequest], send: Callable[[PreparedRequest], Dict],
+                next_cursor: Callable[[Any], Optional[Any]]) -> Callable[[Any], Dict]:
+        """
+        生成可传给 iter_pages 的 fetch 函数
+        :param prepare: prepare(cursor) -> 签好名的请求.
+        :param send: send(prepared) -> 响应JSON.
+        :param next_cursor: next_cursor(cursor) -> 预测的下一页游标, None 表示不预签名.
+        """
+        def fetch(cursor):
+            start = time.perf_counter()
+            future = self._pending.pop(cursor, None)
+            if future is None:
+                prepared, sign_time = self._timed_prepare(prepare, cursor)
+            else:
+                prepared, sign_time = future.result()
+            sign_wait = time.perf_counter() - start
+            # 预签名的命中和作废计入请求指标
+            metrics = get_request_metrics()
+            if future is not None:
+                metrics.record_sign_ahead(prepared.endpoint.name, True)
+            for _ in range(self._discard_pending()):
+                metrics.record_sign_ahead(prepared.endpoint.name, False)
+
+            # 发送当前请求前开始准备下一页
+            guess = next_cursor(cursor)
+            if guess is not None:
+                self._pending[guess] = self._executor.submit(self._timed_prepare, prepare, guess)
+
+            sent = time.perf_counter()
+            res_json = send(prepared)
+            timing = RequestTiming(cursor=cursor, sign_time=sign_time, sign_wait=sign_wait,
+                                   network_time=time.perf_counter() - sent, prefetched=future is not None)
+            self.timings.append(timing)
+            logger.debug(f"请求 {cursor}: 签名 {timing.sign_time * 1000:.1f}ms, 等待签名 {timing.sign_wait * 1000:.1f}ms, "
+                         f"网络 {timing.network_time * 1000:.1f}ms")
+            return res_json
+
+        return fetch
+
+    def _discard_pending(self) -> int:
+        """作废预测错误的预签名请求, 返回作废的数量"""
+        discarded = len(self._pending)
+        for future in self._pending.values():
+            future.cancel()
+        self.misses += discarded
+        self._pending.clear()
+        return discarded
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总耗时统计"""
+        sign_total = sum(t.sign_time for t in self.timings)
+        overlap_total = sum(t.overlap for t in self.timings)
+        return {
+            'requests': len(self.timings),
+            'prefetched': sum(1 for t in self.timings if t.prefetched),
+            'misses': self.misses,
+            'sign_total': sign_total,
+            'sign_wait_total': sum(t.sign_wait for t in self.timings),
+            'network_total': sum(t.network_time for t in self.timings),
+            'overlap_total': overlap_total,
+            'overlap_ratio': overlap_total / sign_total if sign_total else 0.0,
+        }
+
+    def close(self):
+        """结束流水线，最后一页之后多签的请求直接丢弃"""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
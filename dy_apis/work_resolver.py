@@ -0,0 +1,64 @@
+# coding=utf-8
+"""
+批量获取作品详情，有限并发请求详情接口，结果按完成顺序返回
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from dy_apis.douyin_api import DouyinAPI
+from dy_apis.request_scheduler import bind_priority
+from utils.url_util import is_short_link, resolve_aweme_ids
+
+
+@dataclass
+class WorkDetailResult:
+    """单个作品的详情获取结果"""
+    index: int  # 在输入列表中的位置
+    source: str  # 输入的链接或作品ID
+    detail: Optional[Dict[str, Any]] = None  # aweme_detail
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.detail is not None
+
+
+def _fetch_detail(auth, index: int, work: str, aweme_id: Optional[str] = None) -> WorkDetailResult:
+    result = WorkDetailResult(index=index, source=work)
+    try:
+        res_json = DouyinAPI.get_work_info(auth, aweme_id or work)
+        detail = res_json.get('aweme_detail') if res_json else None
+        if not detail:
+            raise ValueError(f"API返回数据中没有aweme_detail字段: {work}")
+        result.detail = detail
+    except Exception as e:
+        logger.error(f"获取作品详情失败 {work}: {e}")
+        result.error = str(e)
+    return result
+
+
+def iter_work_details(auth, works: List[str], max_workers: int = 4) -> Iterator[WorkDetailResult]:
+    """
+    批量获取作品详情
+    详情接口一次只接受一个 aweme_id，因此以有限并发逐个请求，短链接先并发解析（带缓存）
+    :param auth: DouyinAuth object.
+    :param works: 作品链接或作品ID列表.
+    :param max_workers: 最大并发数.
+    :return: 按完成顺序产出 WorkDetailResult.
+    """
+    short_links = [work for work in works if is_short_link(work)]
+    aweme_ids = resolve_aweme_ids(short_links, max_workers=max_workers * 2) if short_links else {}
+    fetch_detail = bind_priority(_fetch_detail)
+    with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+        futures = [executor.submit(fetch_detail, auth, index, work, aweme_ids.get(work))
+                   for index, work in enumerate(works)]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # 调用方提前结束(如任务取消)时不再请求还没开始的作品
+            for future in futures:
+                future.cancel()
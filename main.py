@@ -1,11 +1,18 @@
 # coding=utf-8
 import json
 import os
+from contextlib import closing
 from loguru import logger
 
 from dy_apis.douyin_api import DouyinAPI
+from dy_apis.pagination import DEFAULT_CHECKPOINT_EVERY
+from dy_apis.sign_pipeline import SignAheadPipeline
+from dy_apis.work_resolver import iter_work_details
 from utils.common_util import init
-from utils.data_util import handle_work_info, download_work, save_to_xlsx
+from utils.data_util import handle_work_info
+from utils.download_queue import download_batch
+from utils.work_record import WorkRecord
+from utils.export_util import parse_save_choice, export_works, save_work_records, export_user_works
 from utils.database import get_database
 
 
@@ -43,22 +50,28 @@ class Data_Spider():
             logger.error(f"爬取作品失败 {work_url}: {e}")
             raise
 
-    def spider_some_work(self, auth, works: list, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, force_download=False, use_database=True):
+    def spider_some_work(self, auth, works: list, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, force_download=False, use_database=True, max_workers=4, on_result=None, cancel_token=None, batch=None):
         """
-        爬取一些作品的信息
+        爬取一些作品的信息，作品详情并发获取，每获取到一个就开始下载
         :param auth: 用户认证信息
-        :param works: 作品链接列表
+        :param works: 作品链接或作品ID列表
         :param base_path: 保存路径
-        :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
+        :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel, csv/jsonl/parquet: 导出为对应格式, all-csv/all-jsonl/all-parquet: 保存媒体并导出为对应格式
         :param excel_name: excel文件名
         :param force_download: 是否强制下载
         :param use_database: 是否使用数据库优化
+        :param max_workers: 并发获取作品详情的数量
+        :param on_result: on_result(url, work_info, stats, error) 每个作品处理完成时回调，提供时单个作品失败不会中断整批任务
+        :param cancel_token: 取消标记(utils.job_manager.CancelToken)，每个作品开始处理前检查，取消后不再请求剩余作品
+        :param batch: 调用方已创建的下载批次(提交任务时已写入占位行)，默认新建
         :return:
         """
-        if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
+        media_choice, export_format = parse_save_choice(save_choice)
+        if export_format and excel_name == '':
             raise ValueError('excel_name 不能为空')
         
         work_list = []
+        authors = {}
         download_stats = {
             'total_works': 0,
             'works_downloaded': 0,
@@ -68,58 +81,80 @@ class Data_Spider():
             'files_failed': 0
         }
         
-        for work_url in works:
-            work_info = self.spider_work(auth, work_url)
-            work_list.append(work_info)
-            download_stats['total_works'] += 1
+        # 作品下载前先写入持久下载队列，进程中断后重启时继续下载
+        if batch is None:
+            batch = download_batch(base_path['media'], media_choice, force_download, use_database and bool(media_choice))
+        with closing(iter_work_details(auth, works, max_workers)) as results, batch:
+            for result in results:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not result.ok:
+                    if on_result is None:
+                        raise ValueError(f"爬取作品失败 {result.source}: {result.error}")
+                    on_result(result.source, None, None, result.error)
+                    continue
             
-        for work_info in work_list:
-            if save_choice == 'all' or 'media' in save_choice:
-                stats = download_work(work_info, base_path['media'], save_choice, force_download, use_database)
-                download_stats['files_downloaded'] += stats['files_downloaded']
-                download_stats['files_skipped'] += stats['files_skipped']
-                download_stats['files_failed'] += stats['files_failed']
+                # 只保留 WorkRecord，原始详情随即释放
+                record = WorkRecord.from_aweme(result.detail, authors)
+                work_info = record.to_dict()
+                logger.info(f'爬取作品信息 {result.source}')
+                work_list.append((result.index, record))
+                download_stats['total_works'] += 1
+            
+                stats = None
+                if media_choice:
+                    try:
+                        stats = batch.download(work_info, result.source)
+                    except Exception as e:
+                        if on_result is None:
+                            raise
+                        on_result(result.source, work_info, None, str(e))
+                        continue
+                    download_stats['files_downloaded'] += stats['files_downloaded']
+                    download_stats['files_skipped'] += stats['files_skipped']
+                    download_stats['files_failed'] += stats['files_failed']
                 
-                if stats['files_downloaded'] > 0:
-                    download_stats['works_downloaded'] += 1
-                elif stats['files_skipped'] == stats['total_files']:
-                    download_stats['works_skipped'] += 1
+                    if stats['files_downloaded'] > 0:
+                        download_stats['works_downloaded'] += 1
+                    elif stats['files_skipped'] == stats['total_files']:
+                        download_stats['works_skipped'] += 1
+            
+                if on_result is not None:
+                    on_result(result.source, work_info, stats, None)
+        
+        save_work_records(record.to_dict() for _, record in work_list)
                     
-        if save_choice == 'all' or save_choice == 'excel':
-            file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
-            save_to_xlsx(work_list, file_path)
+        if export_format:
+            # 按输入顺序保存
+            export_works((record.to_dict() for _, record in sorted(work_list, key=lambda x: x[0])), export_format, base_path['excel'], excel_name)
         
         logger.info(f'批量爬取完成 - 总作品: {download_stats["total_works"]}, 新下载: {download_stats["works_downloaded"]}, 跳过: {download_stats["works_skipped"]}, 文件下载: {download_stats["files_downloaded"]}, 文件跳过: {download_stats["files_skipped"]}, 文件失败: {download_stats["files_failed"]}')
         return download_stats
 
 
-    def spider_user_all_work(self, auth, user_url: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, force_download=False, use_database=True, selected_videos=None):
+    def spider_user_all_work(self, auth, user_url: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None, force_download=False, use_database=True, selected_videos=None, cancel_token=None, batch=None):
         """
         爬取一个用户的所有作品，支持数据库预过滤
         :param auth: 用户认证信息
         :param user_url: 用户链接
         :param base_path: 保存路径
-        :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
+        :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel, csv/jsonl/parquet: 导出为对应格式, all-csv/all-jsonl/all-parquet: 保存媒体并导出为对应格式
         :param excel_name: excel文件名
         :param proxies: 代理
         :param force_download: 是否强制下载
         :param use_database: 是否使用数据库优化
         :param selected_videos: 选中的视频ID列表，如果提供则只下载选中的视频
+        :param cancel_token: 取消标记(utils.job_manager.CancelToken)，每页和每个作品下载前检查
+        :param batch: 调用方已创建的下载批次(提交任务时已写入占位行)，默认新建
         :return:
         """
         user_info = self.douyin_apis.get_user_info(auth, user_url)
-        work_list = self.douyin_apis.get_user_all_work_info(auth, user_url)
-        
-        # 如果提供了选中的视频列表，则过滤作品列表
-        if selected_videos:
-            work_list = [work for work in work_list if work.get('aweme_id', '') in selected_videos]
-            logger.info(f'用户选择了 {len(work_list)} 个作品进行下载')
         
         # 提取用户ID用于数据库查询
         user_id = user_info['user'].get('sec_uid', '')
         
         download_stats = {
-            'total_works': len(work_list),
+            'total_works': 0,
             'works_downloaded': 0,
             'works_skipped': 0,
             'works_db_skipped': 0,  # 数据库预过滤跳过的数量
@@ -130,64 +165,65 @@ class Data_Spider():
         
         # 数据库预过滤（如果启用且不强制下载）
         db = get_database() if use_database else None
-        works_to_process = []
-        
+        downloaded_work_ids = set()
         if db and not force_download:
             # 获取已下载的作品ID集合
             downloaded_work_ids = db.get_downloaded_work_ids(user_id)
             logger.info(f'数据库显示用户 {user_id} 已下载 {len(downloaded_work_ids)} 个作品')
-            
-            # 过滤出需要处理的作品
-            for work_info in work_list:
-                work_id = work_info.get('aweme_id', '')
-                if work_id not in downloaded_work_ids:
-                    works_to_process.append(work_info)
-                else:
-                    download_stats['works_db_skipped'] += 1
-            
-            logger.info(f'数据库预过滤: 总作品 {len(work_list)}, 需处理 {len(works_to_process)}, 数据库跳过 {download_stats["works_db_skipped"]}')
-        else:
-            works_to_process = work_list
         
-        logger.info(f'用户 {user_url} 作品数量: {len(work_list)}, 需要处理: {len(works_to_process)}')
-        
-        if save_choice == 'all' or save_choice == 'excel':
+        media_choice, export_format = parse_save_choice(save_choice)
+        if export_format:
             excel_name = user_url.split('/')[-1].split('?')[0]
-
-        work_info_list = []
         
-        # 处理需要下载的作品
-        for work_info in works_to_process:
-            work_info['author'].update(user_info['user'])
-            work_info = handle_work_info(work_info)
-            work_info_list.append(work_info)
-            logger.info(f'爬取作品信息 {work_info["work_url"]}')
-            
-            if save_choice == 'all' or 'media' in save_choice:
-                stats = download_work(work_info, base_path['media'], save_choice, force_download, use_database)
-                download_stats['files_downloaded'] += stats['files_downloaded']
-                download_stats['files_skipped'] += stats['files_skipped']
-                download_stats['files_failed'] += stats['files_failed']
+        # 逐页处理，拿到一页就开始下载，不必等全部翻页结束；每页待下载的作品先写入持久下载队列
+        if batch is None:
+            batch = download_batch(base_path['media'], media_choice, force_download, use_database and bool(media_choice))
+        with batch:
+            # 翻页断点保存在数据库中，中断或取消后再次爬取同一作者时从断点继续
+            for page in self.douyin_apis.iter_user_work_pages(auth, user_url, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                page_works = page.items
+                # 如果提供了选中的视频列表，则过滤作品列表
+                if selected_videos:
+                    page_works = [work for work in page_works if work.get('aweme_id', '') in selected_videos]
+                download_stats['total_works'] += len(page_works)
+                logger.info(f'用户 {user_url} 第 {page.cursor.page_index + 1} 页作品数量: {len(page_works)}')
                 
-                if stats['files_downloaded'] > 0:
-                    download_stats['works_downloaded'] += 1
-                elif stats['files_skipped'] == stats['total_files']:
-                    download_stats['works_skipped'] += 1
+                page_records = []
+                for work_info in page_works:
+                    work_info['author'].update(user_info['user'])
+                    page_records.append(handle_work_info(work_info))
+                # 作品信息按作者增量保存，已下载作品只更新有变化的统计数据，导出文件从中生成
+                save_work_records(page_records)
+                if media_choice:
+                    batch.add(work_info for work_info in page_records if work_info['work_id'] not in downloaded_work_ids)
+                
+                for work_info in page_records:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if work_info['work_id'] in downloaded_work_ids:
+                        download_stats['works_db_skipped'] += 1
+                        continue
+                    logger.info(f'爬取作品信息 {work_info["work_url"]}')
+                    
+                    if media_choice:
+                        stats = batch.download(work_info)
+                        download_stats['files_downloaded'] += stats['files_downloaded']
+                        download_stats['files_skipped'] += stats['files_skipped']
+                        download_stats['files_failed'] += stats['files_failed']
+                        
+                        if stats['files_downloaded'] > 0:
+                            download_stats['works_downloaded'] += 1
+                        elif stats['files_skipped'] == stats['total_files']:
+                            download_stats['works_skipped'] += 1
         
-        # 如果需要导出Excel，包含所有作品信息（包括已下载的）
-        if (save_choice == 'all' or save_choice == 'excel') and not force_download and db:
-            # 为已下载作品补充信息（用于Excel导出）
-            for work_info in work_list:
-                work_id = work_info.get('aweme_id', '')
-                if work_id in db.get_downloaded_work_ids(user_id):
-                    if not any(w['work_id'] == work_id for w in work_info_list):
-                        work_info['author'].update(user_info['user'])
-                        processed_work = handle_work_info(work_info)
-                        work_info_list.append(processed_work)
+        if selected_videos:
+            logger.info(f'用户选择了 {download_stats["total_works"]} 个作品进行下载')
+        logger.info(f'用户 {user_url} 作品数量: {download_stats["total_works"]}, 数据库跳过: {download_stats["works_db_skipped"]}')
                     
-        if save_choice == 'all' or save_choice == 'excel':
-            file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
-            save_to_xlsx(work_info_list, file_path)
+        if export_format:
+            export_user_works(user_id, export_format, base_path['excel'], excel_name)
             
         # 调整跳过统计（包含数据库预过滤的跳过）
         download_stats['works_skipped'] += download_stats['works_db_skipped']
@@ -195,13 +231,13 @@ class Data_Spider():
         logger.info(f'用户爬取完成 - 总作品: {download_stats["total_works"]}, 新下载: {download_stats["works_downloaded"]}, 跳过: {download_stats["works_skipped"]} (数据库预过滤: {download_stats["works_db_skipped"]}), 文件下载: {download_stats["files_downloaded"]}, 文件跳过: {download_stats["files_skipped"]}, 文件失败: {download_stats["files_failed"]}')
         return download_stats
 
-    def spider_some_search_work(self, auth, query: str, require_num: int, base_path: dict, save_choice: str,  sort_type: str, publish_time: str, filter_duration="", search_range="", content_type="",   excel_name: str = '', proxies=None, force_download=False, use_database=True):
+    def spider_some_search_work(self, auth, query: str, require_num: int, base_path: dict, save_choice: str,  sort_type: str, publish_time: str, filter_duration="", search_range="", content_type="",   excel_name: str = '', proxies=None, force_download=False, use_database=True, cancel_token=None):
         """
             :param auth: DouyinAuth object.
             :param query: 搜索关键字.
             :param require_num: 搜索结果数量.
             :param base_path: 保存路径.
-            :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
+            :param save_choice: 保存方式 all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel, csv/jsonl/parquet: 导出为对应格式, all-csv/all-jsonl/all-parquet: 保存媒体并导出为对应格式
             :param sort_type: 排序方式 0 综合排序, 1 最多点赞, 2 最新发布.
             :param publish_time: 发布时间 0 不限, 1 一天内, 7 一周内, 180 半年内.
             :param filter_duration: 视频时长 空字符串 不限, 0-1 一分钟内, 1-5 1-5分钟内, 5-10000 5分钟以上
@@ -210,12 +246,18 @@ class Data_Spider():
             :param excel_name: excel文件名
             :param force_download: 是否强制下载
             :param use_database: 是否使用数据库优化
+            :param cancel_token: 取消标记(utils.job_manager.CancelToken)，每个作品下载前检查
         """
-        work_info_list = []
-        work_list = self.douyin_apis.search_some_general_work(auth, query, require_num, sort_type, publish_time, filter_duration, search_range, content_type)
+        # 翻页时预先签好下一页的请求，签名与当前页的网络等待重叠
+        with SignAheadPipeline() as pipeline:
+            work_list = self.douyin_apis.search_some_general_work(auth, query, require_num, sort_type, publish_time, filter_duration, search_range, content_type, pipeline=pipeline)
+        # 搜索结果只保留 WorkRecord，不在整个下载过程中保留原始数据
+        authors = {}
+        records = [WorkRecord.from_aweme(work['aweme_info'], authors) for work in work_list]
+        del work_list
         
         download_stats = {
-            'total_works': len(work_list),
+            'total_works': len(records),
             'works_downloaded': 0,
             'works_skipped': 0,
             'files_downloaded': 0,
@@ -223,30 +265,36 @@ class Data_Spider():
             'files_failed': 0
         }
         
-        logger.info(f'搜索关键词 {query} 作品数量: {len(work_list)}')
-        if save_choice == 'all' or save_choice == 'excel':
+        logger.info(f'搜索关键词 {query} 作品数量: {len(records)}')
+        media_choice, export_format = parse_save_choice(save_choice)
+        if export_format:
             excel_name = query
             
-        for work_info in work_list:
-            logger.info(json.dumps(work_info))
-            logger.info(f'爬取作品信息 https://www.douyin.com/video/{work_info["aweme_info"]["aweme_id"]}')
-            work_info = handle_work_info(work_info['aweme_info'])
-            work_info_list.append(work_info)
-            
-            if save_choice == 'all' or 'media' in save_choice:
-                stats = download_work(work_info, base_path['media'], save_choice, force_download, use_database)
-                download_stats['files_downloaded'] += stats['files_downloaded']
-                download_stats['files_skipped'] += stats['files_skipped']
-                download_stats['files_failed'] += stats['files_failed']
+        # 所有搜索结果先写入持久下载队列，进程中断后重启时继续下载
+        with download_batch(base_path['media'], media_choice, force_download, use_database and bool(media_choice)) as batch:
+            if media_choice:
+                batch.add(record.to_dict() for record in records)
+            for record in records:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                logger.info(f'爬取作品信息 {record.work_url}')
+                work_info = record.to_dict()
                 
-                if stats['files_downloaded'] > 0:
-                    download_stats['works_downloaded'] += 1
-                elif stats['files_skipped'] == stats['total_files']:
-                    download_stats['works_skipped'] += 1
+                if media_choice:
+                    stats = batch.download(work_info)
+                    download_stats['files_downloaded'] += stats['files_downloaded']
+                    download_stats['files_skipped'] += stats['files_skipped']
+                    download_stats['files_failed'] += stats['files_failed']
+                    
+                    if stats['files_downloaded'] > 0:
+                        download_stats['works_downloaded'] += 1
+                    elif stats['files_skipped'] == stats['total_files']:
+                        download_stats['works_skipped'] += 1
+        
+        save_work_records(record.to_dict() for record in records)
                     
-        if save_choice == 'all' or save_choice == 'excel':
-            file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
-            save_to_xlsx(work_info_list, file_path)
+        if export_format:
+            export_works((record.to_dict() for record in records), export_format, base_path['excel'], excel_name)
             
         logger.info(f'搜索爬取完成 - 总作品: {download_stats["total_works"]}, 新下载: {download_stats["works_downloaded"]}, 跳过: {download_stats["works_skipped"]}, 文件下载: {download_stats["files_downloaded"]}, 文件跳过: {download_stats["files_skipped"]}, 文件失败: {download_stats["files_failed"]}')
         return download_stats
@@ -261,8 +309,8 @@ if __name__ == '__main__':
     auth, base_path = init()
 
     data_spider = Data_Spider()
-    # save_choice: all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
-    # save_choice 为 excel 或者 all 时，excel_name 不能为空
+    # save_choice: all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel, csv/jsonl/parquet: 导出为对应格式, all-csv/all-jsonl/all-parquet: 保存媒体并导出为对应格式
+    # save_choice 需要导出表格时，excel_name 不能为空
 
 
     # 1 爬取列表的所有作品信息 作品链接 如下所示 注意此url会过期！
@@ -0,0 +1,202 @@
+# coding=utf-8
+"""
+a_bogus 纯 Python 实现，输出与 static/dy_ab.js 中 get_ab 一致，不依赖 Node.js
+流程：查询参数、表单、UA 分别做 SM3 摘要，取其中几个字节与时间戳、浏览器环境串拼接后 RC4 加密，
+再在前面加上 12 字节随机头，用自定义字母表 base64 编码
+与 JS 实现的对比和耗时测试见 benchmarks/a_bogus_diff.py
+"""
+import random
+import struct
+import time
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+# 与 dy_ab.js 中 get_ab 的调用参数保持一致
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/117.0"
+ARGUMENTS = (0, 1, 8)
+# dy_ab.js 模拟的浏览器窗口环境
+WINDOW_ENV = "1707|809|1707|912|0|0|0|0|1707|912|1707|960|1697|809|24|24|Win32"
+SUFFIX = "cus"
+UA_ALPHABET = "ckdp1h4ZKsUB80/Mfvw36XIgR25+WQAlEi7NLboqYTOPuzmFjJnryx9HVGDaStCe"
+AB_ALPHABET = "Dkdpgh2ZmsQB80/MfvV36XI1R45-WUAlEixNLwoqYTOPuzKFjJnry79HbGcaStCe"
+# 随机头每组的掩码参数
+RANDOM_OPTIONS = ((3, 45), (1, 0), (1, 5))
+# dy_ab.js 中 aid 和 pageId 未配置，均为 0
+AID = 0
+PAGE_ID = 0
+
+_SM3_IV = (0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600, 0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E)
+_MASK = 0xFFFFFFFF
+
+
+def _rotl(x: int, n: int) -> int:
+    n %= 32
+    return ((x << n) | (x >> (32 - n))) & _MASK
+
+
+# 各轮常量 T_j 循环左移 j 位，预先算好
+_SM3_T = tuple(_rotl(0x79CC4519 if j < 16 else 0x7A879D8A, j) for j in range(64))
+
+
+def _sm3_compress(v: List[int], block: bytes) -> List[int]:
+    w = list(struct.unpack('>16I', block))
+    for j in range(16, 68):
+        x = w[j - 16] ^ w[j - 9] ^ _rotl(w[j - 3], 15)
+        w.append((x ^ _rotl(x, 15) ^ _rotl(x, 23)) ^ _rotl(w[j - 13], 7) ^ w[j - 6])
+    a, b, c, d, e, f, g, h = v
+    for j in range(64):
+        a12 = ((a << 12) | (a >> 20)) & _MASK
+        ss1 = (a12 + e + _SM3_T[j]) & _MASK
+        ss1 = ((ss1 << 7) | (ss1 >> 25)) & _MASK
+        ss2 = ss1 ^ a12
+        if j < 16:
+            ff = a ^ b ^ c
+            gg = e ^ f ^ g
+        else:
+            ff = (a & b) | (a & c) | (b & c)
+            gg = (e & f) | (~e & g)
+        tt1 = (ff + d + ss2 + (w[j] ^ w[j + 4])) & _MASK
+        tt2 = (gg + h + ss1 + w[j]) & _MASK
+        d = c
+        c = ((b << 9) | (b >> 23)) & _MASK
+        b = a
+        a = tt1
+        h = g
+        g = ((f << 19) | (f >> 13)) & _MASK
+        f = e
+        e = tt2 ^ _rotl(tt2, 9) ^ _rotl(tt2, 17)
+    return [x ^ y for x, y in zip(v, (a, b, c, d, e, f, g, h))]
+
+
+def sm3(data: bytes) -> bytes:
+    """
+    SM3 摘要
+    :param data: 原始字节
+    :return: 32 字节摘要
+    """
+    length = len(data)
+    data = data + b'\x80' + b'\x00' * ((55 - length) % 64) + struct.pack('>Q', length * 8)
+    v = list(_SM3_IV)
+    for i in range(0, len(data), 64):
+        v = _sm3_compress(v, data[i:i + 64])
+    return struct.pack('>8I', *v)
+
+
+def rc4(data: bytes, key: bytes) -> bytes:
+    """RC4 加解密"""
+    s = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + s[i] + key[i % len(key)]) & 255
+        s[i], s[j] = s[j], s[i]
+    i = j = 0
+    out = bytearray(len(data))
+    for k, byte in enumerate(data):
+        i = (i + 1) & 255
+        j = (j + s[i]) & 255
+        s[i], s[j] = s[j], s[i]
+        out[k] = byte ^ s[(s[i] + s[j]) & 255]
+    return bytes(out)
+
+
+def b64encode(data: bytes, alphabet: str, pad: str = '=') -> str:
+    """使用自定义字母表的 base64 编码"""
+    out = []
+    for i in range(0, len(data) - 2, 3):
+        n = (data[i] << 16) | (data[i + 1] << 8) | data[i + 2]
+        out.append(alphabet[n >> 18] + alphabet[(n >> 12) & 63] + alphabet[(n >> 6) & 63] + alphabet[n & 63])
+    rest = len(data) % 3
+    if rest:
+        n = int.from_bytes(data[len(data) - rest:] + b'\x00' * (3 - rest), 'big')
+        chars = alphabet[n >> 18] + alphabet[(n >> 12) & 63] + alphabet[(n >> 6) & 63]
+        out.append(chars[:rest + 1] + pad * (3 - rest))
+    return ''.join(out)
+
+
+def _double_sm3(text: str) -> bytes:
+    return sm3(sm3((text + SUFFIX).encode('utf-8')))
+
+
+@lru_cache(maxsize=32)
+def _data_digest(data: str) -> bytes:
+    # GET 请求的表单恒为空，缓存后每次签名少算两次 SM3
+    return _double_sm3(data)
+
+
+@lru_cache(maxsize=8)
+def _ua_digest(user_agent: str, arg: int) -> bytes:
+    # dy_ab.js 会去掉 UA 首尾空白
+    encrypted = rc4(user_agent.strip().encode('utf-8'), bytes([0, 1, arg]))
+    return sm3(b64encode(encrypted, UA_ALPHABET).encode('utf-8'))
+
+
+def _random_header(values: Sequence[float]) -> bytes:
+    header = bytearray()
+    for value, (low, high) in zip(values, RANDOM_OPTIONS):
+        n = int(value * 10000)
+        header += bytes([
+            (n & 170) | (low & 85),
+            (n & 85) | (low & 170),
+            ((n >> 8) & 170) | (high & 85),
+            ((n >> 8) & 85) | (high & 170),
+        ])
+    return bytes(header)
+
+
+def _int_bytes(value: int) -> List[int]:
+    """大端 4 字节"""
+    return [(value >> 24) & 255, (value >> 16) & 255, (value >> 8) & 255, value & 255]
+
+
+def get_ab(params: str, data: str = "", user_agent: str = USER_AGENT, start_time: Optional[int] = None,
+           end_time: Optional[int] = None, randoms: Optional[Sequence[float]] = None,
+           window_env: str = WINDOW_ENV, arguments: Sequence[int] = ARGUMENTS) -> str:
+    """
+    生成 a_bogus
+    :param params: 拼接好的查询字符串
+    :param data: 拼接好的表单字符串，GET 请求为空
+    :param user_agent: 参与签名的 UA，需与 dy_ab.js 一致
+    :param start_time: 签名开始时间戳(毫秒)，默认当前时间
+    :param end_time: dy_ab.js 加载时的时间戳(毫秒)，execjs 每次调用都重新加载脚本，默认同 start_time
+    :param randoms: 随机头使用的 3 个 [0, 1) 随机数，默认随机生成
+    :param window_env: 浏览器环境串
+    :param arguments: 对应 get_ab 中传给 bdms 的前三个参数
+    :return: a_bogus
+    """
+    if start_time is None:
+        start_time = int(time.time() * 1000)
+    if end_time is None:
+        end_time = start_time
+    if randoms is None:
+        randoms = [random.random() for _ in RANDOM_OPTIONS]
+    params_digest = _double_sm3(params)
+    data_digest = _data_digest(data)
+    ua_digest = _ua_digest(user_agent, arguments[2])
+    env = window_env.encode('utf-8')
+
+    start = _int_bytes(start_time & _MASK)
+    end = _int_bytes(end_time & _MASK)
+    arg0 = _int_bytes(arguments[0])
+    arg1 = _int_bytes(arguments[1])
+    arg2 = _int_bytes(arguments[2])
+    page_id = _int_bytes(PAGE_ID)
+    aid = _int_bytes(AID)[::-1]
+    # 时间戳高位，按字节截断
+    start_high = [(start_time >> 32) & 255, (start_time >> 40) & 255]
+    end_high = [(end_time >> 32) & 255, (end_time >> 40) & 255]
+    arg1_legacy = [(arguments[1] // 256) & 255, (arguments[1] % 256) & 255]
+
+    body = [
+        44, start[0], page_id[0], arg0[0], arg1_legacy[0], arg2[0], aid[1],
+        params_digest[21], data_digest[21], page_id[1], ua_digest[23],
+        start[1], arg0[1], page_id[2], page_id[3], arg1_legacy[1], arg2[1], aid[0],
+        params_digest[22], data_digest[22], ua_digest[24],
+        start[2], arg0[2], arg1[0], aid[3], arg2[2], start[3], arg0[3], arg1[1], arg2[3],
+        end[0], end[1], aid[2], end[2], end[3], 12, end_high[0], end_high[1], start_high[0], start_high[1],
+        len(env) & 255, (len(env) >> 8) & 255, 0, 0,
+    ]
+    checksum = 0
+    for byte in body:
+        checksum ^= byte
+    plain = bytes(body) + env + bytes([checksum])
+    return b64encode(_random_header(randoms) + rc4(plain, b'y'), AB_ALPHABET)
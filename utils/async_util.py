@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+事件循环辅助工具
+run_blocking 把同步的 HTTP 请求和数据库操作放到线程池执行，LoopLagWatchdog 统计事件循环被阻塞的时长
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+# 扫描器的同步调用使用独立线程池，不占用 asyncio 默认线程池
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='scan-io')
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """
+    在线程池中执行同步函数，沿用调用方的上下文（请求类别等 ContextVar）
+    :param func: 同步函数.
+    :return: 函数返回值.
+    """
+    loop = asyncio.get_event_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+class LoopLagWatchdog:
+    """定时 sleep 并测量实际唤醒延迟，延迟即事件循环被同步代码占用的时间"""
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.2, window: int = 240):
+        """
+        :param interval: 采样间隔(秒).
+        :param threshold: 超过该延迟(秒)记为一次阻塞并输出警告.
+        :param window: 计算分位数使用的最近采样数.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self._samples = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._stalls = 0
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self._samples.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            if lag > self.threshold:
+                self._stalls += 1
+                logger.warning(f"事件循环阻塞 {lag:.3f} 秒")
+
+    def start(self):
+        """在当前事件循环中启动，已启动时直接返回"""
+        if self._task is not None and not self._task.done():
+            return
+        self._started_at = time.time()
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """最近采样的延迟分位数、历史最大延迟和阻塞次数(秒)"""
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            return round(samples[min(int(len(samples) * p), len(samples) - 1)], 4) if samples else 0.0
+
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'samples': len(samples),
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': round(self._max_lag, 4),
+            'stalls': self._stalls,
+            'threshold': self.threshold,
+        }
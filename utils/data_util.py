@@ -2,11 +2,11 @@ import json
 import os
 import re
 import time
-import openpyxl
 import requests
 from loguru import logger
 from retry import retry
 from .database import get_database
+from .work_record import WorkRecord
 
 
 def norm_str(str):
@@ -27,109 +27,128 @@ def timestamp_to_str(timestamp):
 
 
 def handle_work_info(data):
-    sec_uid = data['author']['sec_uid']
-    user_url = f'https://www.douyin.com/user/{sec_uid}'
-    user_desc = data['author']['signature'] if 'signature' in data['author'] else '未知'
-    following_count = data['author']['following_count'] if 'following_count' in data['author'] else '未知'
-    follower_count = data['author']['follower_count'] if 'follower_count' in data['author'] else '未知'
-    total_favorited = data['author']['total_favorited'] if 'total_favorited' in data['author'] else '未知'
-    aweme_count = data['author']['aweme_count'] if 'aweme_count' in data['author'] else '未知'
-    user_id = data['author']['unique_id'] if 'unique_id' in data['author'] else '未知'
-    user_age = data['author']['user_age'] if 'user_age' in data['author'] else '未知'
-    gender = data['author']['gender'] if 'gender' in data['author'] else '未知'
-    if gender == 1:
-        gender = '男'
-    elif gender == 0:
-        gender = '女'
-    else:
-        gender = '未知'
-    try:
-        ip_location = data['user']['ip_location']
-    except:
-        ip_location = '未知'
-    aweme_id = data['aweme_id']
-    nickname = data['author']['nickname']
-    author_avatar = data['author']['avatar_thumb']['url_list'][0]
-    video_cover = data['video']['cover']['url_list'][0]
-    title = data['desc']
-    desc = data['desc']
-    admire_count = data['statistics']['admire_count'] if 'admire_count' in data['statistics'] else 0
-    digg_count = data['statistics']['digg_count']
-    commnet_count = data['statistics']['comment_count']
-    collect_count = data['statistics']['collect_count']
-    share_count = data['statistics']['share_count']
-    play_count = data['statistics']['play_count'] if 'play_count' in data['statistics'] else 0
-    video_addr = data['video']['play_addr']['url_list'][0]
-    images = data['images']
-    if not isinstance(images, list):
-        images = []
-    create_time = data['create_time']
-
-    text_extra = data['text_extra'] if 'text_extra' in data else []
-    text_extra = text_extra if text_extra else []
-    topics = []
-    for item in text_extra:
-        hashtag_name = item['hashtag_name'] if 'hashtag_name' in item else ''
-        if hashtag_name:
-            topics.append(hashtag_name)
-
-    work_type = '未知'
-    if 'aweme_type' in data:
-        if data['aweme_type'] == 68:
-            work_type = '图集'
-        elif data['aweme_type'] == 0:
-            work_type = '视频'
-
-    return {
-        'work_id': aweme_id,
-        'work_url': f'https://www.douyin.com/video/{aweme_id}',
-        'work_type': work_type,
-        'title': title,
-        'desc': desc,
-        'admire_count': admire_count,
-        'digg_count': digg_count,
-        'comment_count': commnet_count,
-        'collect_count': collect_count,
-        'share_count': share_count,
-        'play_count': play_count,
-        'video_addr': video_addr,
-        'images': images,
-        'topics': topics,
-        'create_time': create_time,
-        'video_cover': video_cover,
-        'user_url': user_url,
-        'user_id': user_id,
-        'nickname': nickname,
-        'author_avatar': author_avatar,
-        'user_desc': user_desc,
-        'following_count': following_count,
-        'follower_count': follower_count,
-        'total_favorited': total_favorited,
-        'aweme_count': aweme_count,
-        'user_age': user_age,
-        'gender': gender,
-        'ip_location': ip_location
-    }
+    """
+    提取作品信息
+    :param data: 接口返回的 aweme
+    :return: 作品信息字典，字段见 WorkRecord.to_dict
+    """
+    return WorkRecord.from_aweme(data).to_dict()
+
+
+XLSX_HEADERS = ['作品id', '作品url', '作品类型', '作品标题', '描述', 'admire数量', '点赞数量', '评论数量', '收藏数量', '分享数量', '播放数量', '视频地址url', '图片地址url列表', '标签', '上传时间', '视频封面url', '用户主页url', '用户id', '昵称', '头像url', '用户描述', '关注数量', '粉丝数量', '作品被赞和收藏数量', '作品数量', '用户年龄', '性别', 'ip归属地']
+# 单个工作表最多 1048576 行（含表头）
+XLSX_MAX_ROWS = 1048575
+
+
+def xlsx_row(data):
+    """把 handle_work_info 的结果转换为一行，所有值都转换为字符串，特别处理列表和字典类型"""
+    row = []
+    for v in data.values():
+        if isinstance(v, list):
+            row.append(', '.join(str(item) for item in v))
+        elif isinstance(v, dict):
+            row.append(str(v))
+        else:
+            row.append(norm_text(str(v)))
+    return row
+
+
+class XlsxStreamWriter:
+    """
+    流式 Excel 写入，使用 openpyxl 的 write-only 模式，写入的行直接落到临时文件，内存占用不随行数增长
+    达到 max_rows 后换新的工作表（split='sheet'）或新的文件（split='file'，name_2.xlsx、name_3.xlsx ...），
+    按文件拆分时写满的文件立即保存，中途崩溃只丢失最后一个文件
+    """
+
+    def __init__(self, file_path, max_rows=None, split='sheet'):
+        """
+        :param file_path: 保存路径
+        :param max_rows: 每个工作表/文件的最大数据行数，默认 Excel 上限
+        :param split: 超出 max_rows 时的拆分方式 sheet: 新工作表, file: 新文件
+        """
+        if split not in ('sheet', 'file'):
+            raise ValueError(f'未知的拆分方式: {split}')
+        self.file_path = file_path
+        self.max_rows = min(max_rows or XLSX_MAX_ROWS, XLSX_MAX_ROWS)
+        self.split = split
+        self.files = []
+        self.total_rows = 0
+        self._wb = None
+        self._ws = None
+        self._sheet_rows = 0
+        self._sheet_count = 0
+
+    def _part_path(self):
+        if not self.files:
+            return self.file_path
+        root, ext = os.path.splitext(self.file_path)
+        return f'{root}_{len(self.files) + 1}{ext}'
+
+    def _new_sheet(self):
+        import openpyxl
+        if self._wb is None:
+            self._wb = openpyxl.Workbook(write_only=True)
+            self._sheet_count = 0
+        self._sheet_count += 1
+        self._ws = self._wb.create_sheet('Sheet' if self._sheet_count == 1 else f'Sheet{self._sheet_count}')
+        self._ws.append(XLSX_HEADERS)
+        self._sheet_rows = 0
+
+    def _save(self):
+        if self._wb is None:
+            return
+        file_path = self._part_path()
+        self._wb.save(file_path)
+        self.files.append(file_path)
+        self._wb = None
+        self._ws = None
+        logger.info(f'数据保存至 {file_path}')
+
+    def write(self, data):
+        """
+        写入一条作品信息
+        :param data: handle_work_info 的结果
+        """
+        if self._ws is None or self._sheet_rows >= self.max_rows:
+            if self._ws is not None and self.split == 'file':
+                self._save()
+            self._new_sheet()
+        self._ws.append(xlsx_row(data))
+        self._sheet_rows += 1
+        self.total_rows += 1
+
+    def close(self):
+        """保存最后一个文件，没有写入任何数据时也生成只有表头的文件"""
+        if self._wb is None and not self.files:
+            self._new_sheet()
+        self._save()
+        return self.files
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def save_to_xlsx_stream(datas, file_path, max_rows=None, split='sheet'):
+    """
+    流式保存作品信息到 Excel
+    :param datas: 作品信息的可迭代对象，可以是生成器
+    :param file_path: 保存路径
+    :param max_rows: 每个工作表/文件的最大数据行数
+    :param split: 超出 max_rows 时的拆分方式 sheet: 新工作表, file: 新文件
+    :return: 生成的文件列表
+    """
+    writer = XlsxStreamWriter(file_path, max_rows, split)
+    with writer:
+        for data in datas:
+            writer.write(data)
+    return writer.files
 
 
 def save_to_xlsx(datas, file_path):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    headers = ['作品id', '作品url', '作品类型', '作品标题', '描述', 'admire数量', '点赞数量', '评论数量', '收藏数量', '分享数量', '播放数量', '视频地址url', '图片地址url列表', '标签', '上传时间', '视频封面url', '用户主页url', '用户id', '昵称', '头像url', '用户描述', '关注数量', '粉丝数量', '作品被赞和收藏数量', '作品数量', '用户年龄', '性别', 'ip归属地']
-    ws.append(headers)
-    for data in datas:
-        # 确保所有值都转换为字符串，特别处理列表和字典类型
-        processed_data = {}
-        for k, v in data.items():
-            if isinstance(v, list):
-                processed_data[k] = ', '.join(str(item) for item in v)
-            elif isinstance(v, dict):
-                processed_data[k] = str(v)
-            else:
-                processed_data[k] = norm_text(str(v))
-        ws.append(list(processed_data.values()))
-    wb.save(file_path)
-    logger.info(f'数据保存至 {file_path}')
+    save_to_xlsx_stream(datas, file_path)
 
 def check_file_exists_and_valid(file_path, min_size=1024):
     """检查文件是否存在且有效"""
@@ -300,6 +319,20 @@ def check_work_complete(save_path, work_type, images_count=0):
     
     return True
 
+def get_work_save_path(work_info, path):
+    """
+    作品的保存目录
+    :param work_info: 作品信息
+    :param path: 保存基础路径
+    :return: {path}/{昵称}_{用户id}/{标题}_{作品id}
+    """
+    title = norm_str(work_info['title'])[:40]
+    nickname = norm_str(work_info['nickname'])[:20]
+    if title.strip() == '':
+        title = f'无标题'
+    return f"{path}/{nickname}_{work_info['user_id']}/{title}_{work_info['work_id']}"
+
+
 @retry(tries=3, delay=1)
 def download_work(work_info, path, save_choice, force_download=False, use_database=True):
     """
@@ -312,14 +345,10 @@ def download_work(work_info, path, save_choice, force_download=False, use_databa
     :return: 包含下载统计的结果
     """
     work_id = work_info['work_id']
-    user_id = work_info['user_id']
-    title = work_info['title']
-    title = norm_str(title)[:40]
-    nickname = work_info['nickname']
-    nickname = norm_str(nickname)[:20]
+    title = norm_str(work_info['title'])[:40]
     if title.strip() == '':
         title = f'无标题'
-    save_path = f'{path}/{nickname}_{user_id}/{title}_{work_id}'
+    save_path = get_work_save_path(work_info, path)
     work_type = work_info['work_type']
     
     # 下载统计
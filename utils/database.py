@@ -108,6 +108,147 @@ class Database:
                 )
             ''')
             
+            # 创建评论表（一级评论）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS comments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cid TEXT UNIQUE NOT NULL,
+                    aweme_id TEXT NOT NULL,
+                    user_id TEXT,
+                    sec_uid TEXT,
+                    nickname TEXT,
+                    text TEXT,
+                    digg_count INTEGER DEFAULT 0,
+                    reply_comment_total INTEGER DEFAULT 0,
+                    replies_crawled_total INTEGER DEFAULT 0,
+                    ip_label TEXT,
+                    create_time INTEGER,
+                    raw TEXT,
+                    crawled_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 创建评论回复表（二级评论）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS comment_replies (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cid TEXT UNIQUE NOT NULL,
+                    parent_cid TEXT NOT NULL,
+                    aweme_id TEXT NOT NULL,
+                    user_id TEXT,
+                    sec_uid TEXT,
+                    nickname TEXT,
+                    text TEXT,
+                    digg_count INTEGER DEFAULT 0,
+                    reply_to_reply_id TEXT,
+                    ip_label TEXT,
+                    create_time INTEGER,
+                    raw TEXT,
+                    crawled_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 创建短链接缓存表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS short_links (
+                    short_url TEXT PRIMARY KEY,
+                    aweme_id TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 创建分页断点表（按接口+目标记录翻页游标）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pagination_checkpoints (
+                    endpoint TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    cursor TEXT,
+                    page_index INTEGER DEFAULT 0,
+                    fetched INTEGER DEFAULT 0,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (endpoint, target)
+                )
+            ''')
+            
+            # 创建分页断点条目表（断点之前已获取的条目）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pagination_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    endpoint TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    page_index INTEGER NOT NULL,
+                    item TEXT NOT NULL
+                )
+            ''')
+            
+            # 创建扫描进度表（每个订阅一行）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_progress (
+                    user_id TEXT PRIMARY KEY,
+                    last_scan_time INTEGER DEFAULT 0,
+                    last_video_time INTEGER DEFAULT 0,
+                    last_video_id TEXT,
+                    scan_count INTEGER DEFAULT 0,
+                    post_rate REAL,
+                    request_cost INTEGER
+                )
+            ''')
+            
+            # 创建扫描状态表（扫描轮次等全局状态）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            
+            # 创建扫描日志表（摘要字段用于统计，record 为完整日志）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scan_logs (
+                    scan_id TEXT PRIMARY KEY,
+                    timestamp INTEGER NOT NULL,
+                    scan_time TEXT,
+                    total_new_videos INTEGER DEFAULT 0,
+                    scan_duration REAL DEFAULT 0,
+                    failed_subscriptions INTEGER DEFAULT 0,
+                    record TEXT NOT NULL
+                )
+            ''')
+            
+            # 创建作品导出表（按作者保存 handle_work_info 的结果，导出文件由此生成）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS work_exports (
+                    work_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    create_time INTEGER DEFAULT 0,
+                    record TEXT NOT NULL,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 创建下载队列表（待下载和下载中的作品，下载完成后删除；status: queued / leased / failed）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS download_queue (
+                    work_id TEXT PRIMARY KEY,
+                    urls TEXT NOT NULL,
+                    work_info TEXT NOT NULL,
+                    base_path TEXT NOT NULL,
+                    save_path TEXT NOT NULL,
+                    save_choice TEXT NOT NULL,
+                    force_download INTEGER DEFAULT 0,
+                    priority INTEGER DEFAULT 0,
+                    status TEXT DEFAULT 'queued',
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    lease_owner TEXT,
+                    lease_expires REAL DEFAULT 0,
+                    available_at REAL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            
             # 创建索引
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_work_id ON downloads(work_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_user_id ON downloads(user_id)')
@@ -115,6 +256,17 @@ class Database:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_subscriptions_user_id ON subscriptions(user_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_subscription_videos_aweme_id ON subscription_videos(aweme_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_subscription_videos_subscription_id ON subscription_videos(subscription_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_aweme_id ON comments(aweme_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_cid ON comments(cid)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_create_time ON comments(create_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_replies_aweme_id ON comment_replies(aweme_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_replies_parent_cid ON comment_replies(parent_cid)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_replies_create_time ON comment_replies(create_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_pagination_items_target ON pagination_items(endpoint, target, page_index)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_scan_logs_timestamp ON scan_logs(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_work_exports_user_id ON work_exports(user_id, create_time)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_download_queue_claim ON download_queue(status, priority, enqueued_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_download_queue_owner ON download_queue(lease_owner)')
             
             logger.info(f"数据库初始化完成: {self.db_path}")
     
@@ -606,6 +758,790 @@ class Database:
                 'new_videos': 0
             }
     
+    # ========== 评论相关方法 ==========
+    
+    @staticmethod
+    def _comment_row(comment: Dict[str, Any]) -> Dict[str, Any]:
+        """提取评论的公共字段"""
+        user = comment.get('user') or {}
+        return {
+            'cid': str(comment.get('cid', '')),
+            'aweme_id': str(comment.get('aweme_id', '')),
+            'user_id': str(user.get('uid', '')),
+            'sec_uid': user.get('sec_uid', ''),
+            'nickname': user.get('nickname', ''),
+            'text': comment.get('text', ''),
+            'digg_count': comment.get('digg_count', 0),
+            'ip_label': comment.get('ip_label', ''),
+            'create_time': comment.get('create_time', 0),
+            'raw': json.dumps({k: v for k, v in comment.items() if k != 'reply_comment'}, ensure_ascii=False)
+        }
+    
+    def save_comments(self, comments: List[Dict[str, Any]]) -> int:
+        """
+        保存一页一级评论，已存在的评论只更新点赞数、回复数等统计
+        :return: 新增的评论数
+        """
+        if not comments:
+            return 0
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                rows = []
+                for comment in comments:
+                    data = self._comment_row(comment)
+                    data['reply_comment_total'] = comment.get('reply_comment_total', 0)
+                    data['updated_at'] = datetime.now().isoformat()
+                    rows.append(data)
+                
+                cids = [row['cid'] for row in rows]
+                cursor.execute(
+                    f"SELECT cid FROM comments WHERE cid IN ({','.join('?' * len(cids))})", cids
+                )
+                existing = {row['cid'] for row in cursor.fetchall()}
+                
+                cursor.executemany('''
+                    UPDATE comments SET
+                    text = :text, digg_count = :digg_count, reply_comment_total = :reply_comment_total,
+                    raw = :raw, updated_at = :updated_at
+                    WHERE cid = :cid
+                ''', [row for row in rows if row['cid'] in existing])
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO comments
+                    (cid, aweme_id, user_id, sec_uid, nickname, text, digg_count,
+                     reply_comment_total, ip_label, create_time, raw, updated_at)
+                    VALUES
+                    (:cid, :aweme_id, :user_id, :sec_uid, :nickname, :text, :digg_count,
+                     :reply_comment_total, :ip_label, :create_time, :raw, :updated_at)
+                ''', [row for row in rows if row['cid'] not in existing])
+                return len(rows) - len(existing)
+        except Exception as e:
+            logger.error(f"保存评论失败: {e}")
+            return 0
+    
+    def save_comment_replies(self, parent_cid: str, replies: List[Dict[str, Any]],
+                             reply_total: Optional[int]) -> int:
+        """
+        保存一条评论的二级评论，并记录本次抓取时的回复总数
+        :param parent_cid: 一级评论ID
+        :param replies: 二级评论列表
+        :param reply_total: 抓取时一级评论的 reply_comment_total, 只获取了部分回复时传 None, 不更新记录
+        :return: 新增的回复数
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                rows = []
+                for reply in replies:
+                    data = self._comment_row(reply)
+                    data['parent_cid'] = str(parent_cid)
+                    data['reply_to_reply_id'] = str(reply.get('reply_to_reply_id', ''))
+                    rows.append(data)
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO comment_replies
+                    (cid, parent_cid, aweme_id, user_id, sec_uid, nickname, text, digg_count,
+                     reply_to_reply_id, ip_label, create_time, raw)
+                    VALUES
+                    (:cid, :parent_cid, :aweme_id, :user_id, :sec_uid, :nickname, :text, :digg_count,
+                     :reply_to_reply_id, :ip_label, :create_time, :raw)
+                ''', rows)
+                added = cursor.rowcount if rows else 0
+                if reply_total is not None:
+                    cursor.execute(
+                        'UPDATE comments SET replies_crawled_total = ? WHERE cid = ?',
+                        (reply_total, str(parent_cid))
+                    )
+                return added
+        except Exception as e:
+            logger.error(f"保存评论回复失败: {e}")
+            return 0
+    
+    def get_comment_crawl_state(self, aweme_id: str) -> Dict[str, int]:
+        """获取作品已保存的一级评论ID及其上次抓取回复时的回复总数"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT cid, replies_crawled_total FROM comments WHERE aweme_id = ?', (str(aweme_id),)
+                )
+                return {row['cid']: row['replies_crawled_total'] or 0 for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"获取评论抓取状态失败: {e}")
+            return {}
+    
+    def get_comments(self, aweme_id: str, with_replies: bool = True) -> List[Dict[str, Any]]:
+        """获取作品已保存的评论，按发布时间倒序，二级评论在 reply_comment 中"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT * FROM comments WHERE aweme_id = ? ORDER BY create_time DESC', (str(aweme_id),)
+                )
+                comments = cursor.fetchall()
+                if with_replies:
+                    cursor.execute(
+                        'SELECT * FROM comment_replies WHERE aweme_id = ? ORDER BY create_time', (str(aweme_id),)
+                    )
+                    replies = {}
+                    for reply in cursor.fetchall():
+                        replies.setdefault(reply['parent_cid'], []).append(reply)
+                    for comment in comments:
+                        comment['reply_comment'] = replies.get(comment['cid'], [])
+                return comments
+        except Exception as e:
+            logger.error(f"获取评论失败: {e}")
+            return []
+    
+    # ========== 短链接缓存相关方法 ==========
+    
+    def get_short_link(self, short_url: str) -> Optional[str]:
+        """获取短链接对应的作品ID"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT aweme_id FROM short_links WHERE short_url = ?', (short_url,))
+                result = cursor.fetchone()
+                return result['aweme_id'] if result else None
+        except Exception as e:
+            logger.error(f"获取短链接缓存失败: {e}")
+            return None
+    
+    def save_short_link(self, short_url: str, aweme_id: str) -> bool:
+        """保存短链接对应的作品ID"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT OR REPLACE INTO short_links (short_url, aweme_id) VALUES (?, ?)',
+                    (short_url, aweme_id)
+                )
+                return True
+        except Exception as e:
+            logger.error(f"保存短链接缓存失败: {e}")
+            return False
+    
+    # ========== 分页断点相关方法 ==========
+    
+    def save_pagination_checkpoint(self, endpoint: str, target: str, cursor: Any, page_index: int,
+                                   fetched: int, pages: List[List[Dict[str, Any]]], first_page_index: int) -> bool:
+        """
+        保存分页断点，新增的条目与游标在同一事务中写入
+        :param endpoint: 接口名
+        :param target: 目标（用户URL、sec_uid等）
+        :param cursor: 下一页游标
+        :param page_index: 最后一页已完成的页序号
+        :param fetched: 累计获取的条目数
+        :param pages: 自上次断点以来获取的各页条目
+        :param first_page_index: pages 中第一页的页序号
+        """
+        try:
+            with self.get_connection() as conn:
+                db_cursor = conn.cursor()
+                rows = []
+                for offset, items in enumerate(pages):
+                    for item in items:
+                        rows.append((endpoint, target, first_page_index + offset, json.dumps(item, ensure_ascii=False)))
+                if rows:
+                    db_cursor.executemany('''
+                        INSERT INTO pagination_items (endpoint, target, page_index, item)
+                        VALUES (?, ?, ?, ?)
+                    ''', rows)
+                db_cursor.execute('''
+                    INSERT OR REPLACE INTO pagination_checkpoints
+                    (endpoint, target, cursor, page_index, fetched, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (endpoint, target, json.dumps(cursor), page_index, fetched, datetime.now().isoformat()))
+                return True
+        except Exception as e:
+            logger.error(f"保存分页断点失败: {e}")
+            return False
+    
+    def get_pagination_checkpoint(self, endpoint: str, target: str) -> Optional[Dict[str, Any]]:
+        """获取分页断点，cursor 已反序列化"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT * FROM pagination_checkpoints WHERE endpoint = ? AND target = ?',
+                    (endpoint, target)
+                )
+                result = cursor.fetchone()
+                if result:
+                    result['cursor'] = json.loads(result['cursor'])
+                return result
+        except Exception as e:
+            logger.error(f"获取分页断点失败: {e}")
+            return None
+    
+    def get_pagination_items(self, endpoint: str, target: str) -> List[Dict[str, Any]]:
+        """获取断点之前已获取的条目，按获取顺序返回"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT item FROM pagination_items WHERE endpoint = ? AND target = ? ORDER BY id',
+                    (endpoint, target)
+                )
+                return [json.loads(row['item']) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取分页断点条目失败: {e}")
+            return []
+    
+    def clear_pagination_checkpoint(self, endpoint: str, target: str) -> bool:
+        """清除分页断点及其条目"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM pagination_items WHERE endpoint = ? AND target = ?', (endpoint, target))
+                cursor.execute('DELETE FROM pagination_checkpoints WHERE endpoint = ? AND target = ?', (endpoint, target))
+                return True
+        except Exception as e:
+            logger.error(f"清除分页断点失败: {e}")
+            return False
+    
+    # ========== 扫描进度与日志相关方法 ==========
+    
+    def get_scan_progress(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """获取订阅的扫描进度"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM scan_progress WHERE user_id = ?', (user_id,))
+                return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"获取扫描进度失败: {e}")
+            return None
+    
+    def get_all_scan_progress(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有订阅的扫描进度，按 user_id 索引"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM scan_progress')
+                return {row['user_id']: row for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"获取扫描进度失败: {e}")
+            return {}
+    
+    def save_scan_progress(self, user_id: str, fields: Dict[str, Any], increment_scan_count: bool = False) -> bool:
+        """
+        更新单个订阅的扫描进度，不存在时先插入
+        :param user_id: 订阅用户ID
+        :param fields: 要更新的列
+        :param increment_scan_count: 是否将扫描次数加一
+        """
+        allowed = {'last_scan_time', 'last_video_time', 'last_video_id', 'post_rate', 'request_cost'}
+        fields = {key: value for key, value in fields.items() if key in allowed}
+        assignments = [f"{key} = ?" for key in fields]
+        if increment_scan_count:
+            assignments.append("scan_count = scan_count + 1")
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('INSERT OR IGNORE INTO scan_progress (user_id) VALUES (?)', (user_id,))
+                if assignments:
+                    cursor.execute(
+                        f"UPDATE scan_progress SET {', '.join(assignments)} WHERE user_id = ?",
+                        list(fields.values()) + [user_id]
+                    )
+                return True
+        except Exception as e:
+            logger.error(f"保存扫描进度失败: {e}")
+            return False
+    
+    def import_scan_progress(self, progress: Dict[str, Dict[str, Any]]) -> int:
+        """批量导入扫描进度（从旧的 JSON 文件迁移），已存在的记录不覆盖"""
+        rows = [
+            (user_id, p.get('last_scan_time', 0), p.get('last_video_time', 0), p.get('last_video_id'),
+             p.get('scan_count', 0), p.get('post_rate'), p.get('request_cost'))
+            for user_id, p in progress.items()
+        ]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO scan_progress
+                    (user_id, last_scan_time, last_video_time, last_video_id, scan_count, post_rate, request_cost)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"导入扫描进度失败: {e}")
+            return 0
+    
+    def delete_scan_progress(self, user_ids: List[str]) -> int:
+        """删除指定订阅的扫描进度"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM scan_progress WHERE user_id = ?', [(user_id,) for user_id in user_ids])
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"删除扫描进度失败: {e}")
+            return 0
+    
+    def get_scan_state(self, key: str, default: Any = None) -> Any:
+        """获取扫描全局状态，值以 JSON 存储"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT value FROM scan_state WHERE key = ?', (key,))
+                result = cursor.fetchone()
+                return json.loads(result['value']) if result else default
+        except Exception as e:
+            logger.error(f"获取扫描状态失败: {e}")
+            return default
+    
+    def set_scan_state(self, **values) -> bool:
+        """设置扫描全局状态"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO scan_state (key, value) VALUES (?, ?)',
+                    [(key, json.dumps(value)) for key, value in values.items()]
+                )
+                return True
+        except Exception as e:
+            logger.error(f"设置扫描状态失败: {e}")
+            return False
+    
+    def add_scan_logs(self, records: List[Dict[str, Any]], keep: Optional[int] = None) -> int:
+        """
+        写入扫描日志，已存在的 scan_id 不覆盖
+        :param records: 扫描日志，需包含 scan_id 和 timestamp
+        :param keep: 写入后只保留最近的N条，None 表示不清理
+        """
+        rows = [
+            (r['scan_id'], r['timestamp'], r.get('scan_time'), r.get('total_new_videos', 0),
+             r.get('scan_duration', 0), r.get('failed_subscriptions', 0),
+             json.dumps(r, ensure_ascii=False, default=str))
+            for r in records
+        ]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO scan_logs
+                    (scan_id, timestamp, scan_time, total_new_videos, scan_duration, failed_subscriptions, record)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                inserted = cursor.rowcount
+                if keep is not None:
+                    cursor.execute('''
+                        DELETE FROM scan_logs WHERE scan_id NOT IN
+                        (SELECT scan_id FROM scan_logs ORDER BY timestamp DESC LIMIT ?)
+                    ''', (keep,))
+                return inserted
+        except Exception as e:
+            logger.error(f"写入扫描日志失败: {e}")
+            return 0
+    
+    def get_scan_logs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """获取最近的扫描日志，按时间倒序"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT record FROM scan_logs ORDER BY timestamp DESC LIMIT ?', (limit,))
+                return [json.loads(row['record']) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取扫描日志失败: {e}")
+            return []
+    
+    def get_scan_log(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        """按扫描ID获取扫描日志"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT record FROM scan_logs WHERE scan_id = ?', (scan_id,))
+                result = cursor.fetchone()
+                return json.loads(result['record']) if result else None
+        except Exception as e:
+            logger.error(f"获取扫描日志失败: {e}")
+            return None
+    
+    def get_scan_log_stats(self) -> Dict[str, Any]:
+        """扫描日志汇总统计"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*) as total_scans,
+                           COALESCE(SUM(total_new_videos), 0) as total_new_videos,
+                           COALESCE(SUM(scan_duration), 0) as total_duration,
+                           COALESCE(SUM(CASE WHEN failed_subscriptions = 0 THEN 1 ELSE 0 END), 0) as successful_scans
+                    FROM scan_logs
+                ''')
+                stats = cursor.fetchone()
+                cursor.execute('SELECT scan_time FROM scan_logs ORDER BY timestamp DESC LIMIT 1')
+                last = cursor.fetchone()
+                stats['last_scan_time'] = last['scan_time'] if last else None
+                return stats
+        except Exception as e:
+            logger.error(f"获取扫描日志统计失败: {e}")
+            return {'total_scans': 0, 'total_new_videos': 0, 'total_duration': 0, 'successful_scans': 0,
+                    'last_scan_time': None}
+    
+    def delete_scan_logs_before(self, timestamp: int) -> int:
+        """删除指定时间之前的扫描日志"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM scan_logs WHERE timestamp < ?', (timestamp,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"删除扫描日志失败: {e}")
+            return 0
+    
+    # ========== 作品导出相关方法 ==========
+    
+    # 作品信息中会过期的 CDN 地址，每次请求都不同，不作为作品是否变化的依据
+    _VOLATILE_EXPORT_FIELDS = ('video_addr', 'video_cover', 'author_avatar', 'images')
+    
+    @classmethod
+    def _export_fingerprint(cls, record: Dict[str, Any]) -> str:
+        """作品信息去掉 CDN 地址后的统计数据和文本，用于判断作品是否有变化"""
+        return json.dumps({k: v for k, v in record.items() if k not in cls._VOLATILE_EXPORT_FIELDS},
+                          ensure_ascii=False, sort_keys=True)
+    
+    def save_work_exports(self, user_id: str, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        保存作者的作品信息，新作品追加，统计数据或文本有变化的作品原地更新，未变化的不写入（只有 CDN 地址不同的也不写入）
+        :param user_id: 作者 sec_uid
+        :param records: handle_work_info 的结果
+        :return: {'added': 新增数, 'updated': 更新数}
+        """
+        result = {'added': 0, 'updated': 0}
+        rows = {}
+        fingerprints = {}
+        for record in records:
+            work_id = str(record.get('work_id', ''))
+            if work_id:
+                rows[work_id] = json.dumps(record, ensure_ascii=False)
+                fingerprints[work_id] = self._export_fingerprint(record)
+        if not rows:
+            return result
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                work_ids = list(rows)
+                existing = {}
+                # SQLite 单条语句的参数个数有限，分批查询
+                for i in range(0, len(work_ids), 500):
+                    chunk = work_ids[i:i + 500]
+                    cursor.execute(
+                        f"SELECT work_id, record FROM work_exports WHERE work_id IN ({','.join('?' * len(chunk))})", chunk
+                    )
+                    existing.update((row['work_id'], self._export_fingerprint(json.loads(row['record'])))
+                                    for row in cursor.fetchall())
+                
+                now = datetime.now().isoformat()
+                changed = [(record, now, work_id) for work_id, record in rows.items()
+                           if work_id in existing and existing[work_id] != fingerprints[work_id]]
+                added = [(work_id, user_id, json.loads(record).get('create_time') or 0, record, now)
+                         for work_id, record in rows.items() if work_id not in existing]
+                cursor.executemany('UPDATE work_exports SET record = ?, updated_at = ? WHERE work_id = ?', changed)
+                cursor.executemany('''
+                    INSERT INTO work_exports (work_id, user_id, create_time, record, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', added)
+                result['added'] = len(added)
+                result['updated'] = len(changed)
+                return result
+        except Exception as e:
+            logger.error(f"保存作品导出数据失败: {e}")
+            return result
+    
+    def iter_work_exports(self, user_id: str, batch_size: int = 1000):
+        """按发布时间倒序逐条读取作者的作品信息，分批从数据库读取"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT record FROM work_exports WHERE user_id = ? ORDER BY create_time DESC, work_id', (user_id,)
+                )
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield json.loads(row['record'])
+        except Exception as e:
+            logger.error(f"读取作品导出数据失败: {e}")
+    
+    def get_work_export_users(self) -> List[Dict[str, Any]]:
+        """获取有导出数据的作者及其作品数、最后更新时间"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT user_id, COUNT(*) AS work_count, MAX(updated_at) AS updated_at
+                    FROM work_exports GROUP BY user_id ORDER BY updated_at DESC
+                ''')
+                return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"获取作品导出统计失败: {e}")
+            return []
+    
+    # ========== 下载队列相关方法 ==========
+    
+    @staticmethod
+    def _download_queue_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """反序列化下载队列中的一行"""
+        if row:
+            row['urls'] = json.loads(row['urls'])
+            row['work_info'] = json.loads(row['work_info'])
+            row['force_download'] = bool(row['force_download'])
+        return row
+    
+    def enqueue_downloads(self, items: List[Dict[str, Any]], owner: Optional[str] = None,
+                          lease_seconds: float = 0) -> int:
+        """
+        加入下载队列，已在队列中的作品更新下载参数和优先级并重新计算尝试次数，正被其他下载线程持有的不变
+        owner 自己持有的作品（如占位行）同样更新
+        :param items: 每项包含 work_id, urls, work_info, base_path, save_path, save_choice, force_download, priority
+        :param owner: 提供时直接由 owner 持有租约（提交者自己按顺序下载），否则等待领取
+        :param lease_seconds: 租约时长（秒）
+        :return: 加入或更新的作品数
+        """
+        now = time.time()
+        status, lease_expires = ('leased', now + lease_seconds) if owner else ('queued', 0)
+        rows = [
+            (json.dumps(item['urls'], ensure_ascii=False), json.dumps(item['work_info'], ensure_ascii=False),
+             item['base_path'], item['save_path'], item['save_choice'], int(bool(item['force_download'])),
+             item['priority'], status, owner, lease_expires, now, item['work_id'], now, owner)
+            for item in items
+        ]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO download_queue (work_id, urls, work_info, base_path, save_path, save_choice, enqueued_at, updated_at)
+                    VALUES (?, '[]', '{}', '', '', '', ?, ?)
+                ''', [(item['work_id'], now, now) for item in items])
+                cursor.executemany('''
+                    UPDATE download_queue
+                    SET urls = ?, work_info = ?, base_path = ?, save_path = ?, save_choice = ?, force_download = ?,
+                        priority = ?, status = ?, lease_owner = ?, lease_expires = ?, attempts = 0, last_error = NULL,
+                        available_at = 0, updated_at = ?
+                    WHERE work_id = ? AND (status != 'leased' OR lease_expires < ? OR lease_owner = ?)
+                ''', rows)
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"加入下载队列失败: {e}")
+            return 0
+    
+    @staticmethod
+    def _fail_exhausted_downloads(cursor, max_attempts: int, now: float) -> int:
+        """
+        尝试次数已达上限、却因下载中断或租约过期仍在排队或持有租约的作品标记为 failed，
+        否则它们既不会再被领取，也不会被 retry_failed_downloads 放回队列
+        """
+        cursor.execute('''
+            UPDATE download_queue
+            SET status = 'failed', lease_owner = NULL, lease_expires = 0,
+                last_error = COALESCE(last_error, '下载中断，尝试次数已达上限'), updated_at = ?
+            WHERE attempts >= ? AND (status = 'queued' OR (status = 'leased' AND lease_expires < ?))
+        ''', (now, max_attempts, now))
+        if cursor.rowcount:
+            logger.warning(f"下载队列: {cursor.rowcount} 个作品尝试次数已达上限，标记为失败")
+        return cursor.rowcount
+
+    def claim_download(self, owner: str, lease_seconds: float, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """
+        按优先级从高到低、入队时间从早到晚领取一个待下载的作品并加租约，尝试次数加一
+        可领取: 排队中且到了重试时间，或者租约已过期；租约过期且尝试次数已达上限的标记为 failed
+        :param owner: 领取者
+        :param lease_seconds: 租约时长（秒）
+        :param max_attempts: 尝试次数达到上限的不再领取
+        :return: 下载队列中的一行，urls 和 work_info 已反序列化，没有可领取的作品时返回 None
+        """
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # 先取得写锁，避免多个下载线程领取同一个作品
+                cursor.execute('BEGIN IMMEDIATE')
+                self._fail_exhausted_downloads(cursor, max_attempts, now)
+                cursor.execute('''
+                    SELECT work_id FROM download_queue
+                    WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?))
+                          AND attempts < ?
+                    ORDER BY priority DESC, enqueued_at LIMIT 1
+                ''', (now, now, max_attempts))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute('''
+                    UPDATE download_queue
+                    SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                    WHERE work_id = ?
+                ''', (owner, now + lease_seconds, now, row['work_id']))
+                cursor.execute('SELECT * FROM download_queue WHERE work_id = ?', (row['work_id'],))
+                return self._download_queue_row(cursor.fetchone())
+        except Exception as e:
+            logger.error(f"领取下载任务失败: {e}")
+            return None
+    
+    def renew_download_leases(self, owner: str, lease_seconds: float) -> int:
+        """延长 owner 持有的所有租约"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE download_queue SET lease_expires = ? WHERE status = 'leased' AND lease_owner = ?",
+                    (time.time() + lease_seconds, owner)
+                )
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"延长下载租约失败: {e}")
+            return 0
+    
+    def get_leased_work_ids(self, owner: str) -> set:
+        """owner 持有租约的作品ID"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT work_id FROM download_queue WHERE status = 'leased' AND lease_owner = ?", (owner,))
+                return {row['work_id'] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"获取下载租约失败: {e}")
+            return set()
+    
+    def complete_downloads(self, work_ids: List[str], owner: str) -> int:
+        """下载完成，从队列中删除（租约已被他人取得的不删除）"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('DELETE FROM download_queue WHERE work_id = ? AND lease_owner = ?',
+                                   [(work_id, owner) for work_id in work_ids])
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"完成下载任务失败: {e}")
+            return 0
+    
+    def fail_download(self, work_id: str, owner: str, error: str, attempts: int, retry_delay: float,
+                      max_attempts: int) -> bool:
+        """
+        下载失败，尝试次数未达上限时 retry_delay 秒后可再次领取，否则标记为 failed
+        :param attempts: 本次是第几次尝试（提交批次自己下载的作品没有经过领取，队列中的尝试次数还是 0）
+        """
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE download_queue
+                    SET attempts = MAX(attempts, ?),
+                        status = CASE WHEN MAX(attempts, ?) >= ? THEN 'failed' ELSE 'queued' END,
+                        last_error = ?, lease_owner = NULL, lease_expires = 0, available_at = ?, updated_at = ?
+                    WHERE work_id = ? AND lease_owner = ?
+                ''', (attempts, attempts, max_attempts, error, now + retry_delay, now, work_id, owner))
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"记录下载失败状态失败: {e}")
+            return False
+    
+    def release_downloads(self, owner: str, discard: bool = False) -> int:
+        """
+        释放 owner 持有的租约
+        :param discard: True 时从队列中删除（任务被取消），否则放回队列等待领取
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if discard:
+                    cursor.execute("DELETE FROM download_queue WHERE status = 'leased' AND lease_owner = ?", (owner,))
+                else:
+                    cursor.execute('''
+                        UPDATE download_queue SET status = 'queued', lease_owner = NULL, lease_expires = 0, updated_at = ?
+                        WHERE status = 'leased' AND lease_owner = ?
+                    ''', (time.time(), owner))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"释放下载租约失败: {e}")
+            return 0
+    
+    def requeue_interrupted_downloads(self, max_attempts: int) -> int:
+        """
+        把所有持有租约的作品放回队列（启动时调用，上次进程中的下载线程已不存在），尝试次数已达上限的标记为 failed
+        :param max_attempts: 最多尝试次数
+        :return: 放回队列的作品数
+        """
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # 上次进程的租约全部视为已过期
+                cursor.execute("UPDATE download_queue SET lease_expires = 0 WHERE status = 'leased'")
+                self._fail_exhausted_downloads(cursor, max_attempts, now)
+                cursor.execute('''
+                    UPDATE download_queue SET status = 'queued', lease_owner = NULL, lease_expires = 0, updated_at = ?
+                    WHERE status = 'leased'
+                ''', (now,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"恢复中断的下载失败: {e}")
+            return 0
+    
+    def retry_failed_downloads(self, max_attempts: int) -> int:
+        """
+        把失败的作品放回队列，尝试次数清零；尝试次数已达上限却仍在排队或租约已过期的作品一并放回
+        :param max_attempts: 最多尝试次数
+        """
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._fail_exhausted_downloads(cursor, max_attempts, now)
+                cursor.execute('''
+                    UPDATE download_queue SET status = 'queued', attempts = 0, available_at = 0, updated_at = ?
+                    WHERE status = 'failed'
+                ''', (now,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"重试失败的下载失败: {e}")
+            return 0
+    
+    def get_download_queue(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """按领取顺序列出下载队列，不含 work_info"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                sql = '''
+                    SELECT work_id, urls, save_path, save_choice, priority, status, attempts, last_error,
+                           lease_owner, lease_expires, available_at, enqueued_at, updated_at
+                    FROM download_queue
+                '''
+                params = []
+                if status:
+                    sql += ' WHERE status = ?'
+                    params.append(status)
+                sql += ' ORDER BY priority DESC, enqueued_at LIMIT ?'
+                params.append(limit)
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                for row in rows:
+                    row['urls'] = json.loads(row['urls'])
+                return rows
+        except Exception as e:
+            logger.error(f"获取下载队列失败: {e}")
+            return []
+    
+    def get_download_queue_stats(self) -> Dict[str, int]:
+        """下载队列中各状态的作品数"""
+        stats = {'queued': 0, 'leased': 0, 'failed': 0}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT status, COUNT(*) as count FROM download_queue GROUP BY status')
+                for row in cursor.fetchall():
+                    stats[row['status']] = row['count']
+                return stats
+        except Exception as e:
+            logger.error(f"获取下载队列统计失败: {e}")
+            return stats
+    
     # ========== 数据库维护方法 ==========
     
     def get_database_info(self) -> Dict[str, Any]:
@@ -0,0 +1,411 @@
+# coding=utf-8
+"""
+持久下载队列
+待下载的作品先写入 SQLite 的 download_queue 表(作品ID、文件地址、保存路径、优先级、尝试次数、租约到期时间)，
+下载线程领取时加租约，下载完成后删除，进程中断时正在下载和还没轮到的作品都留在表中
+爬取任务通过 DownloadBatch 提交一批作品，提交时即由本批次持有租约，再按原来的顺序逐个下载；
+只有链接或作品ID、还没有获取作品信息时先写入占位行(source:链接)，由批次拿到作品信息后替换，或由 drain 通过 resolver 获取；
+启动时 recover 把上次中断的租约放回队列，drain 按优先级继续下载
+优先级沿用请求类别: interactive > download > scan > backfill
+环境变量 DY_DOWNLOAD_LEASE、DY_DOWNLOAD_ATTEMPTS、DY_DOWNLOAD_WORKERS 调整租约时长(秒)、最多尝试次数和 drain 的下载线程数
+"""
+import threading
+import uuid
+from os import getenv
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from dy_apis.request_scheduler import current_priority
+from utils.data_util import download_work, get_work_save_path
+from utils.database import get_database
+from utils.job_manager import JobCancelled
+
+PRIORITIES = {'interactive': 3, 'download': 2, 'scan': 1, 'backfill': 0}
+DEFAULT_LEASE = float(getenv('DY_DOWNLOAD_LEASE', '300'))
+DEFAULT_MAX_ATTEMPTS = int(getenv('DY_DOWNLOAD_ATTEMPTS', '3'))
+DEFAULT_DRAIN_WORKERS = int(getenv('DY_DOWNLOAD_WORKERS', '2'))
+# 下载失败后重新排队的等待时间(秒)，乘以已尝试次数
+RETRY_DELAY = 60
+# 占位行的 work_id 前缀
+SOURCE_PREFIX = 'source:'
+
+
+def work_urls(work_info: Dict[str, Any]) -> List[str]:
+    """作品的文件地址: 视频、封面和图集图片"""
+    urls = [work_info.get('video_addr'), work_info.get('video_cover')] + list(work_info.get('images') or [])
+    return [url for url in urls if url]
+
+
+def _skipped_stats(work_info: Dict[str, Any], base_path: str) -> Dict[str, Any]:
+    """作品正由其他下载线程下载时返回的统计"""
+    return {'work_id': work_info['work_id'], 'work_type': work_info['work_type'],
+            'save_path': get_work_save_path(work_info, base_path), 'files_downloaded': 0,
+            'files_skipped': 0, 'files_failed': 0, 'total_files': 0, 'is_complete': False}
+
+
+class _LeaseKeeper:
+    """定时延长 owner 持有的所有租约，下载时间超过租约时长时作品不会被其他下载线程领走"""
+
+    def __init__(self, queue: 'DownloadQueue', owner: str):
+        self.queue = queue
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            self.queue.db.renew_download_leases(self.owner, self.queue.lease_seconds)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='download-lease', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class DownloadBatch:
+    """
+    一个爬取任务提交的一批作品，下载顺序与调用 download 的顺序一致
+    批次持有的作品不再逐个领取，下载完成后先记下，在下一次 add、每 FLUSH_SIZE 个或 close 时一起从队列中删除；
+    进程在删除前中断时这些作品会被重新下载一次，download_work 会跳过已存在的文件
+    """
+    FLUSH_SIZE = 50
+
+    def __init__(self, queue: 'DownloadQueue', base_path: str, save_choice: str, force_download: bool = False,
+                 priority: Optional[str] = None):
+        self.queue = queue
+        self.base_path = base_path
+        self.save_choice = save_choice
+        self.force_download = force_download
+        self.priority = PRIORITIES.get(priority or current_priority(), 0)
+        self.owner = f'batch-{uuid.uuid4().hex}'
+        self._added = set()
+        self._completed: List[str] = []
+        self._keeper = _LeaseKeeper(queue, self.owner)
+
+    def _enqueue(self, items: List[Dict[str, Any]]) -> int:
+        if not items:
+            return 0
+        self.flush()
+        count = self.queue.db.enqueue_downloads(items, self.owner, self.queue.lease_seconds)
+        if count == len(items):
+            self._added.update(item['work_id'] for item in items)
+        else:
+            self._added = self.queue.db.get_leased_work_ids(self.owner)
+        return count
+
+    def add(self, work_infos: Iterable[Dict[str, Any]]) -> int:
+        """
+        加入一批作品，由本批次持有租约，正由其他下载线程持有的作品不加入
+        :param work_infos: handle_work_info 的结果.
+        :return: 加入的作品数.
+        """
+        return self._enqueue([self.queue.item(work_info, self.base_path, self.save_choice, self.force_download,
+                                              self.priority) for work_info in work_infos])
+
+    def add_sources(self, sources: Iterable[str]) -> int:
+        """
+        加入一批还没有获取作品信息的作品(链接或作品ID)，写入占位行，由本批次持有租约
+        download 时传入同一个 source(或作品ID与之相同)会用作品信息替换占位行
+        :return: 加入的作品数.
+        """
+        return self._enqueue([self.queue.source_item(source, self.base_path, self.save_choice, self.force_download,
+                                                     self.priority) for source in sources])
+
+    def download(self, work_info: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        下载一个作品，没有 add 过的先加入
+        :param source: add_sources 时使用的链接或作品ID.
+        :return: download_work 的统计，作品正由其他下载线程下载时各文件数均为 0.
+        """
+        work_id = work_info['work_id']
+        if work_id not in self._added:
+            self.add([work_info])
+        # 作品信息已经写入队列，占位行随下一次 flush 删除
+        for key in {source, work_id}:
+            placeholder = f'{SOURCE_PREFIX}{key}'
+            if key and placeholder in self._added:
+                self._added.discard(placeholder)
+                self._completed.append(placeholder)
+        if work_id not in self._added:
+            logger.info(f"作品正由其他下载线程下载，跳过: {work_id}")
+            return _skipped_stats(work_info, self.base_path)
+        self._keeper.start()
+        self._added.discard(work_id)
+        item = self.queue.item(work_info, self.base_path, self.save_choice, self.force_download, self.priority)
+        item['attempts'] = 1
+        stats = self.queue.process(item, self.owner, complete=False)
+        if not stats['files_failed']:
+            self._completed.append(work_id)
+            if len(self._completed) >= self.FLUSH_SIZE:
+                self.flush()
+        return stats
+
+    def flush(self):
+        """从队列中删除已下载完成的作品"""
+        if self._completed:
+            self.queue.db.complete_downloads(self._completed, self.owner)
+            self._completed = []
+
+    def close(self, discard: bool = False):
+        """
+        结束批次，没有下载的作品放回队列等待领取
+        :param discard: True 时从队列中删除(任务被取消).
+        """
+        self._keeper.stop()
+        self.flush()
+        released = self.queue.db.release_downloads(self.owner, discard)
+        if released:
+            logger.info(f"下载批次结束，{'丢弃' if discard else '放回队列'} {released} 个未下载的作品")
+
+    def __enter__(self):
+        # 批次可能在提交任务时创建、排队一段时间后才开始下载，开始前先延长租约
+        if self._added:
+            self.queue.db.renew_download_leases(self.owner, self.queue.lease_seconds)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(discard=exc_type is not None and issubclass(exc_type, JobCancelled))
+
+
+class DownloadQueue:
+    """SQLite 持久下载队列"""
+
+    def __init__(self, db=None, lease_seconds: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        :param db: Database, 默认使用全局实例.
+        :param lease_seconds: 租约时长(秒)，下载线程失联超过该时长后作品可被重新领取.
+        :param max_attempts: 最多尝试次数，达到后标记为 failed.
+        """
+        self._db = db
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # resolver(source) 根据链接或作品ID获取作品信息(handle_work_info 的结果)，drain 处理占位行时使用
+        self.resolver: Optional[Callable[[str], Dict[str, Any]]] = None
+
+    @property
+    def db(self):
+        return self._db or get_database()
+
+    @staticmethod
+    def item(work_info: Dict[str, Any], base_path: str, save_choice: str, force_download: bool,
+             priority: int) -> Dict[str, Any]:
+        """下载队列中的一行"""
+        return {
+            'work_id': work_info['work_id'],
+            'urls': work_urls(work_info),
+            'work_info': work_info,
+            'base_path': base_path,
+            'save_path': get_work_save_path(work_info, base_path),
+            'save_choice': save_choice,
+            'force_download': force_download,
+            'priority': priority,
+        }
+
+    @staticmethod
+    def source_item(source: str, base_path: str, save_choice: str, force_download: bool,
+                    priority: int) -> Dict[str, Any]:
+        """还没有获取作品信息的占位行"""
+        return {
+            'work_id': f'{SOURCE_PREFIX}{source}',
+            'urls': [],
+            'work_info': {'source': source},
+            'base_path': base_path,
+            'save_path': '',
+            'save_choice': save_choice,
+            'force_download': force_download,
+            'priority': priority,
+        }
+
+    def batch(self, base_path: str, save_choice: str, force_download: bool = False,
+              priority: Optional[str] = None) -> DownloadBatch:
+        """
+        创建下载批次
+        :param base_path: 媒体保存路径.
+        :param save_choice: 媒体保存方式(media / media-video / media-image).
+        :param force_download: 是否强制下载.
+        :param priority: 请求类别, 默认取当前声明的类别.
+        """
+        return DownloadBatch(self, base_path, save_choice, force_download, priority)
+
+    def enqueue(self, work_infos: Iterable[Dict[str, Any]], base_path: str, save_choice: str,
+                force_download: bool = False, priority: Optional[str] = None) -> int:
+        """加入队列等待 drain 领取"""
+        level = PRIORITIES.get(priority or current_priority(), 0)
+        items = [self.item(work_info, base_path, save_choice, force_download, level) for work_info in work_infos]
+        return self.db.enqueue_downloads(items) if items else 0
+
+    def _resolve(self, item: Dict[str, Any], owner: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        获取占位行的作品信息，替换为正常的一行
+        :return: (替换后的一行, 是否由 owner 持有)，作品正由其他下载线程持有时为 False.
+        """
+        try:
+            if self.resolver is None:
+                raise RuntimeError('未设置 resolver，无法获取作品信息')
+            work_info = self.resolver(item['work_info']['source'])
+        except Exception as e:
+            self.db.fail_download(item['work_id'], owner, f"获取作品信息失败: {e}", item['attempts'],
+                                  RETRY_DELAY * item['attempts'], self.max_attempts)
+            raise
+        resolved = self.item(work_info, item['base_path'], item['save_choice'], item['force_download'],
+                             item['priority'])
+        resolved['attempts'] = item['attempts']
+        count = self.db.enqueue_downloads([resolved], owner, self.lease_seconds)
+        self.db.complete_downloads([item['work_id']], owner)
+        return resolved, bool(count)
+
+    def process(self, item: Dict[str, Any], owner: str, complete: bool = True) -> Dict[str, Any]:
+        """
+        下载 owner 持有租约的作品，有文件下载失败或抛出异常时按尝试次数重新排队
+        占位行先通过 resolver 获取作品信息，租约由调用方的 _LeaseKeeper 延长
+        :param complete: 下载完成后是否立即从队列中删除.
+        :return: download_work 的统计.
+        """
+        if item['work_id'].startswith(SOURCE_PREFIX):
+            item, held = self._resolve(item, owner)
+            if not held:
+                return _skipped_stats(item['work_info'], item['base_path'])
+        work_id = item['work_id']
+        try:
+            stats = download_work(item['work_info'], item['base_path'], item['save_choice'],
+                                  item['force_download'], True)
+        except Exception as e:
+            self.db.fail_download(work_id, owner, str(e), item['attempts'], RETRY_DELAY * item['attempts'],
+                                  self.max_attempts)
+            raise
+        if stats['files_failed']:
+            self.db.fail_download(work_id, owner, f"{stats['files_failed']} 个文件下载失败", item['attempts'],
+                                  RETRY_DELAY * item['attempts'], self.max_attempts)
+        elif complete:
+            self.db.complete_downloads([work_id], owner)
+        return stats
+
+    def recover(self) -> int:
+        """把上次进程中断时持有租约的作品放回队列，启动时调用"""
+        count = self.db.requeue_interrupted_downloads(self.max_attempts)
+        if count:
+            logger.info(f"下载队列: {count} 个中断的下载已放回队列")
+        return count
+
+    def drain(self, workers: int = DEFAULT_DRAIN_WORKERS, cancel_token=None,
+              on_item: Optional[Callable[[Dict[str, Any], Optional[Dict[str, Any]], Optional[str]], Any]] = None) -> Dict[str, int]:
+        """
+        按优先级下载队列中所有可领取的作品，没有可领取的作品时返回
+        :param workers: 下载线程数.
+        :param cancel_token: 取消标记(utils.job_manager.CancelToken)，每个作品领取前检查，未下载的作品留在队列中.
+        :param on_item: on_item(item, stats, error) 每个作品处理完成时回调.
+        :return: {'downloaded', 'failed'}.
+        """
+        counts = {'downloaded': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def work():
+            owner = f'drain-{uuid.uuid4().hex}'
+            with _LeaseKeeper(self, owner):
+                while cancel_token is None or not cancel_token.cancelled:
+                    item = self.db.claim_download(owner, self.lease_seconds, self.max_attempts)
+                    if item is None:
+                        return
+                    stats, error = None, None
+                    try:
+                        stats = self.process(item, owner)
+                        if stats['files_failed']:
+                            error = f"{stats['files_failed']} 个文件下载失败"
+                        else:
+                            # 由订阅提交的作品完成后标记订阅视频为已下载
+                            self.db.mark_video_downloaded(stats['work_id'])
+                    except Exception as e:
+                        error = str(e)
+                        logger.error(f"下载队列: 下载作品失败 {item['work_id']}: {e}")
+                    with lock:
+                        counts['failed' if error else 'downloaded'] += 1
+                    if on_item is not None:
+                        on_item(item, stats, error)
+
+        threads = [threading.Thread(target=work, name=f'download-drain-{index}', daemon=True)
+                   for index in range(max(int(workers), 1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"下载队列: 下载完成 {counts['downloaded']} 个, 失败 {counts['failed']} 个")
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        return counts
+
+    def retry_failed(self) -> int:
+        """把失败的作品放回队列，尝试次数清零"""
+        return self.db.retry_failed_downloads(self.max_attempts)
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的作品数"""
+        return self.db.get_download_queue_stats()
+
+
+# 全局下载队列实例
+_download_queue = None
+_download_queue_lock = threading.Lock()
+
+
+def get_download_queue() -> DownloadQueue:
+    """获取全局下载队列"""
+    global _download_queue
+    if _download_queue is None:
+        with _download_queue_lock:
+            if _download_queue is None:
+                _download_queue = DownloadQueue()
+    return _download_queue
+
+
+class _DirectBatch:
+    """不使用数据库时直接下载，接口与 DownloadBatch 相同"""
+
+    def __init__(self, base_path: str, save_choice: str, force_download: bool = False):
+        self.base_path = base_path
+        self.save_choice = save_choice
+        self.force_download = force_download
+
+    def add(self, work_infos: Iterable[Dict[str, Any]]) -> int:
+        return 0
+
+    def add_sources(self, sources: Iterable[str]) -> int:
+        return 0
+
+    def download(self, work_info: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+        return download_work(work_info, self.base_path, self.save_choice, self.force_download, False)
+
+    def flush(self):
+        pass
+
+    def close(self, discard: bool = False):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def download_batch(base_path: str, save_choice: str, force_download: bool = False, use_database: bool = True):
+    """
+    爬取任务使用的下载批次
+    :param use_database: False 时不经过下载队列，直接下载.
+    :return: DownloadBatch.
+    """
+    if not use_database:
+        return _DirectBatch(base_path, save_choice, force_download)
+    return get_download_queue().batch(base_path, save_choice, force_download)
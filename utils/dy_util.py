@@ -5,48 +5,106 @@ import json
 import random
 import base64
 import urllib
-from os import path
+from os import path, getenv
 
 import requests
 requests.packages.urllib3.disable_warnings()
 import subprocess
+import threading
 from functools import partial
 
 subprocess.Popen = partial(subprocess.Popen, encoding="utf-8")
-import execjs
+
+from utils import a_bogus as a_bogus_py
+from utils.js_runtime import NodeRuntime
+
+# a_bogus 签名实现: js 使用 static/dy_ab.js, python 使用 utils/a_bogus.py
+SIGN_BACKEND = getenv('DY_SIGN_BACKEND', 'js').lower()
 
 if getattr(sys, 'frozen', None):
     basedir = sys._MEIPASS
 else:
     basedir = path.dirname(__file__)
 
+# dy_ab.js 在首次签名时才加载
+_dy_js = None
+_dy_js_lock = threading.Lock()
+
+
+def _load_dy_js():
+    try:
+        # 尝试多个可能的node_modules路径
+        possible_node_modules = [
+            path.join(basedir, 'node_modules'),
+            path.join(basedir, '..', 'node_modules'),
+            path.join(basedir, '..', 'web', 'node_modules')
+        ]
+
+        node_modules = None
+        for nm in possible_node_modules:
+            if path.exists(nm):
+                node_modules = nm
+                break
+
+        if not node_modules:
+            raise Exception("Cannot find node_modules directory")
+
+        dy_path = path.join(basedir, 'static', 'dy_ab.js')
+        if not path.exists(dy_path):
+            dy_path = path.join(basedir, '..', 'static', 'dy_ab.js')
+
+        if NodeRuntime.available():
+            runtime = NodeRuntime(path.abspath(dy_path), path.abspath(node_modules))
+            runtime.start()
+            return runtime
+        # 没有 node 时交给 execjs 选择其他运行时
+        import execjs
+        # 直接使用现有的node_modules目录，避免复制大文件
+        return execjs.compile(open(dy_path, 'r', encoding='utf-8').read(), cwd=node_modules)
+    except Exception as e:
+        print(f"Failed to load dy_ab.js: {e}")
+        raise
+
+
+def get_dy_js():
+    """获取 dy_ab.js 运行时，首次调用时加载"""
+    global _dy_js
+    if _dy_js is None:
+        with _dy_js_lock:
+            if _dy_js is None:
+                _dy_js = _load_dy_js()
+    return _dy_js
+
+
+def warm_up_js(background=True):
+    """
+    提前加载 dy_ab.js，避免第一次请求等待
+    :param background: 是否在后台线程加载
+    :return: 后台加载线程, 同步加载或无需加载时为 None
+    """
+    if SIGN_BACKEND == 'python':
+        # a_bogus 不再依赖 JS, 私信相关签名仍在首次使用时加载
+        return None
+
+    def load():
+        try:
+            get_dy_js()
+        except Exception:
+            pass
+
+    if not background:
+        get_dy_js()
+        return None
+    thread = threading.Thread(target=load, name='dy-js-warm-up', daemon=True)
+    thread.start()
+    return thread
 
-try:
-    # 尝试多个可能的node_modules路径
-    possible_node_modules = [
-        path.join(basedir, 'node_modules'),
-        path.join(basedir, '..', 'node_modules'),
-        path.join(basedir, '..', 'web', 'node_modules')
-    ]
-    
-    node_modules = None
-    for nm in possible_node_modules:
-        if path.exists(nm):
-            node_modules = nm
-            break
-    
-    if not node_modules:
-        raise Exception("Cannot find node_modules directory")
-    
-    dy_path = path.join(basedir, 'static', 'dy_ab.js')
-    if not path.exists(dy_path):
-        dy_path = path.join(basedir, '..', 'static', 'dy_ab.js')
-    
-    # 直接使用现有的node_modules目录，避免复制大文件
-    dy_js = execjs.compile(open(dy_path, 'r', encoding='utf-8').read(), cwd=node_modules)
-except Exception as e:
-    print(f"Failed to load dy_ab.js: {e}")
-    raise
+
+def __getattr__(name):
+    # 兼容直接使用 dy_util.dy_js 的旧代码
+    if name == 'dy_js':
+        return get_dy_js()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def trans_cookies(cookies_str):
@@ -64,19 +122,21 @@ def trans_cookies(cookies_str):
 
 # 私信传obj, 其他的拼接
 def generate_req_sign(e, priK):
-    sign = dy_js.call('get_req_sign', e, priK)
+    sign = get_dy_js().call('get_req_sign', e, priK)
     return sign
 
 
 # query, data都是拼接字符串
 def generate_a_bogus(query, data=""):
-    a_bogus = dy_js.call('get_ab', query, data)
+    if SIGN_BACKEND == 'python':
+        return a_bogus_py.get_ab(query, data)
+    a_bogus = get_dy_js().call('get_ab', query, data)
     return a_bogus
 
 
 # 传递私钥
 def generate_ree_key(prik):
-    ree_key = dy_js.call('get_ree_key', prik)
+    ree_key = get_dy_js().call('get_ree_key', prik)
     return ree_key
 
 
@@ -95,12 +155,8 @@ def generate_bd_ticket_client_data(api, ticket, ts_sign, priK):
 
 
 def generate_msToken(randomlength=107):
-    random_str = ''
     base_str = 'ABCDEFGHIGKLMNOPQRSTUVWXYZabcdefghigklmnopqrstuvwxyz0123456789='
-    length = len(base_str) - 1
-    for _ in range(randomlength):
-        random_str += base_str[random.randint(0, length)]
-    return random_str
+    return ''.join(random.choices(base_str, k=randomlength))
 
 
 def generate_ttwid():
@@ -121,15 +177,32 @@ def generate_ttwid():
 
 
 def generate_fake_webid(random_length=19):
-    random_str = ''
-    base_str = '0123456789'
-    length = len(base_str) - 1
-    for _ in range(random_length):
-        random_str += base_str[random.randint(0, length)]
-    return random_str
+    return ''.join(random.choices('0123456789', k=random_length))
 
 
-def generate_webid(auth=None, url=""):
+def generate_s_v_web_id():
+    """
+    生成 s_v_web_id (verifyFp)，格式与网页端一致: verify_{36进制毫秒时间戳}_{8}_{4}_{4}_{4}_{12}
+    """
+    base_str = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+    chars = [base_str[random.randrange(len(base_str))] for _ in range(36)]
+    for i in (8, 13, 18, 23):
+        chars[i] = '_'
+    chars[14] = '4'
+    chars[19] = base_str[(base_str.index(chars[19]) & 3) | 8]
+    millis = int(time.time() * 1000)
+    timestamp = ''
+    while millis:
+        millis, rest = divmod(millis, 36)
+        timestamp = base_str[rest].lower() + timestamp
+    return f"verify_{timestamp}_{''.join(chars)}"
+
+
+def generate_webid(auth=None, url="", fallback=True):
+    """
+    请求网页获取 webid
+    :param fallback: 获取失败时是否返回随机 webid, False 时返回 None
+    """
     if url == "":
         url = f"https://www.douyin.com/discover?modal_id=7376449060384935209"
     try:
@@ -147,7 +220,7 @@ def generate_webid(auth=None, url=""):
         # print(url)
         # print(e)
         # print("===================")
-        return generate_fake_webid()
+        return generate_fake_webid() if fallback else None
 
 
 def ws_accept_key(ws_key):
@@ -0,0 +1,264 @@
+# coding=utf-8
+"""
+作品信息导出
+字段与 handle_work_info 的结果一致，支持 excel、csv、jsonl 和 parquet 四种格式，
+所有写入器都是流式的: write 逐条写入，close 保存并返回生成的文件列表
+parquet 需要安装 pyarrow，按行组批量写入
+爬取到的作品按作者保存在数据库 work_exports 表中（按 work_id 增量更新），导出文件按需从表中生成
+"""
+import csv
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from .data_util import XlsxStreamWriter
+from .database import get_database
+
+# handle_work_info 的字段及类型 str: 字符串, int: 整数(未知时为空), list: 字符串列表
+WORK_FIELDS = [
+    ('work_id', 'str'), ('work_url', 'str'), ('work_type', 'str'), ('title', 'str'), ('desc', 'str'),
+    ('admire_count', 'int'), ('digg_count', 'int'), ('comment_count', 'int'), ('collect_count', 'int'),
+    ('share_count', 'int'), ('play_count', 'int'), ('video_addr', 'str'), ('images', 'list'),
+    ('topics', 'list'), ('create_time', 'int'), ('video_cover', 'str'), ('user_url', 'str'),
+    ('user_id', 'str'), ('nickname', 'str'), ('author_avatar', 'str'), ('user_desc', 'str'),
+    ('following_count', 'int'), ('follower_count', 'int'), ('total_favorited', 'int'),
+    ('aweme_count', 'int'), ('user_age', 'int'), ('gender', 'str'), ('ip_location', 'str'),
+]
+WORK_COLUMNS = [name for name, _ in WORK_FIELDS]
+
+# 可作为 save_choice 的导出格式, all 默认导出 excel, all-csv 等表示下载媒体的同时导出指定格式
+EXPORT_FORMATS = ('excel', 'csv', 'jsonl', 'parquet')
+EXPORT_EXTENSIONS = {'excel': '.xlsx', 'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+
+
+def parse_save_choice(save_choice: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    拆分保存方式
+    :param save_choice: all, all-<格式>, media, media-video, media-image, 或 EXPORT_FORMATS 之一
+    :return: (传给 download_work 的媒体保存方式, 导出格式), 不需要时为 None
+    """
+    if save_choice == 'all':
+        return 'all', 'excel'
+    if save_choice.startswith('all-') and save_choice[4:] in EXPORT_FORMATS:
+        return 'all', save_choice[4:]
+    if save_choice in EXPORT_FORMATS:
+        return None, save_choice
+    if 'media' in save_choice:
+        return save_choice, None
+    raise ValueError(f'未知的保存方式: {save_choice}')
+
+
+def _to_int(value) -> Optional[int]:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_list(value) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [] if value is None else [str(value)]
+
+
+class CsvStreamWriter:
+    """流式 CSV 写入，列表字段用逗号连接"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.total_rows = 0
+        self._file = open(file_path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(WORK_COLUMNS)
+
+    def write(self, data: Dict):
+        row = []
+        for name, kind in WORK_FIELDS:
+            value = data.get(name)
+            if kind == 'list':
+                row.append(', '.join(_to_list(value)))
+            else:
+                row.append('' if value is None else value)
+        self._writer.writerow(row)
+        self.total_rows += 1
+
+    def close(self) -> List[str]:
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f'数据保存至 {self.file_path}')
+        return [self.file_path]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonlStreamWriter:
+    """流式 JSON Lines 写入，每行一个作品，保留原始类型"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.total_rows = 0
+        self._file = open(file_path, 'w', encoding='utf-8')
+
+    def write(self, data: Dict):
+        self._file.write(json.dumps({name: data.get(name) for name in WORK_COLUMNS}, ensure_ascii=False))
+        self._file.write('\n')
+        self.total_rows += 1
+
+    def close(self) -> List[str]:
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f'数据保存至 {self.file_path}')
+        return [self.file_path]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ParquetBatchWriter:
+    """按列缓存作品信息，每 row_group_size 行写入一个行组"""
+
+    def __init__(self, file_path: str, row_group_size: int = 50000):
+        """
+        :param file_path: 保存路径
+        :param row_group_size: 每个行组的行数
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('导出 parquet 需要安装 pyarrow: pip install pyarrow')
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        types = {'str': pyarrow.string(), 'int': pyarrow.int64(), 'list': pyarrow.list_(pyarrow.string())}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in WORK_FIELDS])
+        self.file_path = file_path
+        self.row_group_size = row_group_size
+        self.total_rows = 0
+        self._columns = {name: [] for name in WORK_COLUMNS}
+        self._buffered = 0
+        self._writer = self._pq.ParquetWriter(file_path, self.schema)
+
+    def write(self, data: Dict):
+        for name, kind in WORK_FIELDS:
+            value = data.get(name)
+            if kind == 'int':
+                value = _to_int(value)
+            elif kind == 'list':
+                value = _to_list(value)
+            elif value is not None:
+                value = str(value)
+            self._columns[name].append(value)
+        self._buffered += 1
+        self.total_rows += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """把缓存的行写成一个行组"""
+        if not self._buffered:
+            return
+        table = self._pa.Table.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_table(table)
+        self._columns = {name: [] for name in WORK_COLUMNS}
+        self._buffered = 0
+
+    def close(self) -> List[str]:
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+            logger.info(f'数据保存至 {self.file_path}')
+        return [self.file_path]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+EXPORT_WRITERS = {
+    'excel': XlsxStreamWriter,
+    'csv': CsvStreamWriter,
+    'jsonl': JsonlStreamWriter,
+    'parquet': ParquetBatchWriter,
+}
+
+
+def open_export_writer(export_format: str, directory: str, name: str, **kwargs):
+    """
+    创建导出写入器
+    :param export_format: EXPORT_FORMATS 之一
+    :param directory: 保存目录
+    :param name: 文件名(不含扩展名)
+    :param kwargs: 传给写入器的参数, 如 excel 的 max_rows、parquet 的 row_group_size
+    """
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f'未知的导出格式: {export_format}')
+    file_path = os.path.abspath(os.path.join(directory, f'{name}{EXPORT_EXTENSIONS[export_format]}'))
+    return EXPORT_WRITERS[export_format](file_path, **kwargs)
+
+
+def export_works(datas: Iterable[Dict], export_format: str, directory: str, name: str, **kwargs) -> List[str]:
+    """
+    导出作品信息
+    :param datas: handle_work_info 结果的可迭代对象
+    :return: 生成的文件列表
+    """
+    writer = open_export_writer(export_format, directory, name, **kwargs)
+    with writer:
+        for data in datas:
+            writer.write(data)
+    return writer.close()
+
+
+def record_user_id(data: Dict) -> str:
+    """作品作者的 sec_uid（取自用户主页链接）"""
+    return data.get('user_url', '').rstrip('/').split('/')[-1].split('?')[0]
+
+
+def save_work_records(datas: Iterable[Dict], db=None) -> Dict[str, int]:
+    """
+    把作品信息按作者保存到导出表，只写入新作品和统计数据有变化的作品
+    :param datas: handle_work_info 结果的可迭代对象
+    :return: {'added': 新增数, 'updated': 更新数}
+    """
+    db = db or get_database()
+    by_user = {}
+    for data in datas:
+        user_id = record_user_id(data)
+        if user_id:
+            by_user.setdefault(user_id, []).append(data)
+    total = {'added': 0, 'updated': 0}
+    for user_id, records in by_user.items():
+        result = db.save_work_exports(user_id, records)
+        total['added'] += result['added']
+        total['updated'] += result['updated']
+    return total
+
+
+def export_user_works(user_id: str, export_format: str, directory: str, name: Optional[str] = None,
+                      db=None, **kwargs) -> List[str]:
+    """
+    从导出表生成作者的全部作品文件，按发布时间倒序
+    :param user_id: 作者 sec_uid
+    :param export_format: EXPORT_FORMATS 之一
+    :param directory: 保存目录
+    :param name: 文件名(不含扩展名), 默认 user_id
+    :return: 生成的文件列表
+    """
+    db = db or get_database()
+    return export_works(db.iter_work_exports(user_id), export_format, directory, name or user_id, **kwargs)
@@ -0,0 +1,328 @@
+# coding=utf-8
+"""
+后台任务管理
+Flask 接口提交的爬取、下载、扫描任务交给固定数量的工作线程执行，排队中的任务数有上限，
+队列已满时 submit 抛出 JobQueueFull(接口返回 429)，或者在 block=True 时等待空位
+每个任务带一个 CancelToken，任务函数在翻页、逐个作品、逐个订阅之间检查，取消后抛出 JobCancelled 结束
+已结束的任务保留 ttl 秒后清除，最多保留 max_finished 个
+环境变量 DY_JOB_WORKERS、DY_JOB_QUEUE、DY_JOB_TTL 分别调整工作线程数、排队上限和保留时间(秒)
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from os import getenv
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from dy_apis.request_scheduler import request_priority
+
+DEFAULT_WORKERS = int(getenv('DY_JOB_WORKERS', '2'))
+DEFAULT_QUEUE_SIZE = int(getenv('DY_JOB_QUEUE', '16'))
+DEFAULT_TTL = int(getenv('DY_JOB_TTL', '3600'))
+DEFAULT_MAX_FINISHED = 200
+
+# 与前端约定的任务状态，取消的任务记为 failed 并带 cancelled 标记
+FINISHED_STATUSES = ('completed', 'failed')
+CANCELLED_ERROR = 'Cancelled by user'
+
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+
+class JobQueueFull(Exception):
+    """排队中的任务数达到上限"""
+
+
+class CancelToken:
+    """取消标记，任务函数在安全的位置检查"""
+    __slots__ = ('_event',)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """已取消时抛出 JobCancelled"""
+        if self._event.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds: float):
+        """可被取消打断的 sleep，取消时抛出 JobCancelled"""
+        if self._event.wait(seconds):
+            raise JobCancelled()
+
+
+class Job:
+    """
+    一个后台任务
+    进度只记录 progress / total 两个计数，params 是提交时的参数(链接、关键词等)，data 是完成后的统计，
+    results 是批量任务中每一项的精简结果，只在任务详情中返回
+    """
+    __slots__ = ('id', 'type', 'func', 'on_cancel', 'priority', 'token', 'status', 'progress', 'total', 'error',
+                 'params', 'data', 'results', 'created_at', 'updated_at', 'started_at', 'finished_at')
+
+    def __init__(self, job_type: str, func: Callable[['Job'], Any], priority: Optional[str] = None,
+                 total: int = 0, params: Optional[Dict[str, Any]] = None,
+                 on_cancel: Optional[Callable[[], Any]] = None):
+        now = time.time()
+        self.id = str(uuid.uuid4())
+        self.type = job_type
+        self.func = func
+        self.on_cancel = on_cancel
+        self.priority = priority
+        self.token = CancelToken()
+        self.status = 'pending'
+        self.progress = 0
+        self.total = total
+        self.error: Optional[str] = None
+        self.params = params or {}
+        self.data: Dict[str, Any] = {}
+        self.results: List[Dict[str, Any]] = []
+        self.created_at = now
+        self.updated_at = now
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def update(self, progress: Optional[int] = None, total: Optional[int] = None, **data):
+        """
+        更新进度
+        :param progress: 已完成数量.
+        :param total: 总数量.
+        :param data: 写入 data 的统计信息.
+        """
+        if progress is not None:
+            self.progress = progress
+        if total is not None:
+            self.total = total
+        self.data.update(data)
+        self.updated_at = time.time()
+
+    def add_result(self, result: Dict[str, Any]):
+        """记录批量任务中一项的结果，progress 随之加一"""
+        self.results.append(result)
+        self.update(progress=len(self.results))
+
+    def _start(self):
+        self.status = 'running'
+        self.started_at = self.updated_at = time.time()
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = self.updated_at = time.time()
+        # 任务函数只在执行期间需要，结束后释放其中引用的数据
+        self.func = None
+        self.on_cancel = None
+
+    def to_dict(self, detail: bool = True) -> Dict[str, Any]:
+        """
+        接口返回的任务信息
+        :param detail: False 时省略 results 和列表类型的参数(如批量链接)，用于任务列表
+        """
+        job = {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'percent': round(self.progress * 100 / self.total, 1) if self.total else (100.0 if self.status == 'completed' else 0.0),
+            'created_at': int(self.created_at),
+            'updated_at': int(self.updated_at),
+        }
+        for key, value in self.params.items():
+            if detail or not isinstance(value, (list, tuple)):
+                job[key] = value
+        job.update(self.data)
+        if self.token.cancelled:
+            job['cancelled'] = True
+        if self.error is not None:
+            job['error'] = self.error
+        if detail and self.results:
+            job['results'] = self.results
+        return job
+
+
+class JobManager:
+    """固定工作线程池 + 有界队列"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 ttl: float = DEFAULT_TTL, max_finished: int = DEFAULT_MAX_FINISHED):
+        """
+        :param workers: 工作线程数，即同时执行的任务数.
+        :param queue_size: 排队中(未开始)的任务上限.
+        :param ttl: 已结束任务的保留时间(秒).
+        :param max_finished: 已结束任务的保留数量上限.
+        """
+        self.workers = max(int(workers), 1)
+        self.queue_size = max(int(queue_size), 1)
+        self.ttl = ttl
+        self.max_finished = max_finished
+        # 排队上限按未开始且未取消的任务计数，排队中取消的任务立即让出名额，之后由工作线程取出时跳过
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job_type: str, func: Callable[[Job], Any], priority: Optional[str] = None, total: int = 0,
+               block: bool = False, timeout: Optional[float] = None, on_cancel: Optional[Callable[[], Any]] = None,
+               **params) -> Job:
+        """
+        提交任务
+        :param job_type: 任务类型.
+        :param func: func(job) 在工作线程中执行，通过 job.update 报告进度，通过 job.token 检查取消.
+        :param priority: 请求类别(见 request_scheduler)，执行期间生效.
+        :param total: 初始的总数量.
+        :param block: 队列已满时是否等待空位.
+        :param timeout: block=True 时的最长等待时间(秒)，None 表示一直等待.
+        :param on_cancel: 任务在排队中(未开始执行)被取消时调用，用于清理提交时写入的数据.
+        :param params: 提交时的参数，原样出现在任务信息中.
+        :return: Job.
+        """
+        self._ensure_workers()
+        self.evict()
+        job = Job(job_type, func, priority, total, params, on_cancel)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while self._pending >= self.queue_size:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if not block or (remaining is not None and remaining <= 0):
+                    raise JobQueueFull(f"任务队列已满（{self.queue_size} 个任务排队中），请稍后再试")
+                self._slot_freed.wait(remaining)
+            self._pending += 1
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def _release_slot(self):
+        """任务开始执行或排队中被取消时让出排队名额，调用方需持有 _lock"""
+        self._pending -= 1
+        self._slot_freed.notify()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        with self._lock:
+            if job.cancelled:
+                # 排队期间已取消，名额已在取消时让出
+                return
+            self._release_slot()
+            job._start()
+        try:
+            if job.priority:
+                with request_priority(job.priority):
+                    job.func(job)
+            else:
+                job.func(job)
+            job._finish('completed')
+        except JobCancelled:
+            logger.info(f"任务已取消: {job.type} {job.id}")
+            job._finish('failed', CANCELLED_ERROR)
+        except Exception as e:
+            logger.error(f"任务执行失败 {job.type} {job.id}: {e}")
+            job._finish('failed', str(e))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.evict()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        """所有任务，新提交的在前"""
+        self.evict()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        取消任务，排队中的任务直接结束，执行中的任务在下一个检查点结束
+        :return: 任务不存在或已结束时返回 False.
+        """
+        on_cancel = None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.token.cancel()
+            if job.status == 'pending':
+                on_cancel = job.on_cancel
+                job._finish('failed', CANCELLED_ERROR)
+                self._release_slot()
+            else:
+                job.update()
+        if on_cancel is not None:
+            try:
+                on_cancel()
+            except Exception as e:
+                logger.error(f"任务取消回调执行失败 {job.type} {job.id}: {e}")
+        return True
+
+    def evict(self):
+        """清除超过保留时间或超出保留数量的已结束任务"""
+        now = time.time()
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.finished]
+            expired = {job.id for job in finished if now - job.finished_at > self.ttl}
+            overflow = len(finished) - len(expired) - self.max_finished
+            if overflow > 0:
+                remaining = sorted((job for job in finished if job.id not in expired), key=lambda job: job.finished_at)
+                expired.update(job.id for job in remaining[:overflow])
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """工作线程数、排队上限和各状态的任务数"""
+        with self._lock:
+            counts = {'pending': 0, 'running': 0, 'completed': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {'workers': self.workers, 'queue_size': self.queue_size, 'ttl': self.ttl, 'jobs': counts}
+
+
+# 全局任务管理器实例
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """获取全局任务管理器"""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+    return _job_manager
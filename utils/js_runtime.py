@@ -0,0 +1,105 @@
+# coding=utf-8
+"""
+常驻 node 进程运行 dy_ab.js
+execjs 每次 call 都会启动一个 node 进程并重新解析整个脚本，这里只在首次调用时启动一次，之后按行收发 JSON
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+from typing import Any, Optional
+
+from loguru import logger
+
+# 加载脚本后逐行读取 {"name": 函数名, "args": 参数}，返回 {"result": ...} 或 {"error": ...}
+NODE_DRIVER = r"""
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+globalThis.require = require;
+vm.runInThisContext(fs.readFileSync(process.argv[1], 'utf8'), {filename: process.argv[1]});
+const out = (msg) => process.stdout.write(JSON.stringify(msg) + '\n');
+out({ready: true});
+readline.createInterface({input: process.stdin}).on('line', (line) => {
+    try {
+        const {name, args} = JSON.parse(line);
+        out({result: globalThis[name](...args)});
+    } catch (e) {
+        out({error: String(e && e.stack || e)});
+    }
+});
+"""
+
+
+class NodeRuntime:
+    """常驻 node 进程，接口与 execjs 编译后的上下文一致（call）"""
+
+    def __init__(self, source_path: str, node_modules: Optional[str] = None, node: str = 'node'):
+        """
+        :param source_path: JS 文件路径.
+        :param node_modules: node_modules 目录, 作为工作目录和 NODE_PATH.
+        :param node: node 可执行文件.
+        """
+        self.source_path = source_path
+        self.node_modules = node_modules
+        self.node = node
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available(node: str = 'node') -> bool:
+        return shutil.which(node) is not None
+
+    def _start(self):
+        env = dict(os.environ, NODE_PATH=self.node_modules) if self.node_modules else None
+        self._process = subprocess.Popen(
+            [self.node, '-e', NODE_DRIVER, self.source_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, cwd=self.node_modules, env=env, encoding='utf-8', bufsize=1)
+        ready = self._process.stdout.readline()
+        if not ready:
+            self._process = None
+            raise RuntimeError(f"node 加载 {self.source_path} 失败")
+        logger.debug(f"node 签名进程已启动: pid {self._process.pid}")
+
+    def start(self):
+        """启动 node 进程并加载脚本，已启动时直接返回"""
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+    def call(self, name: str, *args) -> Any:
+        """
+        调用 JS 全局函数
+        :param name: 函数名.
+        :param args: 参数, 需可 JSON 序列化.
+        :return: 返回值.
+        """
+        request = json.dumps({'name': name, 'args': args}, ensure_ascii=False) + '\n'
+        with self._lock:
+            # 进程意外退出时重启一次
+            for attempt in range(2):
+                if self._process is None or self._process.poll() is not None:
+                    self._start()
+                try:
+                    self._process.stdin.write(request)
+                    self._process.stdin.flush()
+                    line = self._process.stdout.readline()
+                except (BrokenPipeError, OSError):
+                    line = ''
+                if line:
+                    break
+                self._process = None
+            else:
+                raise RuntimeError(f"node 签名进程无响应: {name}")
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(f"调用 {name} 失败: {response['error']}")
+        return response.get('result')
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.terminate()
+                self._process = None
@@ -64,12 +64,13 @@ class ScanCollector:
         self.total_subscriptions = count
         
     def start_subscription(self, user_id: str, nickname: str):
-        """记录一个订阅的扫描开始"""
+        """记录一个订阅的扫描开始，同一汇总中再次扫描的订阅保留之前发现的新视频"""
         self.current_subscription_start = time.time()
+        previous = self.subscription_results.get(user_id)
         result = SubscriptionScanResult(
             user_id=user_id,
             nickname=nickname,
-            new_videos=[]
+            new_videos=previous.new_videos if previous else []
         )
         self.subscription_results[user_id] = result
         logger.debug(f"开始扫描订阅: {nickname} (ID: {user_id})")
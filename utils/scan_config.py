@@ -43,6 +43,13 @@ class ScanConfig:
     pause_on_risk_control: bool = True  # 遇到风控时暂停
     risk_control_pause_minutes: int = 30  # 风控暂停时间（分钟）
 
+    # 自适应扫描（按作者发布频率决定各订阅的扫描间隔，代替按 scan_interval 整轮扫描，扫描日志和通知仍每 scan_interval 秒汇总一次）
+    adaptive_scan: bool = True  # 是否启用自适应扫描
+    min_scan_interval: int = 900  # 最短扫描间隔（秒）
+    max_scan_interval: int = 259200  # 最长扫描间隔（秒）
+    target_new_videos_per_scan: float = 0.25  # 期望每次扫描发现的新视频数
+    requests_per_hour: int = 240  # 扫描每小时可用的请求数
+
 
 class ScanConfigManager:
     """扫描配置管理器"""
@@ -137,6 +144,12 @@ class ScanConfigManager:
             
         if self._config.concurrent_downloads > 10:
             warnings.append("并发下载数过多可能触发风控")
+
+        if self._config.min_scan_interval > self._config.max_scan_interval:
+            errors.append("最短扫描间隔不能大于最长扫描间隔")
+
+        if self._config.requests_per_hour < 1:
+            errors.append("每小时请求数不能小于1")
             
         return {
             'valid': len(errors) == 0,
@@ -0,0 +1,161 @@
+# coding=utf-8
+"""
+自适应扫描频率
+根据作者近期的发布数量估计发布速率，速率越高扫描间隔越短；订阅按下次到期时间放在最小堆中，
+到期后在每小时请求预算内放行，代替按固定间隔整轮扫描全部订阅
+"""
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional
+
+DAY = 86400
+
+
+def estimate_post_rate(create_times: Iterable[int], now: Optional[float] = None, window_days: int = 30) -> float:
+    """
+    估计发布速率
+    窗口内作品数加 0.5 做平滑，窗口内没有作品的账号也不会被当作永不更新
+    :param create_times: 作品发布时间戳(秒)
+    :param now: 当前时间, 默认 time.time()
+    :param window_days: 统计窗口(天)
+    :return: 每天发布的作品数
+    """
+    now = time.time() if now is None else now
+    window_start = now - window_days * DAY
+    recent = sum(1 for create_time in create_times if create_time >= window_start)
+    return (recent + 0.5) / window_days
+
+
+class AdaptiveScanQueue:
+    """按下次到期时间排序的订阅队列，带每小时请求预算"""
+
+    def __init__(self, min_interval: int = 900, max_interval: int = 3 * DAY,
+                 target_new_videos: float = 0.25, requests_per_hour: int = 240):
+        """
+        :param min_interval: 最短扫描间隔(秒).
+        :param max_interval: 最长扫描间隔(秒).
+        :param target_new_videos: 期望每次扫描发现的新作品数, 间隔 = 该值 / 发布速率.
+        :param requests_per_hour: 扫描每小时可用的请求数.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new_videos = target_new_videos
+        self.requests_per_hour = requests_per_hour
+        self._heap = []
+        # user_id -> 到期时间, 堆中与此不一致的条目视为已作废
+        self._due: Dict[str, float] = {}
+        self._budget = self._budget_capacity
+        self._budget_at = time.time()
+
+    @property
+    def _budget_capacity(self) -> float:
+        # 预算最多积攒 15 分钟
+        return max(self.requests_per_hour / 4, 1.0)
+
+    def interval_for(self, post_rate: Optional[float]) -> float:
+        """
+        根据发布速率计算扫描间隔
+        :param post_rate: 每天发布的作品数, None 表示尚无估计
+        :return: 扫描间隔(秒)
+        """
+        if not post_rate:
+            return self.min_interval
+        interval = self.target_new_videos / post_rate * DAY
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def schedule(self, user_id: str, due: float):
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, user_id))
+
+    def reschedule(self, user_id: str, post_rate: Optional[float], now: Optional[float] = None):
+        """扫描完成后按新的发布速率安排下次扫描"""
+        now = time.time() if now is None else now
+        self.schedule(user_id, now + self.interval_for(post_rate))
+
+    def sync(self, subscriptions: List[Dict], tracker, now: Optional[float] = None):
+        """
+        与启用的订阅列表同步: 新订阅立即到期，已扫描过的按上次扫描时间和发布速率计算到期时间，移除已删除的订阅
+        :param subscriptions: 启用的订阅.
+        :param tracker: ScanTracker.
+        """
+        now = time.time() if now is None else now
+        active = {sub['user_id'] for sub in subscriptions}
+        for user_id in list(self._due):
+            if user_id not in active:
+                del self._due[user_id]
+        for user_id in active - set(self._due):
+            progress = tracker.get_subscription_progress(user_id)
+            if not progress or not progress.get('last_scan_time'):
+                self.schedule(user_id, now)
+            else:
+                self.schedule(user_id, progress['last_scan_time'] + self.interval_for(progress.get('post_rate')))
+        # 作废条目过多时重建堆
+        if len(self._heap) > 2 * len(self._due) + 16:
+            self._heap = [(due, user_id) for user_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def _peek(self) -> Optional[tuple]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def next_due(self) -> Optional[float]:
+        """最早到期时间, 队列为空时返回 None"""
+        head = self._peek()
+        return head[0] if head else None
+
+    def _refill_budget(self, now: float):
+        elapsed = max(now - self._budget_at, 0.0)
+        self._budget = min(self._budget_capacity, self._budget + elapsed * self.requests_per_hour / 3600)
+        self._budget_at = now
+
+    def budget_wait(self, cost: float, now: Optional[float] = None) -> float:
+        """
+        预算攒够 cost 个请求还需等待的秒数
+        超过预算上限的扫描在预算攒满时放行，多出的请求数在之后从预算中扣回
+        """
+        now = time.time() if now is None else now
+        self._refill_budget(now)
+        cost = min(cost, self._budget_capacity)
+        if self._budget >= cost or self.requests_per_hour <= 0:
+            return 0.0
+        return (cost - self._budget) * 3600 / self.requests_per_hour
+
+    def wait_time(self, costs: Dict[str, float], now: Optional[float] = None) -> Optional[float]:
+        """
+        距离下一个订阅可以扫描还需等待的秒数（到期且预算足够）
+        :param costs: user_id -> 预计请求数.
+        :return: 秒数, 队列为空时返回 None.
+        """
+        now = time.time() if now is None else now
+        head = self._peek()
+        if head is None:
+            return None
+        return max(head[0] - now, self.budget_wait(costs.get(head[1], 1), now), 0.0)
+
+    def take_due(self, costs: Dict[str, float], now: Optional[float] = None) -> List[str]:
+        """
+        按到期先后取出已到期且预算足够的订阅并按预计请求数扣除预算（可以扣成负数）
+        :param costs: user_id -> 预计请求数, 缺省按 1 计.
+        :return: 本批要扫描的 user_id.
+        """
+        now = time.time() if now is None else now
+        batch = []
+        while True:
+            head = self._peek()
+            if head is None or head[0] > now:
+                break
+            cost = costs.get(head[1], 1)
+            if self.budget_wait(cost, now) > 0:
+                break
+            heapq.heappop(self._heap)
+            del self._due[head[1]]
+            self._budget -= cost
+            batch.append(head[1])
+        return batch
+
+    def snapshot(self, limit: int = 10, now: Optional[float] = None) -> List[Dict]:
+        """即将到期的订阅"""
+        now = time.time() if now is None else now
+        upcoming = heapq.nsmallest(limit, ((due, user_id) for user_id, due in self._due.items()))
+        return [{'user_id': user_id, 'due_in': max(int(due - now), 0)} for due, user_id in upcoming]
@@ -12,59 +12,55 @@ from dataclasses import asdict
 import logging
 
 from .scan_collector import ScanSummary
+from .database import Database, get_database
 
 logger = logging.getLogger(__name__)
 
+# 最多保留的扫描日志条数
+MAX_HISTORY = 100
+
 
 class ScanLogger:
     """扫描日志管理器"""
     
-    def __init__(self, log_dir: str = "scan_logs"):
+    def __init__(self, log_dir: str = "scan_logs", db: Optional[Database] = None):
         """
         初始化扫描日志管理器
-        :param log_dir: 日志存储目录
+        日志保存在数据库 scan_logs 表中，按扫描ID直接查询
+        :param log_dir: 旧版日志目录，其中的 scan_history.json 在首次使用时导入数据库
+        :param db: 数据库实例，默认使用全局实例
         """
         self.log_dir = log_dir
         self.current_log_file = os.path.join(log_dir, "scan_history.json")
-        self._ensure_log_dir()
-        
-    def _ensure_log_dir(self):
-        """确保日志目录存在"""
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
-            logger.info(f"创建扫描日志目录: {self.log_dir}")
-            
-    def _load_history(self) -> List[Dict[str, Any]]:
-        """加载扫描历史"""
-        if not os.path.exists(self.current_log_file):
-            return []
-            
+        self._db = db
+        self._migrated = False
+    
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            self._db = get_database()
+        if not self._migrated:
+            self._migrated = True
+            self._migrate_json()
+        return self._db
+    
+    def _migrate_json(self):
+        """导入旧版 JSON 扫描历史（只执行一次）"""
+        if not os.path.exists(self.current_log_file) or self._db.get_scan_state('history_migrated'):
+            return
         try:
             with open(self.current_log_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                # 确保返回列表
-                if isinstance(data, list):
-                    return data
-                elif isinstance(data, dict) and 'history' in data:
-                    return data['history']
-                else:
-                    return []
-        except Exception as e:
-            logger.error(f"加载扫描历史失败: {e}")
-            return []
-            
-    def _save_history(self, history: List[Dict[str, Any]]):
-        """保存扫描历史"""
-        try:
-            # 限制历史记录数量（保留最近100条）
-            if len(history) > 100:
-                history = history[-100:]
-                
-            with open(self.current_log_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, ensure_ascii=False, indent=2, default=str)
-                
+            if isinstance(data, dict):
+                data = data.get('history', [])
+            records = [r for r in data if isinstance(r, dict) and r.get('scan_id')]
+            for record in records:
+                record.setdefault('timestamp', 0)
+            imported = self._db.add_scan_logs(records)
+            logger.info(f"从 {self.current_log_file} 导入了 {imported} 条扫描日志")
         except Exception as e:
-            logger.error(f"保存扫描历史失败: {e}")
+            logger.error(f"导入扫描历史失败: {e}")
+        self._db.set_scan_state(history_migrated=True)
             
     def log_scan(self, summary: ScanSummary) -> str:
         """
@@ -81,39 +77,12 @@ class ScanLogger:
         scan_record['scan_id'] = scan_id
         scan_record['timestamp'] = int(time.time())
         
-        # 加载历史并添加新记录
-        history = self._load_history()
-        history.append(scan_record)
-        
-        # 保存
-        self._save_history(history)
-        
-        # 同时保存详细日志文件
-        self._save_detailed_log(scan_id, summary)
+        # 追加一行，不重写已有日志，同时只保留最近 MAX_HISTORY 条
+        self.db.add_scan_logs([scan_record], keep=MAX_HISTORY)
         
         logger.info(f"记录扫描日志: {scan_id}")
         return scan_id
         
-    def _save_detailed_log(self, scan_id: str, summary: ScanSummary):
-        """保存详细的扫描日志"""
-        try:
-            # 使用日期组织日志文件
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            detail_dir = os.path.join(self.log_dir, "details", date_str)
-            
-            if not os.path.exists(detail_dir):
-                os.makedirs(detail_dir)
-                
-            # 保存详细日志
-            detail_file = os.path.join(detail_dir, f"{scan_id}.json")
-            scan_data = self._summary_to_dict(summary)
-            
-            with open(detail_file, 'w', encoding='utf-8') as f:
-                json.dump(scan_data, f, ensure_ascii=False, indent=2, default=str)
-                
-        except Exception as e:
-            logger.error(f"保存详细扫描日志失败: {e}")
-            
     def _summary_to_dict(self, summary: ScanSummary) -> Dict[str, Any]:
         """将扫描摘要转换为字典"""
         data = asdict(summary)
@@ -150,15 +119,9 @@ class ScanLogger:
         """
         获取扫描历史
         :param limit: 返回记录数量限制
-        :return: 扫描历史列表
+        :return: 扫描历史列表（按时间倒序）
         """
-        history = self._load_history()
-        
-        # 按时间倒序
-        history.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-        
-        # 限制返回数量
-        return history[:limit]
+        return self.db.get_scan_logs(limit)
         
     def get_scan_detail(self, scan_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -166,42 +129,14 @@ class ScanLogger:
         :param scan_id: 扫描ID
         :return: 扫描详情
         """
-        # 先从历史记录中查找
-        history = self._load_history()
-        for record in history:
-            if record.get('scan_id') == scan_id:
-                # 尝试加载详细日志
-                detail = self._load_detailed_log(scan_id)
-                if detail:
-                    return detail
-                return record
-                
-        return None
-        
-    def _load_detailed_log(self, scan_id: str) -> Optional[Dict[str, Any]]:
-        """加载详细的扫描日志"""
-        try:
-            # 遍历所有日期目录查找
-            details_dir = os.path.join(self.log_dir, "details")
-            if not os.path.exists(details_dir):
-                return None
-                
-            for date_dir in os.listdir(details_dir):
-                detail_file = os.path.join(details_dir, date_dir, f"{scan_id}.json")
-                if os.path.exists(detail_file):
-                    with open(detail_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                        
-        except Exception as e:
-            logger.error(f"加载详细扫描日志失败: {e}")
-            
-        return None
+        return self.db.get_scan_log(scan_id)
         
     def get_statistics(self) -> Dict[str, Any]:
         """获取扫描统计信息"""
-        history = self._load_history()
+        stats = self.db.get_scan_log_stats()
+        total_scans = stats['total_scans']
         
-        if not history:
+        if not total_scans:
             return {
                 'total_scans': 0,
                 'total_new_videos': 0,
@@ -209,17 +144,12 @@ class ScanLogger:
                 'success_rate': 0
             }
             
-        total_scans = len(history)
-        total_new_videos = sum(r.get('total_new_videos', 0) for r in history)
-        total_duration = sum(r.get('scan_duration', 0) for r in history)
-        successful_scans = sum(1 for r in history if r.get('failed_subscriptions', 0) == 0)
-        
         return {
             'total_scans': total_scans,
-            'total_new_videos': total_new_videos,
-            'average_duration': total_duration / total_scans if total_scans > 0 else 0,
-            'success_rate': (successful_scans / total_scans * 100) if total_scans > 0 else 0,
-            'last_scan_time': history[0].get('scan_time') if history else None
+            'total_new_videos': stats['total_new_videos'],
+            'average_duration': stats['total_duration'] / total_scans,
+            'success_rate': stats['successful_scans'] / total_scans * 100,
+            'last_scan_time': stats['last_scan_time']
         }
         
     def cleanup_old_logs(self, days: int = 30):
@@ -227,31 +157,10 @@ class ScanLogger:
         清理旧日志
         :param days: 保留最近N天的日志
         """
-        try:
-            cutoff_time = time.time() - (days * 24 * 3600)
-            
-            # 清理历史记录
-            history = self._load_history()
-            history = [r for r in history if r.get('timestamp', 0) > cutoff_time]
-            self._save_history(history)
-            
-            # 清理详细日志文件
-            details_dir = os.path.join(self.log_dir, "details")
-            if os.path.exists(details_dir):
-                cutoff_date = datetime.fromtimestamp(cutoff_time).strftime("%Y-%m-%d")
-                
-                for date_dir in os.listdir(details_dir):
-                    if date_dir < cutoff_date:
-                        dir_path = os.path.join(details_dir, date_dir)
-                        try:
-                            import shutil
-                            shutil.rmtree(dir_path)
-                            logger.info(f"清理旧日志目录: {dir_path}")
-                        except Exception as e:
-                            logger.error(f"清理日志目录失败: {e}")
-                            
-        except Exception as e:
-            logger.error(f"清理旧日志失败: {e}")
+        cutoff_time = int(time.time() - (days * 24 * 3600))
+        removed = self.db.delete_scan_logs_before(cutoff_time)
+        if removed:
+            logger.info(f"清理了 {removed} 条旧扫描日志")
 
 
 # 全局扫描日志实例
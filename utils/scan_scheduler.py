@@ -16,7 +16,12 @@ from .database import get_database
 from .notification import send_scan_notification
 from .scan_logger import get_scan_logger
 from .scan_config import get_scan_config
+from .scan_frequency import AdaptiveScanQueue, estimate_post_rate
+from .async_util import run_blocking, LoopLagWatchdog
+from dy_apis.douyin_api import DouyinAPI
 from dy_apis.douyin_async_api import DouyinAsyncAPI
+from dy_apis.pagination import DEFAULT_CHECKPOINT_EVERY
+from dy_apis.request_scheduler import request_priority
 from builder.auth import DouyinAuth
 
 # 配置logger
@@ -77,12 +82,20 @@ class SubscriptionScanner:
         self.api: Optional[DouyinAsyncAPI] = None  # 延迟初始化
         self._scan_task: Optional[asyncio.Task] = None
         self._on_new_videos_callback: Optional[Callable] = None
+        self._on_subscription_scanned_callback: Optional[Callable] = None
         self._auth: Optional[DouyinAuth] = None
+        self.queue: Optional[AdaptiveScanQueue] = None  # 自适应扫描队列，首次使用时创建
+        self._adaptive_collector: Optional[ScanCollector] = None  # 自适应扫描本周期内各批次的汇总
+        self.watchdog = LoopLagWatchdog()  # 事件循环阻塞监控
         
     def set_on_new_videos_callback(self, callback: Callable[[str, List[Dict]], None]):
-        """设置发现新视频时的回调函数"""
+        """设置发现新视频时的回调函数，翻页时每页有新视频就调用一次（用于自动下载）"""
         self._on_new_videos_callback = callback
         
+    def set_on_subscription_scanned_callback(self, callback: Callable[[str, List[Dict]], None]):
+        """设置订阅扫描成功且有新视频时的回调函数，每个订阅只调用一次（用于发送通知）"""
+        self._on_subscription_scanned_callback = callback
+        
     def set_auth(self, auth: DouyinAuth):
         """设置认证信息"""
         self._auth = auth
@@ -95,10 +108,12 @@ class SubscriptionScanner:
             return
             
         self._scan_task = asyncio.create_task(self._scan_loop())
+        self.watchdog.start()
         logger.info(f"订阅扫描任务已启动，扫描间隔: {self.scan_interval}秒")
         
     async def stop(self):
         """停止扫描任务"""
+        self.watchdog.stop()
         if self._scan_task:
             self._scan_task.cancel()
             try:
@@ -127,7 +142,10 @@ class SubscriptionScanner:
             'paused': self.controller.is_paused(),
             'scan_interval': self.scan_interval,
             'auto_download': self.auto_download,
-            'last_scan': self.tracker.get_last_scan_info()
+            'last_scan': self.tracker.get_last_scan_info(),
+            'adaptive_scan': get_scan_config().adaptive_scan,
+            'upcoming_scans': self.queue.snapshot() if self.queue else [],
+            'loop_lag': self.watchdog.stats()
         }
         
     async def _scan_loop(self):
@@ -137,6 +155,14 @@ class SubscriptionScanner:
                 # 检查是否暂停
                 await self.controller.wait_if_paused()
                 
+                # 自适应扫描：只扫描到期的订阅，之后按需等待
+                if get_scan_config().adaptive_scan:
+                    await self._adaptive_scan_step()
+                    continue
+                
+                # 切换回整轮扫描前先汇总自适应扫描已完成的批次
+                await self._report_adaptive_round(force=True)
+                
                 # 开始新一轮扫描
                 await self._perform_scan()
                 
@@ -164,34 +190,103 @@ class SubscriptionScanner:
                 # 出错后等待一段时间再重试
                 await asyncio.sleep(60)
                 
-    async def _perform_scan(self):
-        """执行一轮扫描"""
+    def _get_queue(self) -> AdaptiveScanQueue:
+        """获取自适应扫描队列，并应用最新的扫描配置"""
+        config = get_scan_config()
+        if self.queue is None:
+            self.queue = AdaptiveScanQueue()
+        self.queue.min_interval = config.min_scan_interval
+        self.queue.max_interval = config.max_scan_interval
+        self.queue.target_new_videos = config.target_new_videos_per_scan
+        self.queue.requests_per_hour = config.requests_per_hour
+        return self.queue
+
+    def _take_due_batch(self, queue: AdaptiveScanQueue):
+        """读取订阅和扫描进度，取出本批到期的订阅（在线程池中执行）"""
+        subscriptions = {sub['user_id']: sub for sub in get_database().get_all_subscriptions(enabled_only=True)}
+        now = time.time()
+        queue.sync(list(subscriptions.values()), self.tracker, now)
+        all_progress = self.tracker.get_all_progress()
+        costs = {user_id: all_progress.get(user_id, {}).get('request_cost') or 1 for user_id in subscriptions}
+        return subscriptions, costs, queue.take_due(costs, now)
+
+    async def _report_adaptive_round(self, force: bool = False):
+        """
+        自适应扫描每隔 scan_interval 秒把期间各批次的结果作为一轮汇总，记录扫描日志并发送一次通知
+        :param force: 不足 scan_interval 秒也立即汇总
+        """
+        collector = self._adaptive_collector
+        if collector is None:
+            return
+        if not force and time.time() - collector.start_time < self.scan_interval:
+            return
+        self._adaptive_collector = None
+        await self._report_scan(collector)
+
+    async def _adaptive_scan_step(self):
+        """
+        自适应扫描的一步：扫描已到期且在请求预算内的订阅，没有可扫描的订阅时等待
+        每个订阅扫描完成后按新估计的发布速率重新安排，各批次的结果按周期汇总为一轮
+        """
+        await self._report_adaptive_round()
+        queue = self._get_queue()
+        subscriptions, costs, batch = await run_blocking(self._take_due_batch, queue)
+        if batch:
+            if self._adaptive_collector is None:
+                await run_blocking(self.tracker.start_new_round)
+                self._adaptive_collector = ScanCollector()
+            self._adaptive_collector.set_total_subscriptions(len(subscriptions))
+            try:
+                await self._perform_scan([subscriptions[user_id] for user_id in batch], self._adaptive_collector)
+            finally:
+                all_progress = await run_blocking(self.tracker.get_all_progress)
+                for user_id in batch:
+                    queue.reschedule(user_id, all_progress.get(user_id, {}).get('post_rate'))
+            return
+        wait = queue.wait_time(costs)
+        # 分段等待，及时响应暂停和订阅变化
+        await asyncio.sleep(min(max(wait if wait is not None else 60, 1), 5))
+
+    async def _perform_scan(self, subscriptions: Optional[List[Dict]] = None,
+                            collector: Optional[ScanCollector] = None):
+        """
+        执行一轮扫描
+        :param subscriptions: 本轮要扫描的订阅，默认扫描全部启用的订阅
+        :param collector: 自适应扫描的周期汇总；传入时只扫描这一批，不开始新一轮，也不记录日志和发送通知
+        """
         self.controller.set_scanning(True)
-        collector = ScanCollector()
+        own_round = collector is None
+        if own_round:
+            collector = ScanCollector()
         
         try:
             # 开始新一轮扫描
-            self.tracker.start_new_round()
+            if own_round:
+                await run_blocking(self.tracker.start_new_round)
             
             # 获取数据库连接
             db = get_database()
             
             # 获取所有启用的订阅
-            subscriptions = db.get_all_subscriptions(enabled_only=True)
+            full_round = subscriptions is None
+            if full_round:
+                subscriptions = await run_blocking(db.get_all_subscriptions, enabled_only=True)
             
             if not subscriptions:
                 logger.info("没有启用的订阅需要扫描")
                 return
                 
             # 设置总订阅数
-            collector.set_total_subscriptions(len(subscriptions))
+            if own_round:
+                collector.set_total_subscriptions(len(subscriptions))
             
             # 清理已移除订阅的进度记录
-            active_ids = [sub['user_id'] for sub in subscriptions]
-            self.tracker.cleanup_removed_subscriptions(active_ids)
+            if full_round:
+                active_ids = [sub['user_id'] for sub in subscriptions]
+                await run_blocking(self.tracker.cleanup_removed_subscriptions, active_ids)
             
             # 按优先级分组（新订阅优先）
-            new_subs, old_subs = self.tracker.group_subscriptions_by_priority(subscriptions)
+            new_subs, old_subs = await run_blocking(self.tracker.group_subscriptions_by_priority, subscriptions)
             
             if new_subs:
                 logger.info(f"检测到 {len(new_subs)} 个新订阅，将优先扫描")
@@ -213,20 +308,24 @@ class SubscriptionScanner:
                 collector.start_subscription(user_id, nickname)
                 
                 try:
-                    # 获取用户最新视频
-                    new_videos = await self._scan_subscription(sub, collector)
+                    # 获取用户最新视频（新视频按页回调下载，见 _scan_subscription）
+                    # 从未扫描过的订阅需要翻完全部作品，按 backfill 排在常规扫描之后
+                    progress = await run_blocking(self.tracker.get_subscription_progress, user_id)
+                    priority = 'scan' if progress else 'backfill'
+                    with request_priority(priority):
+                        new_videos = await self._scan_subscription(sub, collector)
                     
                     # 记录扫描成功
                     collector.end_subscription(user_id)
                     
-                    # 如果有新视频且设置了自动下载
-                    if new_videos and self.auto_download and sub.get('auto_download', True):
-                        if self._on_new_videos_callback:
-                            await self._on_new_videos_callback(user_id, new_videos)
+                    # 扫描成功、进度保存之后，整个订阅的新视频只通知一次
+                    if new_videos and self._on_subscription_scanned_callback:
+                        await self._on_subscription_scanned_callback(user_id, new_videos)
                     
-                    # 延迟避免风控（非第一个订阅）
-                    if idx < len(ordered_subs):
-                        await asyncio.sleep(3)
+                    # 延迟避免风控（非最后一个订阅）
+                    source_delay = get_scan_config().source_delay
+                    if idx < len(ordered_subs) and source_delay > 0:
+                        await asyncio.sleep(source_delay)
                         
                 except Exception as e:
                     error_msg = str(e)
@@ -238,25 +337,39 @@ class SubscriptionScanner:
                         logger.error("检测到风控，停止本轮扫描")
                         break
                         
-            # 生成扫描摘要
-            summary = collector.generate_summary()
+            if own_round:
+                await self._report_scan(collector)
+                
+        finally:
+            self.controller.set_scanning(False)
             
-            # 记录扫描日志
-            try:
-                scan_logger = get_scan_logger()
-                scan_id = scan_logger.log_scan(summary)
-                logger.info(f"扫描日志已记录: {scan_id}")
-            except Exception as e:
-                logger.error(f"记录扫描日志失败: {e}")
+    async def _report_scan(self, collector: ScanCollector):
+        """生成一轮扫描的摘要，记录扫描日志并发送扫描通知"""
+        # 生成扫描摘要
+        summary = collector.generate_summary()
+        
+        # 记录扫描日志
+        try:
+            scan_logger = get_scan_logger()
+            scan_id = await run_blocking(scan_logger.log_scan, summary)
+            logger.info(f"扫描日志已记录: {scan_id}")
+        except Exception as e:
+            logger.error(f"记录扫描日志失败: {e}")
+        
+        # 发送扫描通知
+        try:
+            await send_scan_notification(summary)
+        except Exception as e:
+            logger.error(f"发送扫描通知失败: {e}")
             
-            # 发送扫描通知
+    @staticmethod
+    def _save_subscription_videos(db, subscription_db_id: int, works: List[Dict]):
+        """把一页作品写入订阅视频表（在线程池中执行）"""
+        for work in works:
             try:
-                await send_scan_notification(summary)
+                db.add_subscription_video(subscription_db_id, work)
             except Exception as e:
-                logger.error(f"发送扫描通知失败: {e}")
-                
-        finally:
-            self.controller.set_scanning(False)
+                logger.error(f"添加视频到订阅数据库失败: {e}")
             
     async def _scan_subscription(self, subscription: Dict, collector: ScanCollector) -> List[Dict]:
         """
@@ -271,8 +384,8 @@ class SubscriptionScanner:
             return []
         
         # 获取订阅的扫描进度
-        progress = self.tracker.get_subscription_progress(user_id)
-        last_video_time = progress.get('last_video_time', 0) if progress else 0
+        progress = await run_blocking(self.tracker.get_subscription_progress, user_id)
+        last_video_time = (progress.get('last_video_time') or 0) if progress else 0
         
         # 获取用户作品列表
         loguru_logger.info(f"正在获取用户 {subscription['nickname']} 的所有作品列表...")
@@ -287,66 +400,86 @@ class SubscriptionScanner:
                 logger.error(f"订阅 {subscription['nickname']} 缺少 user_url 或 sec_uid")
                 return []
         
-        # 从同步API获取作品（因为异步API还没有实现正确的方法）
-        from dy_apis.douyin_api import DouyinAPI
-        works = DouyinAPI.get_user_all_work_info(self._auth, user_url)
-        
-        if not works:
-            loguru_logger.info(f"用户 {subscription['nickname']} 没有作品")
-            return []
-            
         # 查找新视频
         new_videos = []
         latest_video_time = last_video_time
         latest_video_id = None
+        total_works = 0
+        auto_download = self.auto_download and subscription.get('auto_download', True)
         
         # 获取已下载的视频ID集合
         db = get_database()
-        downloaded_ids = db.get_downloaded_work_ids(user_id)
+        downloaded_ids = await run_blocking(db.get_downloaded_work_ids, user_id)
         
         # 获取订阅信息以便更新数据库
-        subscription_info = db.get_subscription(user_id)
+        subscription_info = await run_blocking(db.get_subscription, user_id)
         subscription_db_id = subscription_info['id'] if subscription_info else None
         
+        # 用于估计发布速率和本次扫描的请求数
+        create_times = []
+        page_count = 0
+        
+        # 从未扫描过的订阅要翻完全部作品，保存翻页断点，中断后下次扫描从断点继续；
+        # 常规扫描不保存断点，避免从断点续扫时漏掉作者新发布在第一页的作品
+        checkpoint_every = DEFAULT_CHECKPOINT_EVERY if not progress else 0
+        
+        # 逐页获取作品，每页的新视频立即交给回调下载，不必等待翻页结束
+        async for page in self.api.aiter_user_work_pages(user_url, checkpoint_every=checkpoint_every):
+            total_works += len(page.items)
+            page_count += 1
+            page_new_videos = []
+            
+            for work in page.items:
+                create_time = work.get('create_time', 0)
+                aweme_id = work.get('aweme_id', '')
+                create_times.append(create_time)
+                
+                # 更新最新视频时间
+                if create_time > latest_video_time:
+                    latest_video_time = create_time
+                    latest_video_id = aweme_id
+                
+                # 检查是否是新视频（发布时间比上次扫描记录的新，且未下载）
+                if create_time > last_video_time and aweme_id not in downloaded_ids:
+                    page_new_videos.append(work)
+                    collector.add_new_video(user_id, work)
+            
+            new_videos.extend(page_new_videos)
+            
+            # 添加视频到订阅数据库（无论是否为新视频）
+            if subscription_db_id:
+                await run_blocking(self._save_subscription_videos, db, subscription_db_id, page.items)
+            
+            # 如果有新视频且设置了自动下载
+            if page_new_videos and auto_download and self._on_new_videos_callback:
+                await self._on_new_videos_callback(user_id, page_new_videos)
+        
+        # 作品列表页数加上下面的用户信息请求
+        await run_blocking(self.tracker.record_scan, user_id, estimate_post_rate(create_times), page_count + 1)
+        
+        if total_works == 0:
+            loguru_logger.info(f"用户 {subscription['nickname']} 没有作品")
+            return []
+        
         # 更新订阅的作品数量和粉丝数等信息
         if subscription_info:
             # 获取用户最新信息
             try:
-                user_info = DouyinAPI.get_user_info(self._auth, user_url)
-                db.update_subscription(
+                user_info = await run_blocking(DouyinAPI.get_user_info, self._auth, user_url)
+                await run_blocking(
+                    db.update_subscription,
                     user_id,
                     follower_count=user_info['user'].get('follower_count', 0),
-                    aweme_count=len(works),
+                    aweme_count=total_works,
                     last_check_time=datetime.now().isoformat()
                 )
                 logger.info(f"更新了 {subscription['nickname']} 的用户信息")
             except Exception as e:
                 logger.error(f"更新用户信息失败: {e}")
-        
-        for work in works:
-            create_time = work.get('create_time', 0)
-            aweme_id = work.get('aweme_id', '')
-            
-            # 更新最新视频时间
-            if create_time > latest_video_time:
-                latest_video_time = create_time
-                latest_video_id = aweme_id
-            
-            # 添加视频到订阅数据库（无论是否为新视频）
-            if subscription_db_id:
-                try:
-                    db.add_subscription_video(subscription_db_id, work)
-                except Exception as e:
-                    logger.error(f"添加视频到订阅数据库失败: {e}")
-                
-            # 检查是否是新视频（发布时间比上次扫描记录的新，且未下载）
-            if create_time > last_video_time and aweme_id not in downloaded_ids:
-                new_videos.append(work)
-                collector.add_new_video(user_id, work)
                 
         # 更新扫描进度
         if latest_video_time > last_video_time:
-            self.tracker.update_subscription_scan(user_id, latest_video_time, latest_video_id)
+            await run_blocking(self.tracker.update_subscription_scan, user_id, latest_video_time, latest_video_id)
             
         if new_videos:
             loguru_logger.info(f"发现 {subscription['nickname']} 的 {len(new_videos)} 个新视频")
@@ -0,0 +1,134 @@
+# coding=utf-8
+"""
+作品链接规范化，从各种格式的链接中提取 aweme_id
+v.douyin.com 短链接只跟随重定向头解析，不下载页面内容，解析结果持久化缓存
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+from loguru import logger
+
+from utils.database import get_database
+
+requests.packages.urllib3.disable_warnings()
+
+SHORT_LINK_PATTERN = re.compile(r'https?://v\.douyin\.com/[\w\-]+/?')
+MAX_REDIRECTS = 5
+_headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+# 复用连接池
+_session = requests.Session()
+_session.headers.update(_headers)
+_session.verify = False
+
+
+def is_short_link(url: str) -> bool:
+    """是否为 v.douyin.com 短链接"""
+    return 'v.douyin.com' in url
+
+
+def extract_aweme_id(url: str) -> Optional[str]:
+    """
+    从作品链接中提取 aweme_id，支持纯数字ID、/video/、/note/、modal_id= 以及 iesdouyin 分享链接
+    :param url: 作品链接
+    :return: aweme_id，无法识别时返回 None
+    """
+    url = url.strip()
+    if re.fullmatch(r'\d+', url):
+        return url
+    id_match = re.search(r'modal_id=(\d+)', url)
+    if id_match:
+        return id_match.group(1)
+    id_match = re.search(r'/(?:video|note)/(\d+)', url)
+    if id_match:
+        return id_match.group(1)
+    return None
+
+
+def _follow_redirects(url: str, timeout: float = 10) -> Optional[str]:
+    """逐跳读取 Location 头，拿到含作品ID的地址即停止"""
+    for _ in range(MAX_REDIRECTS):
+        resp = _session.head(url, allow_redirects=False, timeout=timeout)
+        if resp.status_code == 405:
+            # 不支持 HEAD 时使用 GET，但不读取响应体
+            resp = _session.get(url, allow_redirects=False, stream=True, timeout=timeout)
+            resp.close()
+        location = resp.headers.get('Location')
+        if not location:
+            return extract_aweme_id(url)
+        url = urljoin(url, location)
+        aweme_id = extract_aweme_id(url)
+        if aweme_id:
+            return aweme_id
+    return extract_aweme_id(url)
+
+
+def resolve_short_link(url: str, use_cache: bool = True) -> str:
+    """
+    解析短链接得到 aweme_id
+    :param url: 短链接，可以是包含短链接的分享文本
+    :param use_cache: 是否使用持久化缓存
+    :return: aweme_id
+    """
+    short_match = SHORT_LINK_PATTERN.search(url)
+    short_url = short_match.group(0) if short_match else url.strip()
+    key = short_url.rstrip('/')
+    db = get_database() if use_cache else None
+    if db:
+        aweme_id = db.get_short_link(key)
+        if aweme_id:
+            return aweme_id
+    try:
+        aweme_id = _follow_redirects(short_url)
+    except Exception as e:
+        raise ValueError(f"处理短链接失败: {e}")
+    if not aweme_id:
+        raise ValueError(f"无法从短链接提取视频ID: {short_url}")
+    logger.info(f"短链接 {short_url} 解析为作品ID: {aweme_id}")
+    if db:
+        db.save_short_link(key, aweme_id)
+    return aweme_id
+
+
+def resolve_aweme_id(url: str, use_cache: bool = True) -> str:
+    """
+    获取任意格式作品链接的 aweme_id
+    :param url: 作品链接、分享文本或作品ID
+    :param use_cache: 短链接是否使用持久化缓存
+    :return: aweme_id
+    """
+    if is_short_link(url):
+        return resolve_short_link(url, use_cache)
+    aweme_id = extract_aweme_id(url)
+    if not aweme_id:
+        raise ValueError(f"无法识别的URL格式: {url}")
+    return aweme_id
+
+
+def resolve_aweme_ids(urls: List[str], max_workers: int = 8, use_cache: bool = True) -> Dict[str, Optional[str]]:
+    """
+    并发解析一批作品链接
+    :param urls: 作品链接列表
+    :param max_workers: 最大并发数
+    :param use_cache: 短链接是否使用持久化缓存
+    :return: {链接: aweme_id}，解析失败的为 None
+    """
+    def resolve(url):
+        try:
+            return resolve_aweme_id(url, use_cache)
+        except Exception as e:
+            logger.error(f"解析作品链接失败 {url}: {e}")
+            return None
+
+    unique_urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as executor:
+        return dict(zip(unique_urls, executor.map(resolve, unique_urls)))
+
+
+def to_video_url(aweme_id: str) -> str:
+    """aweme_id 转换为标准作品链接"""
+    return f'https://www.douyin.com/video/{aweme_id}'
@@ -0,0 +1,205 @@
+# coding=utf-8
+"""
+作品与作者的精简模型
+直接从接口返回的 aweme 构建，只保留导出和下载需要的字段，不引用原始数据，
+同一作者的多个作品可以共用一个 AuthorRecord，图集只保存每张图片的地址
+to_dict 即 handle_work_info 的结果，供现有的下载、导出代码使用
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+UNKNOWN = '未知'
+_GENDERS = {1: '男', 0: '女'}
+_WORK_TYPES = {68: '图集', 0: '视频'}
+
+
+def _image_url(image: Any) -> str:
+    """图片地址，依次尝试 url_list、download_url_list 和 url"""
+    if not isinstance(image, dict):
+        return str(image)
+    for key in ('url_list', 'download_url_list'):
+        if image.get(key):
+            return image[key][0]
+    return image.get('url') or str(image)
+
+
+class AuthorRecord:
+    """作者信息"""
+    __slots__ = ('sec_uid', 'user_id', 'nickname', 'author_avatar', 'user_desc', 'following_count',
+                 'follower_count', 'total_favorited', 'aweme_count', 'user_age', 'gender', 'ip_location')
+
+    def __init__(self, sec_uid: str, user_id: Any = UNKNOWN, nickname: str = '', author_avatar: str = '',
+                 user_desc: Any = UNKNOWN, following_count: Any = UNKNOWN, follower_count: Any = UNKNOWN,
+                 total_favorited: Any = UNKNOWN, aweme_count: Any = UNKNOWN, user_age: Any = UNKNOWN,
+                 gender: str = UNKNOWN, ip_location: Any = UNKNOWN):
+        self.sec_uid = sec_uid
+        self.user_id = user_id
+        self.nickname = nickname
+        self.author_avatar = author_avatar
+        self.user_desc = user_desc
+        self.following_count = following_count
+        self.follower_count = follower_count
+        self.total_favorited = total_favorited
+        self.aweme_count = aweme_count
+        self.user_age = user_age
+        self.gender = gender
+        self.ip_location = ip_location
+
+    @classmethod
+    def from_aweme(cls, data: Dict) -> 'AuthorRecord':
+        """从 aweme 的 author 字段构建"""
+        author = data['author']
+        try:
+            ip_location = data['user']['ip_location']
+        except:
+            ip_location = UNKNOWN
+        return cls(
+            sec_uid=author['sec_uid'],
+            user_id=author.get('unique_id', UNKNOWN),
+            nickname=author['nickname'],
+            author_avatar=author['avatar_thumb']['url_list'][0],
+            user_desc=author.get('signature', UNKNOWN),
+            following_count=author.get('following_count', UNKNOWN),
+            follower_count=author.get('follower_count', UNKNOWN),
+            total_favorited=author.get('total_favorited', UNKNOWN),
+            aweme_count=author.get('aweme_count', UNKNOWN),
+            user_age=author.get('user_age', UNKNOWN),
+            gender=_GENDERS.get(author.get('gender'), UNKNOWN),
+            ip_location=ip_location,
+        )
+
+    @property
+    def user_url(self) -> str:
+        return f'https://www.douyin.com/user/{self.sec_uid}'
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, AuthorRecord) and self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self.sec_uid)
+
+    def __repr__(self):
+        return f'AuthorRecord(sec_uid={self.sec_uid!r}, nickname={self.nickname!r})'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'user_url': self.user_url,
+            'user_id': self.user_id,
+            'nickname': self.nickname,
+            'author_avatar': self.author_avatar,
+            'user_desc': self.user_desc,
+            'following_count': self.following_count,
+            'follower_count': self.follower_count,
+            'total_favorited': self.total_favorited,
+            'aweme_count': self.aweme_count,
+            'user_age': self.user_age,
+            'gender': self.gender,
+            'ip_location': self.ip_location,
+        }
+
+
+class WorkRecord:
+    """作品信息"""
+    __slots__ = ('work_id', 'work_type', 'title', 'desc', 'admire_count', 'digg_count', 'comment_count',
+                 'collect_count', 'share_count', 'play_count', 'video_addr', 'images', 'topics',
+                 'create_time', 'video_cover', 'author')
+
+    def __init__(self, work_id: str, work_type: str, title: str, desc: str, admire_count: int, digg_count: int,
+                 comment_count: int, collect_count: int, share_count: int, play_count: int, video_addr: str,
+                 images: tuple, topics: tuple, create_time: int, video_cover: str, author: AuthorRecord):
+        self.work_id = work_id
+        self.work_type = work_type
+        self.title = title
+        self.desc = desc
+        self.admire_count = admire_count
+        self.digg_count = digg_count
+        self.comment_count = comment_count
+        self.collect_count = collect_count
+        self.share_count = share_count
+        self.play_count = play_count
+        self.video_addr = video_addr
+        self.images = images
+        self.topics = topics
+        self.create_time = create_time
+        self.video_cover = video_cover
+        self.author = author
+
+    @classmethod
+    def from_aweme(cls, data: Dict, authors: Optional[Dict[str, AuthorRecord]] = None) -> 'WorkRecord':
+        """
+        从接口返回的 aweme 构建
+        :param data: aweme 详情
+        :param authors: sec_uid -> AuthorRecord 缓存, 提供时作者信息相同的作品共用同一个 AuthorRecord
+        """
+        author = AuthorRecord.from_aweme(data)
+        if authors is not None:
+            cached = authors.get(author.sec_uid)
+            if cached == author:
+                author = cached
+            else:
+                authors[author.sec_uid] = author
+        statistics = data['statistics']
+        images = data.get('images')
+        if not isinstance(images, list):
+            images = []
+        text_extra = data.get('text_extra') or []
+        topics = tuple(item['hashtag_name'] for item in text_extra if item.get('hashtag_name'))
+        return cls(
+            work_id=data['aweme_id'],
+            work_type=_WORK_TYPES.get(data['aweme_type'], UNKNOWN) if 'aweme_type' in data else UNKNOWN,
+            title=data['desc'],
+            desc=data['desc'],
+            admire_count=statistics.get('admire_count', 0),
+            digg_count=statistics['digg_count'],
+            comment_count=statistics['comment_count'],
+            collect_count=statistics['collect_count'],
+            share_count=statistics['share_count'],
+            play_count=statistics.get('play_count', 0),
+            video_addr=data['video']['play_addr']['url_list'][0],
+            images=tuple(_image_url(image) for image in images),
+            topics=topics,
+            create_time=data['create_time'],
+            video_cover=data['video']['cover']['url_list'][0],
+            author=author,
+        )
+
+    @property
+    def work_url(self) -> str:
+        return f'https://www.douyin.com/video/{self.work_id}'
+
+    def __repr__(self):
+        return f'WorkRecord(work_id={self.work_id!r}, work_type={self.work_type!r})'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """handle_work_info 的结果"""
+        data = {
+            'work_id': self.work_id,
+            'work_url': self.work_url,
+            'work_type': self.work_type,
+            'title': self.title,
+            'desc': self.desc,
+            'admire_count': self.admire_count,
+            'digg_count': self.digg_count,
+            'comment_count': self.comment_count,
+            'collect_count': self.collect_count,
+            'share_count': self.share_count,
+            'play_count': self.play_count,
+            'video_addr': self.video_addr,
+            'images': list(self.images),
+            'topics': list(self.topics),
+            'create_time': self.create_time,
+            'video_cover': self.video_cover,
+        }
+        data.update(self.author.to_dict())
+        return data
+
+    def to_row(self) -> List[str]:
+        """Excel 中的一行"""
+        from .data_util import xlsx_row
+        return xlsx_row(self.to_dict())
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)